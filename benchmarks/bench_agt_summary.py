@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Benchmark the vectorised AGT matched-guise summary against a per-response loop.
+
+Creates synthetic AGT ratings for a number of participants and times:
+    * loop:       per-trait means of the paired maj - rml differences, computed
+                  by looping over the (raw) responses, as analysis scripts did.
+    * vectorised: `summarise_matched_guise()` on the ratings array, including
+                  per-speaker and per-localisation aggregates and bootstrap
+                  confidence intervals.
+
+Usage::
+
+    python benchmarks/bench_agt_summary.py --participants 5000
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from research_assistant.analysis.matched_guise import (guise_trials,  # noqa: E402
+                                                       summarise_matched_guise)
+from research_assistant.tasks.agt.eel import AgtTaskAPI  # noqa: E402
+
+LOCALISATIONS = ("CyGB_Cym_GB", "EngZzz_Eng_GB", "ItaLij_Ita_IT", "DeuZzz_Deu_DE")
+
+
+def loop_summary(responses: list[dict]) -> dict[str, float]:
+    """Mean paired difference per trait, computed one response at a time."""
+    speakers, _, _ = guise_trials(AgtTaskAPI.agt_trials)
+    differences: dict[str, list[float]] = {trait: [] for trait in AgtTaskAPI.agt_traits}
+    for response in responses:
+        ratings = {
+            trial["trial"]: {rating["trait"]: rating["rating"] for rating in trial["ratings"]}
+            for trial in response["stimulus_ratings"]
+        }
+        for trait in AgtTaskAPI.agt_traits:
+            differences[trait].append(
+                statistics.fmean(
+                    ratings[f"{speaker}_maj"][trait] - ratings[f"{speaker}_rml"][trait]
+                    for speaker in speakers
+                )
+            )
+    return {trait: statistics.fmean(values) for trait, values in differences.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--participants", type=int, default=5000)
+    parser.add_argument("--resamples", type=int, default=2000, help="bootstrap resamples")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+    trials, traits = AgtTaskAPI.agt_trials, AgtTaskAPI.agt_traits
+    ratings = rng.integers(0, 101, (args.participants, len(trials), len(traits)))
+    ratings = ratings.astype(np.float32)
+    localisations = rng.choice(LOCALISATIONS, args.participants)
+    responses = [
+        {
+            "stimulus_ratings": [
+                {
+                    "trial": trial,
+                    "ratings": [
+                        {"trait": trait, "rating": float(matrix[t, k])}
+                        for k, trait in enumerate(traits)
+                    ],
+                }
+                for t, trial in enumerate(trials)
+            ]
+        }
+        for matrix in ratings
+    ]
+    print(f"{args.participants} participants, {args.resamples} bootstrap resamples.\n")
+    started = time.perf_counter()
+    loop_summary(responses)
+    print(f"{'loop (means only)':<28} {time.perf_counter() - started:8.3f}s")
+    started = time.perf_counter()
+    summarise_matched_guise(ratings, trials, traits, localisations, args.resamples)
+    print(f"{'vectorised (with CIs)':<28} {time.perf_counter() - started:8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Benchmark data backups against the previous `shutil.make_archive` implementation.
+
+Creates a synthetic data directory with the layout used by the JSON storage
+backend (:code:`<Task>/<localisation>/<participant>_<uuid>.json`) and times:
+    * legacy:        `shutil.make_archive` after `os.chdir` (as before).
+    * zip (1 worker) / zip (N workers): `create_backup()` writing a ZIP archive.
+    * tar.zst:       `create_backup()` writing a tar.zst archive (if available).
+    * incremental:   an incremental backup after adding 1% new responses.
+
+Usage::
+
+    python benchmarks/bench_backup.py --files 50000
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from research_assistant.backup import available_formats, create_backup  # noqa: E402
+from research_assistant.backup.engine import default_workers  # noqa: E402
+
+TASKS = ("AGT", "AToL-C", "Consent", "LSBQe", "MemoryTask")
+LOCALISATIONS = ("CyGB_Cym_GB", "EngZzz_Eng_GB", "ItaLij_Ita_IT", "DeuZzz_Deu_DE")
+
+
+def make_response(rng: random.Random) -> tuple[str, bytes]:
+    """Return a participant id and a synthetic response of a realistic size."""
+    participant = f"P{rng.randrange(100000):05d}"
+    response = {
+        "id": str(uuid.uuid1()),
+        "meta": {
+            "task_localisation": rng.choice(LOCALISATIONS),
+            "participant_id": participant,
+            "researcher_id": "RES01",
+            "research_location": "Bangor",
+            "date_created": "2023-05-01T12:00:00",
+            "date_modified": "2023-05-01T12:30:00",
+        },
+        "ratings": [
+            {"trial": f"trial{t}", "ratings": [rng.randrange(101) for _ in range(18)]}
+            for t in range(13)
+        ],
+    }
+    return participant, json.dumps(response, indent=4).encode("utf-8")
+
+
+def populate(data_path: Path, count: int, rng: random.Random) -> int:
+    """Write *count* synthetic responses to *data_path* and return their total size."""
+    total = 0
+    for _ in range(count):
+        participant, content = make_response(rng)
+        directory = data_path / rng.choice(TASKS) / rng.choice(LOCALISATIONS)
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"{participant}_{uuid.uuid1()}.json").write_bytes(content)
+        total += len(content)
+    return total
+
+
+def legacy_backup(data_path: Path, filename: Path) -> None:
+    """The backup implementation used before the backup engine."""
+    old_wd = Path.cwd()
+    os.chdir(data_path)
+    shutil.make_archive(str(filename.with_suffix("")), "zip")
+    os.chdir(old_wd)
+
+
+def timed(label: str, fn, archive: Path) -> None:
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    size = archive.stat().st_size / 2**20
+    print(f"{label:<28} {elapsed:8.2f}s {size:10.1f} MiB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=50000, help="number of responses")
+    parser.add_argument("--workers", type=int, default=default_workers(), help="worker threads")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = Path(tmp, "Data")
+        out = Path(tmp, "out")
+        out.mkdir()
+        started = time.perf_counter()
+        size = populate(data_path, args.files, rng)
+        print(
+            f"Created {args.files} files ({size / 2**20:.1f} MiB) in "
+            f"{time.perf_counter() - started:.1f}s; {os.cpu_count()} CPU(s).\n"
+        )
+        print(f"{'method':<28} {'time':>9} {'archive':>14}")
+        timed("legacy make_archive", lambda: legacy_backup(data_path, out / "legacy.zip"),
+              out / "legacy.zip")
+        timed("zip (1 worker)",
+              lambda: create_backup(out / "zip1.zip", data_path=data_path, workers=1),
+              out / "zip1.zip")
+        timed(f"zip ({args.workers} worker(s))",
+              lambda: create_backup(out / "zipn.zip", data_path=data_path, workers=args.workers),
+              out / "zipn.zip")
+        if "tar.zst" in available_formats():
+            timed(f"tar.zst ({args.workers} worker(s))",
+                  lambda: create_backup(out / "full.tar.zst", data_path=data_path,
+                                        workers=args.workers),
+                  out / "full.tar.zst")
+        populate(data_path, max(1, args.files // 100), rng)
+        timed("zip incremental (+1%)",
+              lambda: create_backup(out / "incr.zip", incremental=True, data_path=data_path,
+                                    workers=args.workers),
+              out / "incr.zip")
+
+
+if __name__ == "__main__":
+    main()
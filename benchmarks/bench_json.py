@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""Benchmark the app's JSON codecs on LSBQe payloads.
+
+Times each codec available to `research_assistant.jsoncodec` (*orjson*, if
+installed, and Python's standard :code:`json` module) on:
+    * response:      encoding and decoding a complete, validated LSBQe
+                     response, as journalled, stored and read back for exports.
+    * localisation:  decoding each of the LSBQe's localisation files and
+                     encoding them as the result of
+                     :code:`lsbqe_load_localisation`.
+    * message:       encoding the reply to an Eel call returning the response
+                     with `research_assistant.booteel.memo.encode_message()`,
+                     and decoding such a call from the frontend.
+
+The response is also encoded straight from its model (:code:`model.encode`),
+i.e. dumped and then encoded by each codec, and, for comparison, with
+pydantic's :code:`model_dump_json()`, which the storage backends use to write
+responses.
+
+Usage::
+
+    python benchmarks/bench_json.py --rounds 2000 --languages 4
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import date
+from importlib import resources
+from pathlib import Path
+from typing import Any, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from research_assistant import jsoncodec  # noqa: E402
+from research_assistant.booteel import memo  # noqa: E402
+from research_assistant.datamodels.models import ResponseMetadata  # noqa: E402
+from research_assistant.tasks.lsbqe.datamodel import LsbqeResponse  # noqa: E402
+
+LANGUAGES = ("English", "Cymraeg", "Italiano", "Deutsch", "Ελληνικά", "Lëtzebuergesch")
+
+
+def _percentages(rng: random.Random, *keys: str) -> dict[str, float]:
+    """Return a random percentage for each of *keys*."""
+    return {key: float(rng.randrange(101)) for key in keys}
+
+
+def make_response(rng: random.Random, languages: int) -> LsbqeResponse:
+    """Return a complete LSBQe response, with *languages* languages, validated by its model."""
+    meta = ResponseMetadata(
+        task_localisation="CymEng_Eng_GB",
+        task_version_no="0.5.0",
+        app_version_no="0.3.4",
+        app_system_useragent="Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
+        app_display_language="en_GB",
+        researcher_id="RES01",
+        research_location="Bangor",
+        participant_id=f"P{rng.randrange(100000):05d}",
+        consent_obtained=True,
+    )
+    lsb = {
+        "sex": "f",
+        "occupation": "Student",
+        "handedness": "r",
+        "date_of_birth": date(1990 + rng.randrange(15), 1 + rng.randrange(12), 1),
+        "hearing_impairment": False,
+        "vision_impairment": True,
+        "vision_aid": True,
+        "vision_fully_corrected": True,
+        "place_of_birth": "Caernarfon",
+        "residencies": [
+            {"location": place, "start": date(2005 + i, 9, 1), "end": date(2006 + i, 6, 30)}
+            for i, place in enumerate(("Bangor", "Cardiff", "Nürnberg"))
+        ],
+        "education_level": 3,
+    }
+    ldb = {
+        "languages": [
+            {
+                "name": LANGUAGES[i % len(LANGUAGES)],
+                "source_home": i == 0,
+                "source_school": True,
+                "source_community": i < 2,
+                "age": min(i * 4, 100),
+                "breaks": 0,
+                **_percentages(
+                    rng,
+                    "proficiency_speaking",
+                    "proficiency_understanding",
+                    "proficiency_reading",
+                    "proficiency_writing",
+                    "usage_speaking",
+                    "usage_listening",
+                    "usage_reading",
+                    "usage_writing",
+                ),
+            }
+            for i in range(languages)
+        ],
+        "parents": [
+            {"parent": "mother", "occupation": "Teacher", "first_language": "Cymraeg"},
+            {"parent": "father", "occupation": "Farmer", "first_language": "English"},
+        ],
+    }
+    club = {
+        "life_stages": _percentages(
+            rng, "infancy_age", "nursery_age", "primary_age", "secondary_age"
+        ),
+        "people_current": _percentages(
+            rng, "parents", "children", "siblings", "grandparents", "other_relatives",
+            "partner", "friends", "flatmates", "neighbours",
+        ),
+        "people_childhood": _percentages(
+            rng, "parents", "siblings", "grandparents", "other_relatives", "friends",
+            "neighbours",
+        ),
+        "situations": _percentages(
+            rng, "home", "school", "work", "socialising", "religion", "leisure",
+            "commercial", "public",
+        ),
+        "activities": _percentages(
+            rng, "reading", "emailing", "texting", "social_media", "notes",
+            "traditional_media", "internet", "praying",
+        ),
+        "code_switching": _percentages(rng, "parents_and_family", "friends", "social_media"),
+    }
+    return LsbqeResponse(meta=meta, lsb=lsb, ldb=ldb, club=club)
+
+
+def load_localisations() -> list[bytes]:
+    """Return the contents of the LSBQe's localisation files."""
+    directory = resources.files("research_assistant.tasks.lsbqe.localisations")
+    return [
+        item.read_bytes()
+        for item in sorted(directory.iterdir(), key=lambda item: item.name)
+        if item.name.endswith(".json") and not item.name.startswith("_")
+    ]
+
+
+def timed(func: Callable[[], Any], rounds: int) -> float:
+    """Return the median time of *rounds* calls to *func* in microseconds."""
+    times = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times) * 1e6
+
+
+def measure(
+    codec: jsoncodec.JSONCodec, response: LsbqeResponse, localisations: list[bytes], rounds: int
+) -> dict[str, float]:
+    """Time *codec* on the payloads, returning the median times in microseconds."""
+    data = response.model_dump(mode="json")
+    encoded = codec.dumpb(data)
+    sections = [codec.loads(source) for source in localisations]
+    call = codec.dumps({"call": 1.5, "name": "lsbqe_add_club", "args": [str(response.id), data]})
+    reply = {"return": 1.5, "status": "ok", "value": data}
+    return {
+        "response.encode": timed(lambda: codec.dumpb(data), rounds),
+        "model.encode": timed(lambda: codec.dumpb(response.model_dump(mode="json")), rounds),
+        "response.decode": timed(lambda: codec.loads(encoded), rounds),
+        "localisation.decode": timed(
+            lambda: [codec.loads(source) for source in localisations], max(rounds // 20, 1)
+        ) / len(localisations),
+        "localisation.encode": timed(
+            lambda: [codec.dumps(section) for section in sections], max(rounds // 20, 1)
+        ) / len(sections),
+        "message.encode": timed(lambda: memo.encode_message(reply, codec), rounds),
+        "message.decode": timed(lambda: codec.loads(call), rounds),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=2000, help="calls timed per payload")
+    parser.add_argument("--languages", type=int, default=4, help="languages in the response")
+    args = parser.parse_args()
+    response = make_response(random.Random(1), args.languages)
+    localisations = load_localisations()
+    print(
+        f"LSBQe response: {len(response.model_dump_json())} bytes, "
+        f"{len(localisations)} localisations: {sum(map(len, localisations))} bytes"
+    )
+    pydantic = timed(response.model_dump_json, args.rounds)
+    print(f"{'pydantic':>8}: {'model.encode':<20} {pydantic:>8.1f}µs (model_dump_json)")
+    available = jsoncodec.available_codecs()
+    for name in jsoncodec.CODECS:
+        if name not in available:
+            print(f"{name:>8}: not installed")
+            continue
+        results = measure(jsoncodec.get_codec(name), response, localisations, args.rounds)
+        for label, median in results.items():
+            print(f"{name:>8}: {label:<20} {median:>8.1f}µs")
+
+
+if __name__ == "__main__":
+    main()
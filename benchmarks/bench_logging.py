@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Benchmark the latency that logging adds to the callers of the app's loggers.
+
+Logs records the size of a stored response (as logged by the tasks' `store()`
+methods at debug level) to a log file and a console stream, and times each
+call to the logger, i.e. the time for which a websocket handler blocks
+gevent's event loop when it logs:
+    * direct:  the handlers write and flush each record while the caller
+               waits, as the app's root logger did before its records were
+               queued.
+    * queued:  the records are put on a queue and written in batches by a
+               `research_assistant.logqueue.LogListener` thread, as set up by
+               :code:`configure_logging(queued=True)`.
+
+For each mode, the median and 99th percentile of the calls' latencies are
+reported, as well as the time until all records have been written (for the
+queued mode, including waiting for the listener to catch up).
+
+Usage::
+
+    python benchmarks/bench_logging.py --records 5000 --size 4096
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from research_assistant.config import config  # noqa: E402
+from research_assistant.logqueue import LogListener, LogQueueHandler  # noqa: E402
+
+MODES = ("direct", "queued")
+
+
+def _payload(size: int) -> dict[str, str]:
+    """Return a response-like payload of roughly *size* bytes once encoded as JSON."""
+    return {f"question_{i}": "an answer given by the participant" for i in range(size // 48 + 1)}
+
+
+def measure(mode: str, records: int, size: int) -> dict[str, float]:
+    """Log *records* records of about *size* bytes with the handlers set up for *mode*.
+
+    Returns:
+        The median and 99th percentile latency of the calls to the logger (in
+        microseconds), and the seconds until all records were written.
+    """
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull:
+        queued = mode == "queued"
+        handlers: list[logging.Handler] = [
+            config.logging.get_stream_handler(devnull, batched=queued),
+            config.logging.get_file_handler("bench", Path(tmp), batched=queued),
+        ]
+        listener = LogListener(handlers) if queued else None
+        bench_logger = logging.getLogger(f"bench_logging.{mode}")
+        bench_logger.propagate = False
+        bench_logger.setLevel(logging.DEBUG)
+        if listener is not None:
+            listener.start()
+            bench_logger.addHandler(LogQueueHandler(listener.queue))
+        else:
+            for handler in handlers:
+                bench_logger.addHandler(handler)
+        payload = json.dumps(_payload(size))
+        latencies = []
+        started = time.perf_counter()
+        for i in range(records):
+            call_started = time.perf_counter()
+            bench_logger.debug("Storing response %s: %s", i, payload)
+            latencies.append(time.perf_counter() - call_started)
+        if listener is not None:
+            listener.stop(timeout=None)
+        else:
+            for handler in handlers:
+                handler.close()
+        written = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "median": statistics.median(latencies) * 1e6,
+        "p99": latencies[int(len(latencies) * 0.99)] * 1e6,
+        "written": written,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=5000, help="records logged per mode")
+    parser.add_argument("--size", type=int, default=4096, help="approximate bytes per record")
+    args = parser.parse_args()
+    for mode in MODES:
+        results = measure(mode, args.records, args.size)
+        print(
+            f"{mode:>7}: median {results['median']:>7.1f}µs, p99 {results['p99']:>7.1f}µs "
+            f"per call, all written after {results['written']:.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""Benchmark the app's cold start and check it against the startup budget.
+
+Starts the app's backend (without opening a browser) in fresh interpreters
+and times, from the start of each interpreter (median of several runs):
+    * import_app:       importing `research_assistant.app`, which loads the
+                        config and registers the tasks (but doesn't load them).
+    * eel_init:         initialising eel with the app's web files and routes.
+    * first_page:       starting eel's server and serving the first page
+                        (:code:`app/index.html`).
+    * first_task_call:  the first call to a task's API (loading only that
+                        task), e.g. when the LSBQe is started.
+    * all_tasks:        loading the APIs of all remaining tasks, as the app did
+                        at startup before tasks were loaded lazily.
+
+and the wall time of the app's command line interface (`research_assistant.cli`)
+running maintenance commands without launching the app, e.g. `cli_config`
+for :code:`python -m research_assistant --config update`.
+
+With --importtime, the imports of `research_assistant.app` are broken down
+per module with :code:`python -X importtime`.
+
+With --check, the medians are checked against the time limits in the budget
+file (:file:`startup_budget.json`), which also lists modules that must not
+be imported by `research_assistant.app` (e.g. the tasks' response models) or
+by the command line interface's maintenance commands (e.g. Eel). The
+script then exits with status 1 if the budget is exceeded, so that it can be
+used as a regression gate. The same check is available to tests as
+`check_budget()`, and run by :file:`tests/test_startup_budget.py` (a slow test
+deselected by default, run with :code:`tox -e startup`).
+
+Usage::
+
+    python benchmarks/bench_startup.py --runs 5 --importtime 20 --check
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+
+DEFAULT_BUDGET = Path(__file__).with_name("startup_budget.json")
+
+PHASES = ("import_app", "eel_init", "first_page", "first_task_call", "all_tasks")
+
+SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+elapsed = {{}}
+sys.path.insert(0, {root!r})
+import eel
+import research_assistant.app as app
+elapsed["import_app"] = time.perf_counter() - started
+modules = sorted(sys.modules)
+app.init_eel()
+elapsed["eel_init"] = time.perf_counter() - started
+
+import urllib.error
+import urllib.request
+import gevent
+
+eel.start("app/index.html", mode=None, port=0, jinja_templates="app", block=False)
+app.inject_jinja_globals(eel._start_args["jinja_env"])
+url = f"http://{{eel._start_args['host']}}:{{eel._start_args['port']}}/app/index.html"
+
+def fetch():
+    for _ in range(200):
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                return response.read()
+        except (ConnectionError, urllib.error.URLError):
+            time.sleep(0.005)  # The server is not listening yet
+    raise RuntimeError(f"No response from {{url}}")
+
+gevent.get_hub().threadpool.apply(fetch)
+elapsed["first_page"] = time.perf_counter() - started
+eel._exposed_functions["lsbqe_get_localisations"]()
+elapsed["first_task_call"] = time.perf_counter() - started
+app.task_registry.load_all()
+elapsed["all_tasks"] = time.perf_counter() - started
+print(json.dumps({{"elapsed": elapsed, "modules": modules}}))
+"""
+
+# Maintenance commands of the command line interface, with their arguments
+# (formatted with the path of the temporary data directory as *tmp*).
+CLI_COMMANDS: dict[str, list[str]] = {
+    "cli_config": ["--config", "update"],
+    "cli_rebuild_index": ["--rebuild-index"],
+    "cli_backup": ["--backup", "{tmp}/backup.zip"],
+}
+
+CLI_SCRIPT = """
+import json, sys
+sys.path.insert(0, {root!r})
+from research_assistant import cli
+try:
+    cli.main({argv!r})
+except SystemExit as e:
+    status = e.code
+print(json.dumps({{"status": status, "modules": sorted(sys.modules)}}))
+"""
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def _environment(tmp: str) -> dict[str, str]:
+    """Return an environment isolating the app's data, cache and config in *tmp*."""
+    env = dict(os.environ)
+    for variable in ("XDG_DATA_HOME", "XDG_CACHE_HOME", "XDG_CONFIG_HOME", "XDG_STATE_HOME"):
+        env[variable] = tmp
+    return env
+
+
+def run_once(env: dict[str, str]) -> dict[str, Any]:
+    """Start the app's backend in a fresh interpreter and return its timings.
+
+    Returns:
+        The seconds elapsed at the end of each phase, and the modules imported
+        by `research_assistant.app`.
+
+    Raises:
+        RuntimeError: Raised if the app's backend failed to start.
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(root=str(ROOT))],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"The app's backend failed to start:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_command(env: dict[str, str], tmp: str, command: str) -> tuple[float, list[str]]:
+    """Run a maintenance *command* of the command line interface in a fresh interpreter.
+
+    Returns:
+        The wall time of the interpreter's run in seconds, and the modules it
+        imported.
+
+    Raises:
+        RuntimeError: Raised if the command failed.
+    """
+    argv = [arg.format(tmp=tmp) for arg in CLI_COMMANDS[command]]
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", CLI_SCRIPT.format(root=str(ROOT), argv=argv)],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - started
+    output = json.loads(result.stdout.strip().splitlines()[-1]) if result.returncode == 0 else {}
+    if output.get("status") != 0:
+        raise RuntimeError(f"The command {' '.join(argv)} failed:\n{result.stderr}")
+    return elapsed, output["modules"]
+
+
+def _summarise(samples: list[float]) -> dict[str, float]:
+    return {"median": statistics.median(samples), "min": min(samples), "max": max(samples)}
+
+
+def measure(runs: int = 5) -> dict[str, Any]:
+    """Measure the app's startup *runs* times (after one warm-up run).
+
+    Returns:
+        The median, minimum and maximum seconds elapsed at the end of each
+        phase and taken by each maintenance command, the modules imported by
+        `research_assistant.app`, and those imported by each command.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        env = _environment(tmp)
+        modules = run_once(env)["modules"]  # Warm up the bytecode and localisation caches
+        command_modules = {command: run_command(env, tmp, command)[1] for command in CLI_COMMANDS}
+        samples = []
+        command_samples: dict[str, list[float]] = {command: [] for command in CLI_COMMANDS}
+        for _ in range(runs):
+            samples.append(run_once(env)["elapsed"])
+            for command in CLI_COMMANDS:
+                command_samples[command].append(run_command(env, tmp, command)[0])
+    return {
+        "phases": {
+            **{phase: _summarise([sample[phase] for sample in samples]) for phase in PHASES},
+            **{command: _summarise(command_samples[command]) for command in CLI_COMMANDS},
+        },
+        "modules": modules,
+        "commandModules": command_modules,
+    }
+
+
+def importtime(limit: int = 20) -> tuple[list[tuple[str, int]], list[tuple[str, int, int]]]:
+    """Break down the imports of `research_assistant.app` with :code:`-X importtime`.
+
+    Returns:
+        The total self time (in microseconds) of the imports of each top-level
+        package, and the self and cumulative time of the *limit* slowest
+        modules (by cumulative time), each sorted in descending order.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        script = f"import sys; sys.path.insert(0, {str(ROOT)!r}); import research_assistant.app"
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", script],
+            env=_environment(tmp),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    packages: dict[str, int] = {}
+    modules: list[tuple[str, int, int]] = []
+    for match in _IMPORTTIME.finditer(result.stderr):
+        own, cumulative, name = int(match[1]), int(match[2]), match[4]
+        package = name.partition(".")[0]
+        packages[package] = packages.get(package, 0) + own
+        modules.append((name, own, cumulative))
+    modules.sort(key=lambda module: module[2], reverse=True)
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True), modules[:limit]
+
+
+def check_budget(results: dict[str, Any], budget: dict[str, Any]) -> list[str]:
+    """Check the *results* of `measure()` against the startup *budget*.
+
+    Returns:
+        A description of each way in which the budget is exceeded (empty if
+        it is met).
+    """
+    failures: list[str] = []
+    for phase, limit in budget.get("phases", {}).items():
+        median = results["phases"][phase]["median"]
+        if median > limit:
+            failures.append(f"{phase} took {median:.3f}s (budget: {limit:.3f}s)")
+    failures.extend(
+        _check_deferred(
+            "research_assistant.app", results["modules"], budget.get("deferredModules", ())
+        )
+    )
+    for command, modules in results["commandModules"].items():
+        failures.extend(_check_deferred(command, modules, budget.get("cliDeferredModules", ())))
+    return failures
+
+
+def _check_deferred(importer: str, modules: list[str], patterns: list[str]) -> list[str]:
+    """Return a description of each of the *patterns* matching *modules* imported by *importer*."""
+    failures = []
+    for pattern in patterns:
+        imported = [module for module in modules if fnmatchcase(module, pattern)]
+        if imported:
+            failures.append(f"{importer} imports {', '.join(imported)} (deferred: {pattern})")
+    return failures
+
+
+def _print_importtime(limit: int) -> None:
+    """Print the breakdown of the imports of `research_assistant.app` (see `importtime()`)."""
+    packages, modules = importtime(limit)
+    print("\nSelf import time by top-level package:")
+    for package, own in packages[:limit]:
+        print(f"{own / 1e6:>10.3f}s  {package}")
+    print(f"\n{limit} slowest modules (self / cumulative import time):")
+    for name, own, cumulative in modules:
+        print(f"{own / 1e6:>10.3f}s {cumulative / 1e6:>8.3f}s  {name}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--importtime",
+        type=int,
+        nargs="?",
+        const=20,
+        metavar="N",
+        help="break down the imports, listing the N slowest modules (default: 20)",
+    )
+    parser.add_argument("--check", action="store_true", help="check against the budget")
+    parser.add_argument("--budget", type=Path, default=DEFAULT_BUDGET, help="budget file")
+    args = parser.parse_args()
+    results = measure(args.runs)
+    for phase, timings in results["phases"].items():
+        print(
+            f"{phase:>17}: {timings['median']:.3f}s "
+            f"(min {timings['min']:.3f}s, max {timings['max']:.3f}s)"
+        )
+    if args.importtime is not None:
+        _print_importtime(args.importtime)
+    if args.check:
+        failures = check_budget(results, json.loads(args.budget.read_text(encoding="utf-8")))
+        for failure in failures:
+            print(f"FAILED: {failure}", file=sys.stderr)
+        if failures:
+            sys.exit(1)
+        print("\nStartup is within budget.")
+
+
+if __name__ == "__main__":
+    main()
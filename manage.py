@@ -11,6 +11,7 @@ The goal is to eventually implement the following functionality:
     run:    run the app from the development environment.
     test:   run the tests.
 """
+import importlib
 import os
 import platform
 import shutil
@@ -268,6 +269,8 @@ def _build_setuptools_package(src_dir, build_dir: str, dist_dir: str) -> bool:
         print(f"{INDENT*2}ERROR: Could not copy directory '{src_dir}' to '{build_dir}'.")
         print(f"{INDENT*2}!! Failed !!")
         return False
+    if not _build_localisation_indexes(build_dir / QUALIFIED_PKG_NAME):
+        return False
     files_to_copy: tuple[str, ...] = (
         'setup.cfg',
         'pyproject.toml',
@@ -374,6 +377,8 @@ def _build_pyinstaller(src_dir: Path, build_dir: Path, dist_dir: Path, pkg_name:
         print(f"{INDENT*2}ERROR: Could not copy directory '{src_dir}' to '{build_dir}'.")
         print(f"{INDENT*2}!! Failed !!")
         return False
+    if not _build_localisation_indexes(build_dir / QUALIFIED_PKG_NAME):
+        return False
 
     # Create PyInstaller runner file..
     print(f"{INDENT}Creating runner file...")
@@ -386,8 +391,8 @@ def _build_pyinstaller(src_dir: Path, build_dir: Path, dist_dir: Path, pkg_name:
                 "It has been automatically generated and changes will not persist across\n",
                 "fresh builds.\n",
                 "'''\n\n",
-                f"import {QUALIFIED_PKG_NAME}.app as app\n\n",
-                "app.main()\n\n"
+                f"import {QUALIFIED_PKG_NAME}.cli as cli\n\n",
+                "cli.main()\n\n"
                 "# EOF\n"
             ]
         )
@@ -408,6 +413,8 @@ def _build_pyinstaller(src_dir: Path, build_dir: Path, dist_dir: Path, pkg_name:
         "--hidden-import", "bottle_websocket",
         "--add-data", f"{str(resources.path('eel', 'eel.js'))}{os.pathsep}eel",
         "--collect-data", QUALIFIED_PKG_NAME,
+        # The app and its tasks are imported on demand, not by the runner
+        "--collect-submodules", QUALIFIED_PKG_NAME,
     ]
     # if SPLASH_IMAGE:
     #     # CURRENTLY BROKEN IN PyInstaller (tcl/tk lib dependency with vcruntime)
@@ -481,6 +488,30 @@ def _copy_dir_clean(source: Path, dest: Path):
     return True
 
 
+def _build_localisation_indexes(pkg_dir: Path) -> bool:
+    """Write the localisation index of each task in the package copied to *pkg_dir*.
+
+    The indexes record the label, description, size and content hash of each
+    localisation file, so that the installed app does not need to parse the
+    localisations to discover them (see `booteel.localisations`).
+
+    Returns:
+        Whether all indexes were written.
+    """
+    print(f"{INDENT}Generating localisation indexes...")
+    localisations = importlib.import_module(f"{QUALIFIED_PKG_NAME}.booteel.localisations")
+    for localisations_dir in sorted(pkg_dir.glob("tasks/*/localisations")):
+        index_file = localisations_dir / localisations.INDEX_FILENAME
+        print(f"{INDENT*2}Writing '{index_file}'.")
+        try:
+            localisations.write_index(localisations.build_index(localisations_dir), index_file)
+        except OSError as exc:
+            print(f"{INDENT*3}ERROR: {exc}.")
+            print(f"{INDENT*3}!! Failed !!")
+            return False
+    return True
+
+
 def clean(env: str) -> bool:                                                    # noqa: C901
     """Clean the development environment."""
     errors: bool = False
@@ -3,6 +3,6 @@
 This file will run the LART Research Assistant app if invoked as a module with
 Python, for example via `python -m research_assistant`.
 """
-from .app import main
+from .cli import main
 
 main()
@@ -0,0 +1,39 @@
+"""Analysis of the responses collected with the L'ART Research Assistant.
+
+This package requires the optional *numpy* package (install the app with the
+:code:`analysis` extra).
+
+The trait ratings given in the AGT and AToL-C are loaded as dense arrays of
+shape (responses × trials × traits) with `load_ratings()`, so that they can be
+analysed without parsing every stored response again::
+
+    from research_assistant.analysis import load_ratings
+
+    cube = load_ratings("agt")
+    mean_ratings = np.nanmean(cube.ratings, axis=0)  # trials × traits
+
+The arrays are persisted as memory-mapped :code:`.npy` files (see
+`RatingsCube`) and updated incrementally with the responses stored since they
+were last loaded.
+
+Summary statistics for the matched-guise design of the AGT (per-trait means,
+paired :code:`maj` − :code:`rml` differences per speaker and localisation, and
+bootstrap confidence intervals) are computed from the AGT cube with
+`summarise_agt()`, vectorised over the whole ratings array.
+"""
+from .cube import CUBE_SPECS, CubeSpec, RatingsCube, load_ratings
+from .matched_guise import (GUISES, MatchedGuiseSummary, bootstrap_mean_ci, guise_trials,
+                            summarise_agt, summarise_matched_guise)
+
+__all__ = [
+    "CUBE_SPECS",
+    "GUISES",
+    "CubeSpec",
+    "MatchedGuiseSummary",
+    "RatingsCube",
+    "bootstrap_mean_ci",
+    "guise_trials",
+    "load_ratings",
+    "summarise_agt",
+    "summarise_matched_guise",
+]
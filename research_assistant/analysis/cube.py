@@ -0,0 +1,402 @@
+"""Dense arrays of the trait ratings in AGT and AToL-C responses."""
+from __future__ import annotations
+
+import io
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, ClassVar, Sequence
+
+import numpy as np
+
+from ..config import config
+from ..storage import IndexEntry, ResponseIndex, StorageError, get_index
+from ..tasks.agt.eel import AgtTaskAPI
+from ..tasks.atolc.eel import AtolcTaskAPI
+
+logger = logging.getLogger(__name__)
+
+# Number of responses read from storage before they are appended to a cube.
+_BATCH_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class CubeSpec:
+    """Specification of the ratings cube for a task.
+
+    A ratings cube is a dense array of shape (responses × trials × traits).
+    The *extract* function fills the (trials × traits) matrix for a single
+    response from the response's raw data and returns the labels recorded for
+    each trial (e.g. the language rated in an AToL-C trial), by label name.
+    """
+
+    task: str
+    trials: tuple[str, ...]
+    traits: tuple[str, ...]
+    extract: Callable[[CubeSpec, dict[str, Any], np.ndarray], dict[str, list[str]]]
+    # Names of the labels returned by *extract* for each trial.
+    trial_labels: tuple[str, ...] = ()
+
+
+def _extract_agt(spec: CubeSpec, data: dict[str, Any], matrix: np.ndarray) -> dict[str, list[str]]:
+    trials = {trial: i for i, trial in enumerate(spec.trials)}
+    traits = {trait: i for i, trait in enumerate(spec.traits)}
+    for trial_ratings in data.get("stimulus_ratings", ()):
+        trial = trials.get(trial_ratings["trial"])
+        if trial is None:
+            continue
+        for rating in trial_ratings["ratings"]:
+            trait = traits.get(rating["trait"])
+            if trait is not None:
+                matrix[trial, trait] = rating["rating"]
+    return {}
+
+
+def _extract_atolc(
+    spec: CubeSpec, data: dict[str, Any], matrix: np.ndarray
+) -> dict[str, list[str]]:
+    trials = {trial: i for i, trial in enumerate(spec.trials)}
+    languages = [""] * len(spec.trials)
+    for language_ratings in data.get("ratings", ()):
+        trial = trials.get(str(language_ratings["trial"]))
+        if trial is None:
+            continue
+        languages[trial] = language_ratings["language"]
+        matrix[trial] = [language_ratings[trait] for trait in spec.traits]
+    return {"language": languages}
+
+
+# Cube specifications by task name.
+CUBE_SPECS: dict[str, CubeSpec] = {
+    "agt": CubeSpec("agt", AgtTaskAPI.agt_trials, AgtTaskAPI.agt_traits, _extract_agt),
+    "atolc": CubeSpec(
+        "atolc",
+        # AToL-C responses rate one language in each of two trials, numbered 1 and 2.
+        ("1", "2"),
+        AtolcTaskAPI.atolc_traits,
+        _extract_atolc,
+        trial_labels=("language",),
+    ),
+}
+
+
+class RatingsCube:
+    """Dense array of the trait ratings in a task's stored responses.
+
+    The cube holds the ratings of all responses for a task (see `CubeSpec`) as
+    a float32 array of shape (responses × trials × traits), with missing
+    ratings set to NaN, and label vectors aligned with each axis: the
+    response ids, participant ids, localisations and modification dates of the
+    responses, and the names of the trials and traits.
+
+    Cubes are persisted in a directory holding the ratings as
+    :code:`ratings.npy`, which is opened memory-mapped, and the labels as
+    :code:`labels.npz`. `RatingsCube.update()` adds responses stored since the
+    cube was last updated (and refreshes responses modified since then) by
+    reading only those responses, appending them to :code:`ratings.npy` in
+    place.
+    """
+
+    ratings_filename: ClassVar[str] = "ratings.npy"
+    labels_filename: ClassVar[str] = "labels.npz"
+
+    spec: CubeSpec
+    path: Path
+    ratings: np.ndarray
+    response_ids: np.ndarray
+    participant_ids: np.ndarray
+    localisations: np.ndarray
+    dates_modified: np.ndarray
+    trial_labels: dict[str, np.ndarray]
+
+    def __init__(self, spec: CubeSpec, path: Path | str):
+        """Open the cube for *spec* persisted in the directory *path*.
+
+        If the directory holds no (or no consistent) cube, an empty cube is
+        created there.
+        """
+        self.spec = spec
+        self.path = Path(path)
+        if not self._load():
+            self._create()
+
+    @property
+    def trials(self) -> np.ndarray:
+        """The names of the trials (the cube's second axis)."""
+        return np.array(self.spec.trials)
+
+    @property
+    def traits(self) -> np.ndarray:
+        """The names of the traits (the cube's third axis)."""
+        return np.array(self.spec.traits)
+
+    def __len__(self) -> int:
+        """Return the number of responses in the cube."""
+        return len(self.response_ids)
+
+    @property
+    def _ratings_path(self) -> Path:
+        return self.path / self.ratings_filename
+
+    @property
+    def _labels_path(self) -> Path:
+        return self.path / self.labels_filename
+
+    def _load(self) -> bool:
+        """Load the persisted cube, returning whether a consistent cube was found."""
+        try:
+            with np.load(self._labels_path) as labels:
+                if (
+                    tuple(labels["trials"]) != self.spec.trials
+                    or tuple(labels["traits"]) != self.spec.traits
+                ):
+                    logger.info(f"Ratings cube '{self.path}' is outdated, rebuilding it.")
+                    return False
+                self.response_ids = labels["response_ids"]
+                self.participant_ids = labels["participant_ids"]
+                self.localisations = labels["localisations"]
+                self.dates_modified = labels["dates_modified"]
+                self.trial_labels = {name: labels[name] for name in self.spec.trial_labels}
+            self.ratings = np.load(self._ratings_path, mmap_mode="r")
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Could not load ratings cube '{self.path}', rebuilding it: {e!s}")
+            return False
+        if self.ratings.shape[0] != len(self.response_ids):
+            logger.error(f"Ratings cube '{self.path}' is inconsistent, rebuilding it.")
+            return False
+        return True
+
+    def _create(self) -> None:
+        """Create a new, empty cube."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        n_trials, n_traits = len(self.spec.trials), len(self.spec.traits)
+        np.save(self._ratings_path, np.empty((0, n_trials, n_traits), dtype=np.float32))
+        self.ratings = np.empty((0, n_trials, n_traits), dtype=np.float32)
+        self.response_ids = np.empty(0, dtype=str)
+        self.participant_ids = np.empty(0, dtype=str)
+        self.localisations = np.empty(0, dtype=str)
+        self.dates_modified = np.empty(0, dtype=str)
+        self.trial_labels = {
+            name: np.empty((0, n_trials), dtype=str) for name in self.spec.trial_labels
+        }
+        self._save_labels()
+
+    def _save_labels(self) -> None:
+        tmpfile = self._labels_path.with_name(f"{self.labels_filename}.tmp")
+        with tmpfile.open("wb") as fp:
+            np.savez(
+                fp,
+                trials=self.trials,
+                traits=self.traits,
+                response_ids=self.response_ids,
+                participant_ids=self.participant_ids,
+                localisations=self.localisations,
+                dates_modified=self.dates_modified,
+                **self.trial_labels,
+            )
+        tmpfile.replace(self._labels_path)
+
+    def _append_ratings(self, ratings: np.ndarray) -> None:
+        """Append *ratings* to the persisted ratings array in place.
+
+        The header of :code:`.npy` files written by recent versions of NumPy is
+        padded so that the length of the first axis can grow without changing
+        the header's size, so the new rows are simply written to the end of the
+        file before the header is rewritten with the new shape. Otherwise (e.g.
+        for files written by older versions), the whole array is rewritten.
+        """
+        with self._ratings_path.open("r+b") as fp:
+            version = np.lib.format.read_magic(fp)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fp)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fp)
+            offset = fp.tell()
+            if fortran_order or dtype != np.float32 or shape[1:] != ratings.shape[1:]:
+                raise ValueError(f"Unexpected ratings array {shape}, {dtype}.")
+            header = _array_header(version, (shape[0] + len(ratings), *shape[1:]))
+            if len(header) == offset:
+                # Any data after the end of the array (left by an interrupted update)
+                # is overwritten, as it is not covered by the shape in the header.
+                fp.seek(offset + shape[0] * ratings[0].nbytes)
+                fp.write(np.ascontiguousarray(ratings, dtype=np.float32).tobytes())
+                fp.seek(0)
+                fp.write(header)
+                fp.flush()
+                os.fsync(fp.fileno())
+                return
+        logger.debug(f"Ratings array header of '{self.path}' cannot grow, rewriting the array.")
+        self._rewrite_ratings(ratings)
+
+    def _rewrite_ratings(self, ratings: np.ndarray) -> None:
+        """Replace the persisted ratings array with a copy with *ratings* appended."""
+        array = np.concatenate([np.load(self._ratings_path), ratings.astype(np.float32)])
+        tmpfile = self._ratings_path.with_name(f"{self.ratings_filename}.tmp")
+        with tmpfile.open("wb") as fp:
+            np.save(fp, array)
+            fp.flush()
+            os.fsync(fp.fileno())
+        tmpfile.replace(self._ratings_path)
+
+    def _read(
+        self, index: ResponseIndex, entries: Sequence[IndexEntry]
+    ) -> tuple[np.ndarray, dict[str, list[list[str]]], list[IndexEntry]]:
+        """Read the ratings of the responses recorded in *entries*.
+
+        Returns:
+            The ratings, the trial labels and the entries of the responses that
+            could be read.
+        """
+        ratings = np.full(
+            (len(entries), len(self.spec.trials), len(self.spec.traits)),
+            np.nan,
+            dtype=np.float32,
+        )
+        trial_labels: dict[str, list[list[str]]] = {name: [] for name in self.spec.trial_labels}
+        read: list[IndexEntry] = []
+        for entry in entries:
+            try:
+                labels = self.spec.extract(self.spec, index.read(entry), ratings[len(read)])
+            except (StorageError, KeyError, TypeError, ValueError) as e:
+                logger.error(f"Skipping unreadable {self.spec.task} response {entry.id}: {e!s}")
+                ratings[len(read)] = np.nan
+                continue
+            for name in self.spec.trial_labels:
+                trial_labels[name].append(labels[name])
+            read.append(entry)
+        return ratings[: len(read)], trial_labels, read
+
+    def update(self, index: ResponseIndex | None = None) -> int:
+        """Add the responses stored since the cube was last updated.
+
+        The task's responses are looked up in the response *index* (the app's
+        shared index by default). Only responses that are not in the cube yet,
+        or that have been modified since they were added, are read.
+
+        Returns:
+            The number of responses added or refreshed.
+        """
+        index = index or get_index()
+        new, modified = self._changes(index)
+        if not (new or modified):
+            return 0
+        # Release the memory map, so that the file can be modified on all platforms.
+        self.ratings = np.empty((0, *self.ratings.shape[1:]), dtype=np.float32)
+        if modified:
+            self._refresh(index, modified)
+        for start in range(0, len(new), _BATCH_SIZE):
+            self._add(index, new[start:start + _BATCH_SIZE])
+        self.ratings = np.load(self._ratings_path, mmap_mode="r")
+        logger.info(
+            f"Updated {self.spec.task} ratings cube with {len(new)} new and "
+            f"{len(modified)} modified response(s), {len(self)} in total."
+        )
+        return len(new) + len(modified)
+
+    def _changes(
+        self, index: ResponseIndex
+    ) -> tuple[list[IndexEntry], list[tuple[int, IndexEntry]]]:
+        """Return the task's responses in *index* that are new, and those modified since added.
+
+        Modified responses are returned with their position in the cube.
+        """
+        known = {
+            response_id: (i, date_modified)
+            for i, (response_id, date_modified) in enumerate(
+                zip(self.response_ids.tolist(), self.dates_modified.tolist())
+            )
+        }
+        new: list[IndexEntry] = []
+        modified: list[tuple[int, IndexEntry]] = []
+        for entry in index.entries(self.spec.task):
+            position, date_modified = known.get(str(entry.id), (None, None))
+            if position is None:
+                new.append(entry)
+            elif entry.date_modified != date_modified:
+                modified.append((position, entry))
+        return new, modified
+
+    def _add(self, index: ResponseIndex, entries: Sequence[IndexEntry]) -> None:
+        ratings, trial_labels, read = self._read(index, entries)
+        if not read:
+            return
+        self._append_ratings(ratings)
+        self.response_ids = np.append(self.response_ids, [str(entry.id) for entry in read])
+        self.participant_ids = np.append(
+            self.participant_ids, [entry.participant_id for entry in read]
+        )
+        self.localisations = np.append(self.localisations, [entry.localisation for entry in read])
+        self.dates_modified = np.append(
+            self.dates_modified, [entry.date_modified for entry in read]
+        )
+        for name, labels in trial_labels.items():
+            self.trial_labels[name] = np.concatenate(
+                [self.trial_labels[name], np.array(labels, dtype=str)]
+            )
+        self._save_labels()
+
+    def _refresh(self, index: ResponseIndex, modified: Sequence[tuple[int, IndexEntry]]) -> None:
+        ratings, trial_labels, read = self._read(index, [entry for _, entry in modified])
+        positions = {entry.id: position for position, entry in modified}
+        rows = np.array([positions[entry.id] for entry in read], dtype=np.intp)
+        if not len(rows):
+            return
+        array = np.load(self._ratings_path, mmap_mode="r+")
+        array[rows] = ratings
+        array.flush()
+        del array
+        self.dates_modified = self.dates_modified.astype(object)
+        self.dates_modified[rows] = [entry.date_modified for entry in read]
+        self.dates_modified = self.dates_modified.astype(str)
+        for name, labels in trial_labels.items():
+            values = self.trial_labels[name].astype(object)
+            values[rows] = labels
+            self.trial_labels[name] = values.astype(str)
+        self._save_labels()
+
+
+def _array_header(version: tuple[int, int], shape: tuple[int, ...]) -> bytes:
+    """Return the :code:`.npy` header (format *version*) of a float32 array of *shape*."""
+    header = {
+        "descr": np.lib.format.dtype_to_descr(np.dtype(np.float32)),
+        "fortran_order": False,
+        "shape": shape,
+    }
+    buffer = io.BytesIO()
+    if version == (1, 0):
+        np.lib.format.write_array_header_1_0(buffer, header)
+    else:
+        np.lib.format.write_array_header_2_0(buffer, header)
+    return buffer.getvalue()
+
+
+def load_ratings(
+    task: str,
+    update: bool = True,
+    path: Path | str | None = None,
+    index: ResponseIndex | None = None,
+) -> RatingsCube:
+    """Load the ratings cube for *task* (:code:`"agt"` or :code:`"atolc"`).
+
+    Arguments:
+        task: The task whose ratings to load.
+        update: Whether to add responses stored since the cube was last updated.
+        path: The directory in which the cube is persisted (by default
+            :file:`ratings/<task>` in the app's cache directory).
+        index: The response index to look up stored responses in (the app's
+            shared index by default).
+
+    Returns:
+        The (updated) ratings cube.
+    """
+    if task not in CUBE_SPECS:
+        raise ValueError(f"No ratings cube for task {task!r}, must be one of {list(CUBE_SPECS)}.")
+    if path is None:
+        path = config.paths.cache / "ratings" / task
+    cube = RatingsCube(CUBE_SPECS[task], path)
+    if update:
+        cube.update(index)
+    return cube
@@ -0,0 +1,204 @@
+"""Vectorised matched-guise summary statistics for AGT ratings."""
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Sequence
+
+import numpy as np
+
+from .cube import RatingsCube, load_ratings
+
+logger = logging.getLogger(__name__)
+
+# Names of the two guises in which each AGT speaker is heard (the majority and
+# the regional or minority language), as used in the trial names (e.g. s1_maj).
+GUISES: tuple[str, str] = ("maj", "rml")
+
+# Number of bootstrap resamples drawn at once, bounding the memory used for
+# the resampling weights.
+_BOOTSTRAP_CHUNK = 256
+
+
+@dataclass
+class MatchedGuiseSummary:
+    """Summary statistics of the ratings in a matched-guise design.
+
+    All differences are paired differences between the ratings a participant
+    gave to the same speaker in the :code:`maj` and the :code:`rml` guise
+    (:code:`maj` − :code:`rml`), so that positive values mean that the speaker
+    was rated higher on the trait in the majority language.
+    """
+
+    # Names of the traits (the last axis of all arrays).
+    traits: np.ndarray
+    # Names of the speakers (e.g. "s1").
+    speakers: np.ndarray
+    # Names of the localisations in *localisation_differences*.
+    localisations: np.ndarray
+    # Number of participants (responses) summarised.
+    participants: int
+    # Mean ratings per guise and trait (guises × traits).
+    guise_means: np.ndarray
+    # Paired differences per participant, speaker and trait (participants × speakers × traits).
+    differences: np.ndarray
+    # Mean paired difference per trait (traits).
+    mean_differences: np.ndarray
+    # Mean paired difference per speaker and trait (speakers × traits).
+    speaker_differences: np.ndarray
+    # Mean paired difference per localisation and trait (localisations × traits).
+    localisation_differences: np.ndarray
+    # Number of participants per localisation.
+    localisation_counts: np.ndarray
+    # Lower and upper bounds of the bootstrap confidence intervals of the mean
+    # paired difference per trait (2 × traits).
+    confidence_intervals: np.ndarray
+    # Confidence level of the *confidence_intervals*.
+    confidence: float
+
+
+def guise_trials(trials: Sequence[str]) -> tuple[list[str], np.ndarray, np.ndarray]:
+    """Find the matched pairs of guise trials in *trials*.
+
+    Returns:
+        The names of the speakers and, for each speaker, the index in *trials*
+        of its trial in the :code:`maj` and in the :code:`rml` guise.
+    """
+    positions = {trial: i for i, trial in enumerate(trials)}
+    speakers = sorted(
+        {
+            speaker
+            for speaker, _, guise in (trial.rpartition("_") for trial in trials)
+            if guise in GUISES and all(f"{speaker}_{g}" in positions for g in GUISES)
+        }
+    )
+    maj = np.array([positions[f"{speaker}_{GUISES[0]}"] for speaker in speakers])
+    rml = np.array([positions[f"{speaker}_{GUISES[1]}"] for speaker in speakers])
+    return speakers, maj, rml
+
+
+def _nanmean(values: np.ndarray, axis: int | tuple[int, ...]) -> np.ndarray:
+    """Return the mean of *values* along *axis*, ignoring NaNs (NaN if all are)."""
+    valid = ~np.isnan(values)
+    counts = valid.sum(axis=axis)
+    sums = np.where(valid, values, 0.0).sum(axis=axis, dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / counts
+
+
+def bootstrap_mean_ci(
+    values: np.ndarray,
+    resamples: int = 2000,
+    confidence: float = 0.95,
+    rng: np.random.Generator | None = None,
+) -> np.ndarray:
+    """Compute percentile bootstrap confidence intervals of the means of *values*.
+
+    The rows of *values* (observations × variables) are resampled with
+    replacement. Rather than materialising every resample, each resample is
+    represented by the number of times it draws each row, so that the means of
+    all resamples are computed with a single matrix product per chunk of
+    resamples. Missing values (NaN) are ignored.
+
+    Returns:
+        The lower and upper bounds of the intervals (2 × variables).
+    """
+    rng = rng or np.random.default_rng()
+    n = values.shape[0]
+    if n == 0:
+        return np.full((2, values.shape[1]), np.nan)
+    valid = (~np.isnan(values)).astype(np.float64)
+    filled = np.where(valid > 0, values, 0.0).astype(np.float64)
+    means = np.empty((resamples, values.shape[1]))
+    for start in range(0, resamples, _BOOTSTRAP_CHUNK):
+        size = min(_BOOTSTRAP_CHUNK, resamples - start)
+        draws = rng.integers(0, n, size=(size, n), dtype=np.int32) + n * np.arange(size)[:, None]
+        weights = np.bincount(draws.ravel(), minlength=size * n).reshape(size, n).astype(float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means[start:start + size] = (weights @ filled) / (weights @ valid)
+    alpha = (1.0 - confidence) / 2
+    return np.nanquantile(means, [alpha, 1.0 - alpha], axis=0)
+
+
+def summarise_matched_guise(
+    ratings: np.ndarray,
+    trials: Sequence[str],
+    traits: Sequence[str],
+    localisations: Sequence[str],
+    resamples: int = 2000,
+    confidence: float = 0.95,
+    seed: int | None = None,
+) -> MatchedGuiseSummary:
+    """Summarise the AGT *ratings* (participants × trials × traits).
+
+    Arguments:
+        ratings: The ratings, e.g. `RatingsCube.ratings` of the AGT cube.
+        trials: The names of the trials (the second axis of *ratings*).
+        traits: The names of the traits (the third axis of *ratings*).
+        localisations: The localisation of each participant's response.
+        resamples: The number of bootstrap resamples for the confidence
+            intervals.
+        confidence: The confidence level of the confidence intervals.
+        seed: Seed for the bootstrap's random number generator.
+
+    Returns:
+        The summary statistics.
+    """
+    speakers, maj, rml = guise_trials(trials)
+    ratings = np.asarray(ratings, dtype=np.float32)
+    guises = np.stack([ratings[:, maj, :], ratings[:, rml, :]])  # guises × n × speakers × traits
+    differences = guises[0] - guises[1]
+    participant_differences = _nanmean(differences, axis=1)  # participants × traits
+    names, groups = np.unique(np.asarray(localisations), return_inverse=True)
+    valid = ~np.isnan(participant_differences)
+    membership = (groups[None, :] == np.arange(len(names))[:, None]).astype(np.float64)
+    sums = membership @ np.where(valid, participant_differences, 0.0)
+    counts = membership @ valid
+    with np.errstate(invalid="ignore", divide="ignore"):
+        localisation_differences = sums / counts
+    return MatchedGuiseSummary(
+        traits=np.asarray(traits),
+        speakers=np.asarray(speakers),
+        localisations=names,
+        participants=ratings.shape[0],
+        guise_means=_nanmean(guises, axis=(1, 2)),
+        differences=differences,
+        mean_differences=_nanmean(participant_differences, axis=0),
+        speaker_differences=_nanmean(differences, axis=0),
+        localisation_differences=localisation_differences,
+        localisation_counts=np.bincount(groups, minlength=len(names)),
+        confidence_intervals=bootstrap_mean_ci(
+            participant_differences, resamples, confidence, np.random.default_rng(seed)
+        ),
+        confidence=confidence,
+    )
+
+
+def summarise_agt(
+    cube: RatingsCube | None = None,
+    resamples: int = 2000,
+    confidence: float = 0.95,
+    seed: int | None = None,
+) -> MatchedGuiseSummary:
+    """Summarise the ratings in the AGT ratings *cube* (see `summarise_matched_guise()`).
+
+    If *cube* is not given, the AGT ratings cube is loaded and updated with
+    `load_ratings()`.
+    """
+    cube = cube if cube is not None else load_ratings("agt")
+    started = time.perf_counter()
+    summary = summarise_matched_guise(
+        cube.ratings,
+        cube.spec.trials,
+        cube.spec.traits,
+        cube.localisations,
+        resamples,
+        confidence,
+        seed,
+    )
+    logger.info(
+        f"Summarised AGT ratings of {summary.participants} participant(s) in "
+        f"{time.perf_counter() - started:.2f}s."
+    )
+    return summary
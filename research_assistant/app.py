@@ -4,191 +4,127 @@ An app to collect survey-type data for research on regional and minority languag
 developed by the Language Attitudes Research Team at Bangor University.
 """
 import argparse
+import html
 import logging
-import multiprocessing
 import sys
 from pathlib import Path
-from typing import Any, Sequence, TYPE_CHECKING
+from typing import TYPE_CHECKING
 
 import eel
 import gevent  # type: ignore
 from gevent import signal
 
-from .booteel import utils
+from . import cli
+from .booteel import memo, offload, utils
+from .booteel.lifecycle import Lifecycle
+from .booteel.metrics import get_rpc_metrics
+from .booteel.pages import PageRenderer
+from .booteel.registry import TaskRegistry
 from .config import config
+from .instance import InstanceLock, InstanceServer
 from .settings.eel import eel_api as SettingsAPI
-from .tasks.agt.eel import eel_api as AgtTaskAPI
-from .tasks.atolc.eel import eel_api as AtolcTaskAPI
-from .tasks.conclusion.eel import eel_api as ConclusionTaskAPI
-from .tasks.consent.eel import eel_api as ConsentTaskAPI
-from .tasks.lsbqe.eel import eel_api as LsbqeTaskAPI
-from .tasks.memorytask.eel import eel_api as MemoryTaskAPI
-from .utils import export_backup, manage_settings, show_error_dialog
+from .storage import get_backend, get_index, get_syncer, get_writer
+from .utils import ask_backup_filename, export_backup, show_error_dialog
 
 if TYPE_CHECKING:
     from jinja2 import Environment as Jinja2Environment
 
+    from .backup import BackupProgress
 
-# Enable multiprocessing in frozen apps (e.g. pyinstaller)
-multiprocessing.freeze_support()
 
 # Set up logger for main runtime
-logging.getLogger("geventwebsocket.handler").setLevel(logging.WARNING)
-root_logger_name = __name__.split(".", maxsplit=2)[0]
-root_logger = logging.getLogger(root_logger_name)
-root_logger.setLevel(config.logging.default_level)
-root_logger.removeHandler(root_logger.handlers[0])  # Remove default NullHandler
-root_logger.addHandler(config.logging.get_stream_handler())  # > sys.stderr
-root_logger.addHandler(
-    config.logging.get_file_handler(root_logger_name)
-)  # > app log dir
-root_logger.propagate = False
+root_logger = cli.configure_logging(log_file=True, queued=True)
 logger = logging.getLogger(__name__)
 
+# Lifecycle of the backend, shutting it down once no window has been open for a while
+lifecycle = Lifecycle(lambda: _idle_delay())
+
 # Expose Eel APIs for subpackages (new API)
 settings_api = SettingsAPI()
 settings_api.expose()
-lsbqe_task_api = LsbqeTaskAPI()
-lsbqe_task_api.expose()
-atolc_task_api = AtolcTaskAPI()
-atolc_task_api.expose()
-memory_task_api = MemoryTaskAPI()
-memory_task_api.expose()
-conclusion_task_api = ConclusionTaskAPI()
-conclusion_task_api.expose()
-consent_task_api = ConsentTaskAPI()
-consent_task_api.expose()
-agt_task_api = AgtTaskAPI()
-agt_task_api.expose()
-
-
-def main():  # noqa: C901
-    """App main function called on app launch."""
-    # Parse command line arguments
-    argparser = argparse.ArgumentParser(
-        description="Launch the LART Research Assistant App."
-    )
+# Tasks are only imported once one of their methods is first called
+task_registry = TaskRegistry(cli.TASKS_PACKAGE)
+task_registry.expose()
 
-    class StoreOptionalAction(argparse.Action):
-        def __call__(
-            self,
-            parser: argparse.ArgumentParser,
-            namespace: argparse.Namespace,
-            values: str | Sequence[Any] | None,
-            option_string: str | None = ...,
-        ) -> None:
-            setattr(namespace, self.dest, values)
-
-    argparser.add_argument(
-        "-b, --backup",
-        action=StoreOptionalAction,
-        nargs="?",
-        dest="backup",
-        metavar="FILE",
-        help=(
-            "backup data as ZIP archive to FILE if given,\n"
-            "otherwise display a save as ... dialog."
-        ),
-        default=False,
-    )
 
-    argparser.add_argument(
-        "-c, --config",
-        action=StoreOptionalAction,
-        nargs="?",
-        dest="config",
-        metavar="CMD",
-        help=(
-            "Modify the app's settings file according to CMD.\n"
-            "CMD may be one of the literals 'clear' (delete the "
-            "current settings file), 'update' (ensure the settings "
-            "file is updated to include all current app settings, "
-            "preserving compatible already-saved settings), or "
-            "'reset' (overwrite the current settings file with the "
-            "app defaults.\n"
-            "Alternatively, CMD may be a JSON string of key-value "
-            "pairs enclosed by curly braces ('{...}'), where each key "
-            "represents a configuration attribute and the value the new "
-            'value it should be set to. For example \'{"sequences.consent":'
-            '"memorytask"\'} will set the follow-on sequence for the consent '
-            "task to the memorytask."
-        ),
-        default=False,
-    )
+def main():
+    """App main function called on app launch (see `research_assistant.cli.main()`)."""
+    cli.main()
 
-    argparser.add_argument(
-        "--debug",
-        dest="level",
-        metavar="LEVEL",
-        choices=("debug", "info", "warning", "error", "critical"),
-        help=(
-            "set the debug level,\n"
-            "choices = {debug, info, warning, error, critical},\n"
-            "default = warning"
-        ),
-    )
 
-    argparser.add_argument(
-        "--disable-gpu",
-        dest="disable_gpu",
-        action="store_true",
-        help=(
-            "Pass the --disable-gpu flag to created chrome "
-            "instances.\nCan be useful when running in a VM."
-        ),
-    )
+def run(args: argparse.Namespace, instance_lock: InstanceLock | None = None):
+    """Launch the app with the command line arguments *args*.
 
-    args = argparser.parse_args()
-    logger.debug("Starting with command line arguments: %s", args)
-    try:
-        loglevel = getattr(logging, args.level.upper())
-    except AttributeError:
-        loglevel = config.logging.default_level
+    If the *instance_lock* is given (and held), the app listens for later
+    launches, which then open a new window of the app rather than starting it
+    again (see `research_assistant.instance`).
+    """
+    loglevel = cli.get_log_level(args)
     root_logger.setLevel(loglevel)
     utils.setloglevel(loglevel)
+    logger.debug("Starting with command line arguments: %s", args)
 
-    # Run backup exporter and exit if --backup supplied
-    if args.backup is not False:
-        if export_backup(args.backup):
-            sys.exit(0)
-        else:
-            sys.exit(1)
-
-    # Run settings manager and exit if --config supplied
-    if args.config is not False:
-        if manage_settings(args.config):
-            sys.exit(0)
-        else:
-            sys.exit(1)
-
-    # Check args.disable_gpu
-    if args.disable_gpu:
-        logger.info("Running with --disable-gpu flag.")
+    # Build the response index if it doesn't exist yet (e.g. after an update)
+    if not get_index().path.exists():
+        get_index().rebuild()
 
-    # Run app using eel
-    eel.init(
-        str(Path(__file__).parent / "web"),
-        allowed_extensions=[
-            ".html",
-            ".js",
-            ".css",
-            ".woff",
-            ".svg",
-            ".svgz",
-            ".png",
-            ".mp3",
-        ],
-    )
     # Further arguments for the eel/chrome launch
     cmdline_args: list[str] = []
     if args.disable_gpu:
+        logger.info("Running with --disable-gpu flag.")
         cmdline_args.append("--disable-gpu")
+
+    _add_drains()
+
+    # Run app using eel
+    init_eel()
+    lifecycle.install()
+    _start_eel(cmdline_args)
+    logger.info(
+        f"Now running on "
+        f"http://{eel._start_args['host']}:{eel._start_args['port']}"  # type: ignore
+    )
+    if instance_lock is not None:
+        _start_instance_server(instance_lock)
+    if "jinja_env" in eel._start_args:
+        inject_jinja_globals(eel._start_args["jinja_env"])
+    if sys.platform not in ("win32", "win64"):
+        gevent.signal.signal(signal.SIGTERM, shutdown)
+        gevent.signal.signal(signal.SIGQUIT, shutdown)
+        gevent.signal.signal(signal.SIGINT, shutdown)
+    lifecycle.wait()
+    logger.debug("Pending work drained, exiting...")
+    sys.exit(0)
+
+
+# Server for the commands of later launches in single-instance mode, set by run().
+_instance_server: InstanceServer | None = None
+
+
+def _add_drains() -> None:
+    """Register the pending work to drain before exiting, in this order (see `lifecycle`)."""
+    lifecycle.add_drain("stop listening for later launches", _stop_instance_server)
+    lifecycle.add_drain("flush queued responses to storage", lambda: get_writer().flush())
+    lifecycle.add_drain("flush the response journals to disk", lambda: get_syncer().wait(5.0))
+    lifecycle.add_drain("stop the worker processes", offload.shutdown)
+    lifecycle.add_drain("close the storage backend", lambda: get_backend().close())
+    lifecycle.add_drain("close the response index", lambda: get_index().close())
+    lifecycle.add_drain("dump the RPC metrics", lambda: get_rpc_metrics().dump())
+    lifecycle.add_drain("flush the logs", _flush_logs)
+
+
+def _start_eel(cmdline_args: list[str]) -> None:
+    """Start eel's server and open the app in Chrome, falling back to Edge.
+
+    Raises:
+        OSError: Raised (after telling the user) if neither browser is installed.
+    """
     try:
         eel.start(
             "app/index.html",
             mode="chrome",
             jinja_templates="app",
-            close_callback=close,
+            close_callback=lifecycle.closed,
             block=False,
             cmdline_args=cmdline_args,
         )
@@ -199,7 +135,7 @@ def main():  # noqa: C901
                 "app/index.html",
                 mode="edge",
                 jinja_templates="app",
-                close_callback=close,
+                close_callback=lifecycle.closed,
                 block=False,
                 cmdline_args=cmdline_args,
             )
@@ -214,59 +150,55 @@ def main():  # noqa: C901
                 ),
             )
             raise
-    logger.info(
-        f"Now running on "
-        f"http://{eel._start_args['host']}:{eel._start_args['port']}"  # type: ignore
+
+
+def _start_instance_server(instance_lock: InstanceLock) -> None:
+    """Listen for later launches of the app while holding the *instance_lock*."""
+    global _instance_server
+    _instance_server = InstanceServer(
+        instance_lock, {"open": open_window, "flush": flush_storage}
     )
-    if "jinja_env" in eel._start_args:
-        inject_jinja_globals(eel._start_args["jinja_env"])
-    if sys.platform not in ("win32", "win64"):
-        gevent.signal.signal(signal.SIGTERM, shutdown)
-        gevent.signal.signal(signal.SIGQUIT, shutdown)
-        gevent.signal.signal(signal.SIGINT, shutdown)
-    gevent.get_hub().join()  # type: ignore
-
-
-# Timer for close() function internal callbacks, do not modify outside close() method.
-_close_countdown_timer: float = config.shutdown_delay
-
-
-def close(page: str, opensockets: list[Any]):
-    """Callback when an app socket is closed."""
-    logger.debug("Socket closed: %s", page)
-    logger.debug("Remaining sockets: %s", len(opensockets))
-
-    # Exit gevent event loop if no further sockets open after config.shutdown_delay seconds delay
-    if len(opensockets) == 0:
-
-        def conditional_shutdown():
-            global _close_countdown_timer
-            if len(eel._websockets) == 0 and _close_countdown_timer < 1.0:  # type: ignore
-                logger.debug("Still no websockets found.")
-                logger.debug(
-                    f"Shutdown delay timeout remaining is {_close_countdown_timer}."
-                )
-                shutdown()
-            elif len(eel._websockets) > 0:  # type: ignore
-                _close_countdown_timer = config.shutdown_delay
-                logger.debug("New websockets found, cancelling shutdown...")
-                gevent.getcurrent().kill()  # type: ignore
-            else:
-                _close_countdown_timer -= 1.0
-                logger.debug("Still no websockets found.")
-                logger.debug(
-                    f"Shutdown delay timeout remaining is {_close_countdown_timer}."
-                )
-                gevent.spawn_later(1.0, conditional_shutdown)  # type: ignore
-
-        logger.debug(
-            f"No websockets left, registering shutodwn after {config.shutdown_delay}s."
-        )
-        gevent.spawn_later(1.0, conditional_shutdown)  # type: ignore
+    try:
+        _instance_server.start()
+    except OSError as e:
+        logger.warning(f"Could not listen for later launches: {e!s}")
+        _instance_server.stop()
+        _instance_server = None
+
+
+def open_window(page: str = "app/index.html") -> None:
+    """Open a new app window showing *page* (e.g. when the app is launched again).
+
+    Raises:
+        RuntimeError: If the app is shutting down, so that the later launch
+            does not hand off to it but starts its own instance.
+    """
+    if lifecycle.stopping:
+        raise RuntimeError("The app is shutting down.")
+    logger.info(f"Opening a new window for '{page}'...")
+    eel.show(page)
+
+
+def flush_storage() -> None:
+    """Write the responses queued with the background writer and flush the storage backend.
+
+    Must run on the hub. Called before a data backup is made, by the app and
+    (in single-instance mode) for the :code:`--backup` command of a later
+    launch, so that the backup includes every response stored so far.
+    """
+    get_writer().flush()
+    get_backend().flush()
+
+
+def _idle_delay() -> float:
+    """Return the number of seconds to keep running after the last window is closed."""
+    if _instance_server is not None:
+        return max(config.shutdown_delay, config.resident_time)
+    return config.shutdown_delay
 
 
 def shutdown(sig=None, frame=None):
-    """Shut down the app."""
+    """Shut down the app (once its pending work has been drained, see `lifecycle`)."""
     if sig is not None:
         signames = {
             int(signal.SIGTERM): "SIGTERM",
@@ -275,17 +207,44 @@ def shutdown(sig=None, frame=None):
         }
         signame = signames.get(sig, str(sig))
         logger.critical(f"Signal '{signame}' received. Shutdown initiated.")
-    logger.info("App shutdown triggered...")
-    logger.debug("Destroying gevent event loop...")
-    ghub = gevent.get_hub()  # type: ignore
-    if sys.platform in ("win32", "win64"):
-        gevent.kill(ghub)  # Worth trying to see whether this works on Linux/Mac!?
-        sys.exit(0)
+        lifecycle.shutdown(f"signal {signame}")
     else:
-        ghub.destroy()  # type: ignore
-        # This should not have survived and already returned 0...
-        logger.debug("Execution survived event loop destruction, hard exiting...")
-        sys.exit(1)
+        lifecycle.shutdown()
+
+
+def _stop_instance_server():
+    """Stop listening for later launches (if listening)."""
+    if _instance_server is not None:
+        _instance_server.stop()
+
+
+def _flush_logs():
+    """Write the queued log records and flush the handlers of the app's root logger."""
+    if cli.log_listener is not None and not cli.log_listener.flush():
+        raise TimeoutError("timed out writing the queued log records")
+    for handler in root_logger.handlers:
+        handler.flush()
+
+
+def init_eel() -> None:
+    """Initialise eel with the app's web files and routes, ready for `eel.start()`."""
+    eel.init(
+        str(Path(__file__).parent / "web"),
+        allowed_extensions=[
+            ".html",
+            ".js",
+            ".css",
+            ".woff",
+            ".svg",
+            ".svgz",
+            ".png",
+            ".mp3",
+        ],
+    )
+    # Serve task pages localised on the server (before eel adds its own routes)
+    PageRenderer(task_registry).register_routes()
+    # Send the memoized results of exposed methods as they were encoded
+    memo.install()
 
 
 def inject_jinja_globals(jinja_env: "Jinja2Environment"):
@@ -294,12 +253,54 @@ def inject_jinja_globals(jinja_env: "Jinja2Environment"):
     jinja_env.globals["patterns"] = patterns
 
 
-# Expose export_backup to spawn self --backup
+# Expose export_backup to the frontend
 @eel.expose
 def export_data_backup():
     """Non-blocking eel wrapper for the app's `export_backup()` function."""
-    p = multiprocessing.Process(target=export_backup)
-    p.start()
+    lifecycle.spawn(_export_data_backup)
+
+
+def _export_data_backup():
+    """Ask for a filename and export a data backup, showing its progress in the frontend.
+
+    The save as ... dialog runs in a worker process (as Tk must run on a main
+    thread), and the backup itself on the gevent thread pool, so that the app
+    stays responsive while the backup is written. The responses queued for
+    storage are written before the backup is made (see `flush_storage()`).
+    """
+    filename = offload.run_in_process(ask_backup_filename)
+    if not filename:
+        logger.info("Data backup cancelled.")
+        return
+    flush_storage()
+    reporter = utils.ProgressReporter("data-backup", "Exporting data backup")
+
+    def forward_progress(progress: "BackupProgress") -> None:
+        reporter.update(
+            progress.fraction,
+            f"{progress.files_done} of {progress.files_total} files",
+            progress.finished,
+        )
+
+    try:
+        success = gevent.get_hub().threadpool.apply(  # type: ignore
+            export_backup, (filename,), {"progress": forward_progress}
+        )
+    finally:
+        reporter.close()
+    if success:
+        utils.modal(
+            "Data backup saved",
+            f"<p>The data backup was saved to <code>{html.escape(filename)}</code>.</p>",
+            icon="file-zip text-success",
+        )
+    else:
+        utils.modal(
+            "Data backup failed",
+            "<p>The data backup could not be saved. Please check the app's log "
+            "files for details.</p>",
+            icon="exclamation-triangle-fill text-danger",
+        )
 
 
 if __name__ == "__main__":
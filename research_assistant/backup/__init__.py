@@ -0,0 +1,57 @@
+"""Full and incremental backups of the L'ART Research Assistant's data.
+
+A backup is a ZIP archive of the path for data files. Besides the stored
+responses it contains a `BackupManifest`, which records the SHA-256 hash of
+every file in the data directory at the time of the backup. The manifest of
+the most recent backup is also kept in the data directory, so that the next
+backup can be made *incrementally*: an incremental backup archive only
+contains the files that were added or changed since the previous backup, plus
+a manifest recording which files were removed and the chain of backups it
+builds on. As increments are made of whole files, they only help with the
+JSON file storage backend: the SQLite backend's database changes with every
+stored response, so every increment contains all of it again.
+
+Archives are written by `write_archive()`, which streams the files into the
+archive while reading them ahead on a pool of worker threads and reports its
+progress through an optional callback. Besides ZIP archives, backups can be
+written as Zstandard-compressed tar archives (:code:`.tar.zst`), which are
+considerably smaller and compressed on several threads by Zstandard itself,
+if the optional *zstandard* package is installed (see `available_formats()`).
+
+A complete data directory can be reassembled from a full backup and all of
+its increments with `restore_backup()`::
+
+    from research_assistant.backup import create_backup, restore_backup
+
+    create_backup("monday.zip")
+    create_backup("tuesday.zip", incremental=True)
+    restore_backup(["monday.zip", "tuesday.zip"], "restored_data")
+
+Backups collected on many devices can be merged into a single SQLite
+database, de-duplicating responses by their id, with `merge_backups()`.
+"""
+from .archive import create_backup, read_manifest, resolve_chain, restore_backup
+from .engine import (ArchiveReader, BackupProgress, available_formats, format_for,
+                     open_archive, write_archive)
+from .manifest import MANIFEST_NAME, BackupError, BackupManifest, scan_data_path
+from .merge import MergeStats, find_archives, merge_backups
+
+__all__ = [
+    "MANIFEST_NAME",
+    "ArchiveReader",
+    "BackupError",
+    "BackupManifest",
+    "BackupProgress",
+    "MergeStats",
+    "available_formats",
+    "create_backup",
+    "find_archives",
+    "format_for",
+    "merge_backups",
+    "open_archive",
+    "read_manifest",
+    "resolve_chain",
+    "restore_backup",
+    "scan_data_path",
+    "write_archive",
+]
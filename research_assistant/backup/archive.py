@@ -0,0 +1,256 @@
+"""Creation and restoration of (incremental) data backup archives."""
+from __future__ import annotations
+
+import logging
+import shutil
+from pathlib import Path, PurePosixPath
+from typing import Sequence
+from uuid import UUID
+
+from ..config import config
+from ..storage import get_backend, get_index
+from .engine import (ARCHIVE_ERRORS, ProgressCallback, format_for, open_archive,
+                     write_archive)
+from .manifest import (MANIFEST_NAME, BackupError, BackupManifest, file_sha256,
+                       scan_data_path)
+
+logger = logging.getLogger(__name__)
+
+
+def create_backup(
+    filename: Path | str,
+    incremental: bool = False,
+    data_path: Path | None = None,
+    progress: ProgressCallback | None = None,
+    workers: int | None = None,
+) -> BackupManifest:
+    """Back up the data directory to the archive *filename*.
+
+    The archive format is determined by the suffix of *filename*: archives
+    ending in :code:`.tar.zst` are written as Zstandard-compressed tar archives
+    (if the optional *zstandard* package is installed), all others as ZIP
+    archives (see `research_assistant.backup.engine.write_archive()`).
+
+    A full backup contains every file in the data directory. An *incremental*
+    backup only contains the files that were added or changed since the
+    previous backup (full or incremental) made on this device, as recorded by
+    the manifest of that backup kept in the data directory. If there is no
+    previous backup, a full backup is made instead.
+
+    The storage backend is flushed before the data directory is scanned, but
+    responses queued with the background writer are not written: the caller
+    must flush it first, on the hub (see
+    `research_assistant.storage.BackgroundWriter.flush()`), or the backup
+    leaves them out.
+
+    Arguments:
+        filename: Path of the archive to create.
+        incremental: Whether to make an incremental backup.
+        data_path: The data directory to back up (the path for data files by
+            default).
+        progress: Callback receiving a `BackupProgress` as the archive is
+            written.
+        workers: The number of threads used to read (ZIP) or compress (tar.zst)
+            the files.
+
+    Returns:
+        The manifest of the new backup.
+
+    Raises:
+        BackupError: Raised if the backup archive could not be written.
+    """
+    data_path = Path(data_path if data_path is not None else config.paths.data)
+    filename = Path(filename)
+    get_backend().flush()
+    index = get_index() if data_path == get_index().data_path else None
+    files = scan_data_path(data_path, index)
+    previous = BackupManifest.load(data_path / MANIFEST_NAME) if incremental else None
+    if incremental and previous is None:
+        logger.warning("No previous backup found, creating a full backup instead.")
+    if previous is None:
+        manifest = BackupManifest(kind="full", files=files, added=sorted(files))
+    else:
+        manifest = BackupManifest(
+            kind="incremental",
+            parent=previous.id,
+            chain=[*previous.chain, previous.id],
+            files=files,
+            added=sorted(
+                path for path, sha256 in files.items() if previous.files.get(path) != sha256
+            ),
+            removed=sorted(set(previous.files) - set(files)),
+        )
+    logger.info(
+        f"Creating {manifest.kind} backup '{filename}' with {len(manifest.added)} of "
+        f"{len(files)} file(s)..."
+    )
+    write_archive(
+        filename,
+        data_path,
+        manifest.added,
+        manifest.model_dump_json(indent=1).encode("utf-8"),
+        archive_format=format_for(filename),
+        progress=progress,
+        workers=workers,
+    )
+    try:
+        manifest.save(data_path / MANIFEST_NAME)
+    except OSError as e:
+        raise BackupError(f"Could not save backup manifest: {e!s}") from e
+    logger.info(f"Backup saved to file '{filename}'.")
+    return manifest
+
+
+def read_manifest(archive: Path) -> BackupManifest:
+    """Read the manifest of the backup *archive*.
+
+    Archives made by versions of the app without incremental backups have no
+    manifest. They are treated as full backups of all files they contain (with
+    their hashes left empty, so that they are not verified on restore).
+
+    Raises:
+        BackupError: Raised if the archive or its manifest cannot be read.
+    """
+    try:
+        with open_archive(archive) as reader:
+            raw = reader.read_manifest()
+            if raw is not None:
+                return BackupManifest.model_validate_json(raw)
+            members = reader.names()
+            return BackupManifest(kind="full", files=dict.fromkeys(members, ""), added=members)
+    except (*ARCHIVE_ERRORS, ValueError) as e:
+        raise BackupError(f"Could not read backup archive '{archive}': {e!s}") from e
+
+
+def resolve_chain(archives: Sequence[Path]) -> list[tuple[Path, BackupManifest]]:
+    """Order *archives* into a chain from a full backup to its latest increment.
+
+    Raises:
+        BackupError: Raised if the archives do not form a single, complete chain.
+    """
+    by_id: dict[UUID, tuple[Path, BackupManifest]] = {}
+    for archive in archives:
+        manifest = read_manifest(archive)
+        by_id[manifest.id] = (archive, manifest)
+    ancestors = {backup_id for _, manifest in by_id.values() for backup_id in manifest.chain}
+    tips = [item for backup_id, item in by_id.items() if backup_id not in ancestors]
+    if len(tips) != 1:
+        raise BackupError(
+            f"The backup archives do not form a single backup chain ({len(tips)} "
+            f"latest backups found: {', '.join(str(archive) for archive, _ in tips)})."
+        )
+    _, latest = tips[0]
+    chain = _take_chain(latest, by_id)
+    for archive, _ in by_id.values():
+        logger.warning(f"Ignoring backup archive '{archive}' not in the backup chain.")
+    return chain
+
+
+def _take_chain(
+    latest: BackupManifest, by_id: dict[UUID, tuple[Path, BackupManifest]]
+) -> list[tuple[Path, BackupManifest]]:
+    """Take the archives of the backup chain ending in *latest* out of *by_id*, in order.
+
+    Raises:
+        BackupError: Raised if a backup of the chain is missing, or if the
+            chain does not start with a full backup.
+    """
+    chain: list[tuple[Path, BackupManifest]] = []
+    for backup_id in [*latest.chain, latest.id]:
+        if backup_id not in by_id:
+            raise BackupError(f"The backup archive for the backup {backup_id} is missing.")
+        chain.append(by_id.pop(backup_id))
+    if chain[0][1].kind != "full":
+        raise BackupError(f"The backup chain does not start with a full backup: {chain[0][0]}")
+    return chain
+
+
+def _safe_target(target: Path, relpath: str) -> Path:
+    """Return the path of the archive member *relpath* when extracted to *target*."""
+    member = PurePosixPath(relpath)
+    if member.is_absolute() or ".." in member.parts:
+        raise BackupError(f"Refusing to extract unsafe archive member '{relpath}'.")
+    return target.joinpath(*member.parts)
+
+
+def _apply_backup(archive: Path, manifest: BackupManifest, target: Path) -> None:
+    """Extract the files added by the backup *archive* to *target*, and delete those removed.
+
+    Raises:
+        BackupError: Raised if files added by the backup are missing from the archive.
+    """
+    logger.debug(f"... applying {manifest.kind} backup '{archive}'.")
+    added = set(manifest.added)
+    with open_archive(archive) as reader:
+        for relpath, member in reader.iter_members():
+            if relpath not in added:
+                continue
+            added.discard(relpath)
+            destination = _safe_target(target, relpath)
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            with destination.open("wb") as dst:
+                shutil.copyfileobj(member, dst)
+    if added:
+        raise BackupError(
+            f"{len(added)} file(s) missing from backup archive '{archive}', "
+            f"e.g. '{next(iter(added))}'."
+        )
+    for relpath in manifest.removed:
+        _safe_target(target, relpath).unlink(missing_ok=True)
+
+
+def _verify_restored(manifest: BackupManifest, target: Path) -> None:
+    """Check the files restored to *target* against the hashes in the *manifest*.
+
+    Raises:
+        BackupError: Raised if a restored file is missing or doesn't match its hash.
+    """
+    mismatched = [
+        relpath
+        for relpath, sha256 in manifest.files.items()
+        if sha256 and (
+            not _safe_target(target, relpath).is_file()
+            or file_sha256(_safe_target(target, relpath)) != sha256
+        )
+    ]
+    if mismatched:
+        raise BackupError(
+            f"{len(mismatched)} restored file(s) do not match the backup manifest, "
+            f"e.g. '{mismatched[0]}'."
+        )
+
+
+def restore_backup(archives: Sequence[Path | str], target: Path | str) -> BackupManifest:
+    """Reassemble the data directory from a full backup and its increments.
+
+    The *archives* may be given in any order. They are ordered into a backup
+    chain from the full backup to the latest increment, and applied in that
+    order to the (new or empty) directory *target*: the files contained in each
+    archive are extracted and files removed since the previous backup are
+    deleted. Finally, the restored files are checked against the hashes in the
+    manifest of the latest backup, and that manifest is saved in *target*, so
+    that a restored data directory can be backed up incrementally again.
+
+    Returns:
+        The manifest of the latest backup in the chain.
+
+    Raises:
+        BackupError: Raised if the backups could not be restored, or if the
+            restored files do not match the manifest of the latest backup.
+    """
+    target = Path(target)
+    if target.exists() and any(target.iterdir()):
+        raise BackupError(f"The restore target '{target}' is not empty.")
+    chain = resolve_chain([Path(archive) for archive in archives])
+    logger.info(f"Restoring {len(chain)} backup(s) to '{target}'...")
+    try:
+        target.mkdir(parents=True, exist_ok=True)
+        for archive, manifest in chain:
+            _apply_backup(archive, manifest, target)
+    except ARCHIVE_ERRORS as e:
+        raise BackupError(f"Could not restore backup: {e!s}") from e
+    latest = chain[-1][1]
+    _verify_restored(latest, target)
+    latest.save(target / MANIFEST_NAME)
+    logger.info(f"Restored {len(latest.files)} file(s) to '{target}'.")
+    return latest
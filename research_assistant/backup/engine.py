@@ -0,0 +1,380 @@
+"""Streaming, parallel writing and reading of backup archives."""
+from __future__ import annotations
+
+import io
+import logging
+import os
+import tarfile
+import time
+import zipfile
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Callable, Iterator, Sequence
+
+from .manifest import MANIFEST_NAME, BackupError
+
+try:
+    import zstandard  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Archive formats by name, with the file name suffix identifying them.
+ARCHIVE_FORMATS: dict[str, str] = {
+    "zip": ".zip",
+    "tar.zst": ".tar.zst",
+}
+
+# Exceptions that may be raised when reading or writing a (corrupt) archive.
+ARCHIVE_ERRORS: tuple[type[Exception], ...] = (
+    OSError,
+    EOFError,
+    zipfile.BadZipFile,
+    tarfile.TarError,
+)
+if zstandard is not None:
+    ARCHIVE_ERRORS += (zstandard.ZstdError,)
+
+
+@dataclass
+class BackupProgress:
+    """Progress of a backup being written."""
+
+    files_done: int
+    files_total: int
+    bytes_done: int
+    bytes_total: int
+    finished: bool = False
+
+    @property
+    def fraction(self) -> float:
+        """The fraction of the backup's bytes (or files, if all are empty) written."""
+        if self.bytes_total:
+            return self.bytes_done / self.bytes_total
+        return self.files_done / self.files_total if self.files_total else 1.0
+
+
+ProgressCallback = Callable[[BackupProgress], None]
+
+
+def available_formats() -> list[str]:
+    """Return the names of the archive formats available on this system.
+
+    The :code:`"tar.zst"` format requires the optional *zstandard* package.
+    """
+    return [name for name in ARCHIVE_FORMATS if name != "tar.zst" or zstandard is not None]
+
+
+def format_for(filename: Path | str) -> str:
+    """Return the name of the archive format identified by the suffix of *filename*.
+
+    Files that do not end in a known suffix are assumed to be ZIP archives.
+    """
+    name = str(filename).lower()
+    for archive_format, suffix in ARCHIVE_FORMATS.items():
+        if name.endswith(suffix):
+            return archive_format
+    return "zip"
+
+
+def default_workers() -> int:
+    """Return the default number of worker threads used to write backups."""
+    return min(8, os.cpu_count() or 1)
+
+
+class _ProgressTracker:
+    """Helper accumulating progress and rate-limiting progress callbacks."""
+
+    def __init__(
+        self, files_total: int, bytes_total: int, callback: ProgressCallback | None,
+        interval: float = 0.1,
+    ):
+        self.progress = BackupProgress(0, files_total, 0, bytes_total)
+        self._callback = callback
+        self._interval = interval
+        self._last = 0.0
+
+    def advance(self, nbytes: int) -> None:
+        self.progress.files_done += 1
+        self.progress.bytes_done += nbytes
+        now = time.monotonic()
+        if self._callback is not None and now - self._last >= self._interval:
+            self._last = now
+            self._callback(self.progress)
+
+    def finish(self) -> None:
+        self.progress.finished = True
+        if self._callback is not None:
+            self._callback(self.progress)
+
+
+def _read_file(filename: str) -> tuple[bytes, float]:
+    """Read the file *filename* (run on a worker thread).
+
+    Returns:
+        A tuple of the file's contents and its modification time.
+    """
+    with open(filename, "rb") as fp:
+        data = fp.read()
+        mtime = os.fstat(fp.fileno()).st_mtime
+    return data, mtime
+
+
+def _write_zip(
+    fp: IO[bytes],
+    data_path: Path,
+    members: Sequence[str],
+    manifest: bytes,
+    tracker: _ProgressTracker,
+    workers: int,
+) -> None:
+    """Write a ZIP archive, reading members on *workers* threads.
+
+    Members are read in a bounded window ahead of the member being written,
+    so memory use does not grow with the number of files, and they are
+    compressed as they are written, in order, on the calling thread (zlib
+    releases the GIL while it compresses, so the reads carry on meanwhile).
+    With a single worker, members are read on the calling thread instead.
+    """
+    root = str(data_path)
+    with zipfile.ZipFile(fp, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(MANIFEST_NAME, manifest)
+        if workers <= 1:
+            for relpath in members:
+                _write_member(zf, relpath, _read_file(os.path.join(root, relpath)), tracker)
+            return
+        window = workers * 4
+        pending: deque[tuple[str, Future[tuple[bytes, float]]]] = deque()
+        with ThreadPoolExecutor(workers, thread_name_prefix="backup") as pool:
+            for relpath in members:
+                future = pool.submit(_read_file, os.path.join(root, relpath))
+                pending.append((relpath, future))
+                if len(pending) >= window:
+                    relpath, future = pending.popleft()
+                    _write_member(zf, relpath, future.result(), tracker)
+            while pending:
+                relpath, future = pending.popleft()
+                _write_member(zf, relpath, future.result(), tracker)
+
+
+def _write_member(
+    zf: zipfile.ZipFile,
+    relpath: str,
+    content: tuple[bytes, float],
+    tracker: _ProgressTracker,
+) -> None:
+    """Compress and write the *content* of the file *relpath* to *zf*, recording the progress."""
+    data, mtime = content
+    zinfo = zipfile.ZipInfo(relpath, date_time=time.localtime(mtime)[:6])
+    zinfo.external_attr = 0o600 << 16
+    zf.writestr(zinfo, data, compress_type=zipfile.ZIP_DEFLATED)
+    tracker.advance(len(data))
+
+
+def _write_tar_zst(
+    fp: IO[bytes],
+    data_path: Path,
+    members: Sequence[str],
+    manifest: bytes,
+    tracker: _ProgressTracker,
+    workers: int,
+) -> None:
+    """Write a Zstandard-compressed tar archive, compressing on *workers* threads."""
+    if zstandard is None:
+        raise BackupError("The 'tar.zst' backup format requires the zstandard package.")
+    compressor = zstandard.ZstdCompressor(level=3, threads=max(1, workers))
+    with compressor.stream_writer(fp, closefd=False) as zst, tarfile.open(
+        fileobj=zst, mode="w|", format=tarfile.PAX_FORMAT
+    ) as tar:
+        info = tarfile.TarInfo(MANIFEST_NAME)
+        info.size = len(manifest)
+        info.mtime = int(time.time())
+        tar.addfile(info, io.BytesIO(manifest))
+        for relpath in members:
+            filename = data_path / relpath
+            with open(filename, "rb") as member:
+                info = tar.gettarinfo(arcname=relpath, fileobj=member)
+                tar.addfile(info, member)
+            tracker.advance(info.size)
+
+
+def write_archive(
+    filename: Path,
+    data_path: Path,
+    members: Sequence[str],
+    manifest: bytes,
+    archive_format: str = "zip",
+    progress: ProgressCallback | None = None,
+    workers: int | None = None,
+) -> None:
+    """Write the backup archive *filename* in the format *archive_format*.
+
+    The archive contains the *manifest* (as its first member) followed by the
+    files *members*, given as POSIX paths relative to *data_path*. Files are
+    streamed into the archive one by one (the working directory is never
+    changed), and read (ZIP) or compressed (tar.zst) on *workers* threads (by
+    default one per CPU, up to eight). The archive is first written to a temporary file, which only
+    replaces *filename* once the archive is complete.
+
+    If a *progress* callback is given, it is called with a `BackupProgress`
+    from the writing thread as files are added (at most every 100 ms) and once
+    more when the archive is complete.
+
+    Raises:
+        BackupError: Raised if the archive could not be written.
+    """
+    if workers is None:
+        workers = default_workers()
+    writer = {"zip": _write_zip, "tar.zst": _write_tar_zst}.get(archive_format)
+    if writer is None:
+        raise BackupError(f"Unknown backup archive format {archive_format!r}.")
+    root = str(data_path)
+    bytes_total = sum(os.path.getsize(os.path.join(root, relpath)) for relpath in members)
+    tracker = _ProgressTracker(len(members), bytes_total, progress)
+    tmpfile = filename.with_name(f"{filename.name}.tmp")
+    started = time.perf_counter()
+    try:
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        with tmpfile.open("wb") as fp:
+            writer(fp, data_path, members, manifest, tracker, workers)
+        tmpfile.replace(filename)
+    except ARCHIVE_ERRORS as e:
+        tmpfile.unlink(missing_ok=True)
+        raise BackupError(f"Could not write backup archive '{filename}': {e!s}") from e
+    except BaseException:
+        tmpfile.unlink(missing_ok=True)
+        raise
+    tracker.finish()
+    logger.debug(
+        f"Wrote {len(members)} file(s) ({bytes_total} bytes) to '{filename}' in "
+        f"{time.perf_counter() - started:.2f}s using {workers} worker(s)."
+    )
+
+
+class ArchiveReader(ABC):
+    """Base class for sequential readers of backup archives."""
+
+    def __init__(self, filename: Path):
+        """Initialise an ArchiveReader for the archive *filename*."""
+        self.filename = filename
+
+    @abstractmethod
+    def read_manifest(self) -> bytes | None:
+        """Return the raw manifest of the archive, or `None` if it has none."""
+        ...
+
+    @abstractmethod
+    def names(self) -> list[str]:
+        """Return the names of all file members of the archive."""
+        ...
+
+    @abstractmethod
+    def iter_members(self) -> Iterator[tuple[str, IO[bytes]]]:
+        """Iterate over the names and (readable) contents of the file members.
+
+        Each member's content must be read before advancing to the next member.
+        """
+        ...
+
+    def close(self) -> None:  # noqa: B027
+        """Close the archive.
+
+        Intentionally a no-op here, for readers holding no open resources.
+        """
+
+    def __enter__(self) -> ArchiveReader:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class ZipArchiveReader(ArchiveReader):
+    """Reader for backup archives in the ZIP format."""
+
+    def __init__(self, filename: Path):
+        """Open the ZIP archive *filename* for reading."""
+        super().__init__(filename)
+        self._zf = zipfile.ZipFile(filename)
+
+    def read_manifest(self) -> bytes | None:
+        """Return the raw manifest of the archive, or `None` if it has none."""
+        try:
+            return self._zf.read(MANIFEST_NAME)
+        except KeyError:
+            return None
+
+    def names(self) -> list[str]:
+        """Return the names of all file members of the archive."""
+        return [info.filename for info in self._zf.infolist() if not info.is_dir()]
+
+    def iter_members(self) -> Iterator[tuple[str, IO[bytes]]]:
+        """Iterate over the names and contents of the file members."""
+        for info in self._zf.infolist():
+            if info.is_dir():
+                continue
+            with self._zf.open(info) as member:
+                yield info.filename, member
+
+    def close(self) -> None:
+        """Close the archive."""
+        self._zf.close()
+
+
+class TarZstArchiveReader(ArchiveReader):
+    """Reader for backup archives in the Zstandard-compressed tar format.
+
+    The archive can only be read sequentially, so each call to
+    `TarZstArchiveReader.iter_members()` decompresses the archive again.
+    The manifest is always the first member, so reading it is cheap.
+    """
+
+    def __init__(self, filename: Path):
+        """Prepare the tar.zst archive *filename* for reading."""
+        if zstandard is None:
+            raise BackupError(f"Reading '{filename}' requires the zstandard package.")
+        super().__init__(filename)
+
+    def _iter_tar(self) -> Iterator[tuple[tarfile.TarInfo, IO[bytes]]]:
+        with self.filename.open("rb") as fp:
+            reader = zstandard.ZstdDecompressor().stream_reader(fp)
+            with tarfile.open(fileobj=reader, mode="r|") as tar:
+                for info in tar:
+                    if not info.isfile():
+                        continue
+                    member = tar.extractfile(info)
+                    if member is not None:
+                        yield info, member
+
+    def read_manifest(self) -> bytes | None:
+        """Return the raw manifest of the archive, or `None` if it has none."""
+        for info, member in self._iter_tar():
+            return member.read() if info.name == MANIFEST_NAME else None
+        return None
+
+    def names(self) -> list[str]:
+        """Return the names of all file members of the archive."""
+        return [info.name for info, _ in self._iter_tar()]
+
+    def iter_members(self) -> Iterator[tuple[str, IO[bytes]]]:
+        """Iterate over the names and contents of the file members."""
+        for info, member in self._iter_tar():
+            yield info.name, member
+
+
+def open_archive(filename: Path) -> ArchiveReader:
+    """Open the backup archive *filename* for reading, based on its suffix.
+
+    Raises:
+        BackupError: Raised if the archive cannot be opened.
+    """
+    try:
+        if format_for(filename) == "tar.zst":
+            return TarZstArchiveReader(filename)
+        return ZipArchiveReader(filename)
+    except ARCHIVE_ERRORS as e:
+        raise BackupError(f"Could not read backup archive '{filename}': {e!s}") from e
@@ -0,0 +1,148 @@
+"""Backup manifests recording the state of the data directory."""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Literal
+from uuid import UUID, uuid4
+
+from pydantic import BaseModel, Field
+
+from ..storage import ResponseIndex
+
+logger = logging.getLogger(__name__)
+
+# Name of the manifest inside backup archives, and of the manifest of the most
+# recent backup kept in the path for data files.
+MANIFEST_NAME = "backup_manifest.json"
+
+# Files in the data directory that are never included in backups: the manifest
+# itself, the response index (which is rebuilt from the data), SQLite's
+# temporary files and files that are in the process of being written.
+_EXCLUDED_NAMES = frozenset({MANIFEST_NAME, ResponseIndex.filename})
+_EXCLUDED_SUFFIXES = ("-wal", "-shm", "-journal", ".tmp")
+
+
+class BackupError(Exception):
+    """Error indicating that a backup could not be created or restored."""
+
+
+class BackupManifest(BaseModel):
+    """Manifest of a (full or incremental) backup of the data directory.
+
+    Every backup archive contains its manifest as :code:`backup_manifest.json`.
+    The manifest records the complete state of the data directory at the time
+    of the backup in *files* (the relative path and SHA-256 hash of every
+    file), and which of these files are contained in the archive itself in
+    *added*. A full backup contains all files; an incremental backup contains
+    only those that were added or changed since the backup with the id
+    *parent*, and lists the files deleted since then in *removed*.
+
+    Consecutive backups form a chain: *chain* holds the ids of all backups the
+    archive builds on, starting with the full backup at its base, so that the
+    archives needed to restore a backup can always be identified.
+    """
+
+    format: int = Field(default=1, description="Manifest format version")
+    id: UUID = Field(default_factory=uuid4, description="Backup ID")
+    created: datetime = Field(
+        default_factory=lambda: datetime.now(),
+        description="Date and time the backup was created",
+    )
+    kind: Literal["full", "incremental"] = Field(description="Type of backup")
+    parent: UUID | None = Field(
+        default=None, description="ID of the backup an incremental backup is based on"
+    )
+    chain: list[UUID] = Field(
+        default_factory=list,
+        description="IDs of all backups this backup is based on, base backup first",
+    )
+    files: dict[str, str] = Field(
+        description="SHA-256 hashes of all files in the data directory by relative path"
+    )
+    added: list[str] = Field(description="Files contained in the backup archive")
+    removed: list[str] = Field(
+        default_factory=list,
+        description="Files removed since the parent backup",
+    )
+
+    @classmethod
+    def load(cls, filename: Path) -> BackupManifest | None:
+        """Load the manifest stored in *filename*, if it exists and is valid."""
+        try:
+            return cls.model_validate_json(filename.read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.error(f"Ignoring unreadable backup manifest '{filename}': {e!s}")
+            return None
+
+    def save(self, filename: Path) -> None:
+        """Save the manifest to *filename*."""
+        tmpfile = filename.with_name(f"{filename.name}.tmp")
+        tmpfile.write_text(self.model_dump_json(indent=1), encoding="utf-8")
+        tmpfile.replace(filename)
+
+
+def is_excluded(relpath: str) -> bool:
+    """Check whether the file at *relpath* in the data directory is excluded from backups."""
+    name = relpath.rsplit("/", 1)[-1]
+    return name in _EXCLUDED_NAMES or name.endswith(_EXCLUDED_SUFFIXES)
+
+
+def file_sha256(filename: str | Path) -> str:
+    """Return the SHA-256 hash of the content of the file *filename*."""
+    digest = hashlib.sha256()
+    with open(filename, "rb") as fp:
+        while chunk := fp.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _walk_files(data_path: Path) -> Iterator[tuple[str, os.DirEntry[str]]]:
+    """Yield the POSIX path relative to *data_path* and entry of each file to be backed up."""
+    # Plain strings and os.scandir() rather than pathlib, as this visits every file.
+    directories = [(str(data_path), "")]
+    while directories:
+        directory, prefix = directories.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                relpath = prefix + entry.name
+                if entry.is_dir():
+                    directories.append((entry.path, relpath + "/"))
+                elif entry.is_file() and not is_excluded(relpath):
+                    yield relpath, entry
+
+
+def scan_data_path(data_path: Path, index: ResponseIndex | None = None) -> dict[str, str]:
+    """Return the SHA-256 hashes of all files to be backed up in *data_path*.
+
+    Hashes of stored responses are taken from the response *index* where the
+    size of the file still matches the indexed size, so that only files that
+    are not (or no longer accurately) indexed need to be read.
+
+    Files are compared as a whole, so the SQLite backend's database, which
+    changes whenever a response is stored, is included in every incremental
+    backup in full.
+
+    Returns:
+        A dictionary mapping the POSIX paths of the files relative to
+        *data_path* to their SHA-256 hashes.
+    """
+    known: dict[str, tuple[int, str]] = {}
+    if index is not None:
+        known = {entry.location: (entry.size, entry.sha256) for entry in index.entries()}
+    files: dict[str, str] = {}
+    hashed = 0
+    for relpath, entry in _walk_files(data_path):
+        indexed = known.get(relpath)
+        if indexed is not None and indexed[0] == entry.stat().st_size:
+            files[relpath] = indexed[1]
+        else:
+            files[relpath] = file_sha256(entry.path)
+            hashed += 1
+    logger.debug(f"Scanned {len(files)} file(s) in '{data_path}', hashed {hashed}.")
+    return files
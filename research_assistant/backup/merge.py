@@ -0,0 +1,362 @@
+"""Merging of backup archives collected on several devices into a single store."""
+from __future__ import annotations
+
+import glob
+import json
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, fields
+from pathlib import Path, PurePosixPath
+from typing import IO, Any, Iterable, Mapping, Sequence
+
+from ..storage import ResponseIndex, SQLiteBackend
+from .engine import (ARCHIVE_ERRORS, ARCHIVE_FORMATS, ArchiveReader, default_workers,
+                     open_archive)
+from .manifest import MANIFEST_NAME, BackupError
+
+logger = logging.getLogger(__name__)
+
+# Number of responses inserted per transaction while ingesting an archive.
+_BATCH_SIZE = 1000
+
+# Upserts keeping, for each response id, the version modified most recently,
+# for rows read from an archive and for shards merged into the merged store.
+_UPSERT = """
+    INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (id) DO UPDATE SET
+        task = excluded.task,
+        localisation = excluded.localisation,
+        participant_id = excluded.participant_id,
+        researcher_id = excluded.researcher_id,
+        research_location = excluded.research_location,
+        date_created = excluded.date_created,
+        date_modified = excluded.date_modified,
+        data = excluded.data
+    WHERE excluded.date_modified > responses.date_modified
+"""
+
+_MERGE_SHARD = """
+    INSERT INTO main.responses SELECT * FROM shard.responses WHERE true
+    ON CONFLICT (id) DO UPDATE SET
+        task = excluded.task,
+        localisation = excluded.localisation,
+        participant_id = excluded.participant_id,
+        researcher_id = excluded.researcher_id,
+        research_location = excluded.research_location,
+        date_created = excluded.date_created,
+        date_modified = excluded.date_modified,
+        data = excluded.data
+    WHERE excluded.date_modified > main.responses.date_modified
+"""
+
+
+@dataclass
+class MergeStats:
+    """Statistics on the backup archives merged by `merge_backups()`."""
+
+    # Number of archives ingested (including archives that failed).
+    archives: int = 0
+    # Number of responses read from the archives.
+    responses: int = 0
+    # Number of distinct responses added to the merged store.
+    added: int = 0
+    # Number of responses replaced by a more recently modified version.
+    replaced: int = 0
+    # Number of responses already in the store in the same or a newer version.
+    duplicates: int = 0
+    # Number of archive members (or whole archives) that could not be read.
+    errors: int = 0
+
+    def __iadd__(self, other: MergeStats) -> MergeStats:
+        for field_ in fields(self):
+            setattr(self, field_.name, getattr(self, field_.name) + getattr(other, field_.name))
+        return self
+
+
+def _normalise_task_dir(name: str) -> str:
+    """Derive a task name from the name of a task data directory (e.g. AToL-C)."""
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+def _response_row(task: str, content: bytes | str) -> tuple[Any, ...]:
+    """Return the row for the responses table for the raw JSON response *content*."""
+    data = json.loads(content)
+    meta = data["meta"]
+    return (
+        str(data["id"]),
+        task,
+        meta["task_localisation"],
+        meta["participant_id"],
+        meta["researcher_id"],
+        meta["research_location"],
+        meta["date_created"],
+        meta["date_modified"],
+        content if isinstance(content, str) else content.decode("utf-8"),
+    )
+
+
+def _upsert(connection: sqlite3.Connection, rows: list[tuple[Any, ...]]) -> None:
+    with connection:
+        connection.executemany(_UPSERT, rows)
+
+
+def _ingest_database(
+    connection: sqlite3.Connection, member: Any, tmpdir: str, stats: MergeStats
+) -> None:
+    """Ingest the responses from a SQLite backend database read from *member*.
+
+    SQLite can only read databases from files, so (unlike JSON responses) the
+    database is copied to a temporary file first.
+    """
+    tmpfile = os.path.join(tmpdir, "member.sqlite3")
+    with open(tmpfile, "wb") as fp:
+        shutil.copyfileobj(member, fp)
+    reader = sqlite3.connect(f"{Path(tmpfile).as_uri()}?mode=ro", uri=True)
+    try:
+        cursor = reader.execute("SELECT * FROM responses")
+        while rows := cursor.fetchmany(_BATCH_SIZE):
+            _upsert(connection, rows)
+            stats.responses += len(rows)
+    finally:
+        reader.close()
+        os.unlink(tmpfile)
+
+
+def _ingest_archive(
+    archive: str, shard: str, task_dirs: Mapping[str, str]
+) -> tuple[MergeStats, list[str]]:
+    """Read all responses in *archive* into the new database *shard*.
+
+    This runs in a worker process. Members are streamed from the archive and
+    written in batches, so memory use does not depend on the size of the
+    archive. Responses occurring more than once in the same archive (e.g. from
+    a JSON file and a database) are already de-duplicated in the shard.
+
+    Returns:
+        The statistics for the archive (with only *responses* and *errors*
+        set) and a list of error messages.
+    """
+    stats = MergeStats(archives=1)
+    messages: list[str] = []
+    connection = sqlite3.connect(shard)
+    connection.execute("PRAGMA journal_mode=OFF")
+    connection.execute("PRAGMA synchronous=OFF")
+    SQLiteBackend.create_schema(connection)
+    try:
+        with open_archive(Path(archive)) as reader:
+            _ingest_members(reader, connection, task_dirs, stats, messages)
+    except BackupError as e:
+        stats.errors += 1
+        messages.append(str(e))
+    except (*ARCHIVE_ERRORS, sqlite3.Error) as e:
+        stats.errors += 1
+        messages.append(f"Could not read backup archive '{archive}': {e!s}")
+    finally:
+        connection.close()
+    return stats, messages
+
+
+def _ingest_members(
+    reader: ArchiveReader,
+    connection: sqlite3.Connection,
+    task_dirs: Mapping[str, str],
+    stats: MergeStats,
+    messages: list[str],
+) -> None:
+    """Ingest the members of the archive open in *reader* (see `_ingest_archive()`).
+
+    Members that can't be ingested are skipped, adding an error message to
+    *messages*.
+    """
+    rows: list[tuple[Any, ...]] = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, member in reader.iter_members():
+            try:
+                _ingest_member(connection, name, member, tmpdir, task_dirs, stats, rows)
+            except (ValueError, KeyError, TypeError, sqlite3.Error) as e:
+                stats.errors += 1
+                messages.append(f"Skipping member '{name}' of '{reader.filename}': {e!s}")
+    _upsert(connection, rows)
+
+
+def _ingest_member(
+    connection: sqlite3.Connection,
+    name: str,
+    member: IO[bytes],
+    tmpdir: str,
+    task_dirs: Mapping[str, str],
+    stats: MergeStats,
+    rows: list[tuple[Any, ...]],
+) -> None:
+    """Ingest the archive member *name*, if it holds responses (see `_ingest_archive()`).
+
+    The responses in a database are written to the shard *connection* right
+    away, while a response file is added to the *rows* to be written, which are
+    written once there are enough of them.
+    """
+    parts = PurePosixPath(name).parts
+    if name == MANIFEST_NAME or parts[-1] == ResponseIndex.filename:
+        return
+    if name.endswith(".sqlite3"):
+        _ingest_database(connection, member, tmpdir, stats)
+    elif name.endswith(".json") and len(parts) == 3:
+        task = task_dirs.get(parts[0], _normalise_task_dir(parts[0]))
+        rows.append(_response_row(task, member.read()))
+        stats.responses += 1
+        if len(rows) >= _BATCH_SIZE:
+            _upsert(connection, rows)
+            rows.clear()
+
+
+def _merge_shard(connection: sqlite3.Connection, shard: str, stats: MergeStats) -> None:
+    """Merge the responses in the database *shard* into the merged store.
+
+    Updates *stats* (the statistics of the shard's archive) with the number of
+    responses added and replaced, counting all other responses read from the
+    archive as duplicates.
+    """
+    (before,) = connection.execute("SELECT COUNT(*) FROM responses").fetchone()
+    changes = connection.total_changes
+    connection.execute("ATTACH DATABASE ? AS shard", (shard,))
+    try:
+        with connection:
+            connection.execute(_MERGE_SHARD)
+    finally:
+        connection.execute("DETACH DATABASE shard")
+    (after,) = connection.execute("SELECT COUNT(*) FROM responses").fetchone()
+    stats.added = after - before
+    stats.replaced = connection.total_changes - changes - stats.added
+    stats.duplicates = stats.responses - stats.added - stats.replaced
+
+
+def find_archives(paths: Iterable[Path | str]) -> list[Path]:
+    """Expand *paths* to a list of backup archives.
+
+    Directories are expanded to the archives they contain, and paths containing
+    wildcards (e.g. :code:`backups/*.zip`) are expanded as glob patterns, so
+    that large numbers of archives can be given even where the shell does not
+    expand wildcards (e.g. on Windows).
+    """
+    archives: list[Path] = []
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            archives.extend(
+                sorted(
+                    candidate
+                    for candidate in path.iterdir()
+                    if candidate.name.lower().endswith(tuple(ARCHIVE_FORMATS.values()))
+                )
+            )
+        elif glob.has_magic(str(path)):  # type: ignore
+            archives.extend(sorted(Path(match) for match in glob.glob(str(path))))
+        else:
+            archives.append(path)
+    return archives
+
+
+def _merge_archives(
+    connection: sqlite3.Connection,
+    archives: Sequence[Path | str],
+    tmpdir_parent: Path,
+    workers: int,
+    task_dirs: Mapping[str, str],
+) -> MergeStats:
+    """Ingest the *archives* into shards on *workers* processes, merging each when complete.
+
+    The shards are kept in a temporary directory in *tmpdir_parent*, and
+    merged into the merged store *connection* (see `merge_backups()`).
+    """
+    stats = MergeStats()
+    task_dirs = dict(task_dirs)
+    with tempfile.TemporaryDirectory(dir=tmpdir_parent) as tmpdir, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for i, archive in enumerate(archives):
+            shard = os.path.join(tmpdir, f"{i}.sqlite3")
+            futures[pool.submit(_ingest_archive, str(archive), shard, task_dirs)] = shard
+        for future in as_completed(futures):
+            shard = futures[future]
+            archive_stats, messages = future.result()
+            for message in messages:
+                logger.error(message)
+            if os.path.exists(shard):
+                _merge_shard(connection, shard, archive_stats)
+                os.unlink(shard)
+            stats += archive_stats
+            logger.debug(
+                f"... {stats.archives} of {len(archives)} archive(s) merged, "
+                f"{stats.added} response(s) in store."
+            )
+    return stats
+
+
+def merge_backups(
+    archives: Sequence[Path | str],
+    output: Path | str,
+    workers: int | None = None,
+    task_dirs: Mapping[str, str] | None = None,
+) -> MergeStats:
+    """Merge the responses in many backup *archives* into a single store.
+
+    Each archive is read by one of *workers* processes into a temporary shard
+    database, streaming the responses from the archive without extracting it.
+    Shards are merged into the SQLite database *output* (which has the layout
+    used by `research_assistant.storage.SQLiteBackend`) as soon as they are
+    complete. Responses are de-duplicated by their id: if the same response
+    occurs in several archives, the version with the latest
+    :code:`meta.date_modified` is kept. Memory use is bounded by the number
+    of workers, not by the number or size of the archives.
+
+    If *output* already exists, the responses from the archives are merged
+    into it, so that archives can also be merged in several runs.
+
+    Arguments:
+        archives: The backup archives (full or incremental, in any format) to
+            merge.
+        output: Path of the SQLite database to merge the responses into.
+        workers: Number of worker processes (by default one per CPU, up to
+            eight).
+        task_dirs: Mapping from the names of the task data directories in the
+            archives to task names. Directories not in the mapping are mapped
+            to their name in lower case without punctuation (e.g.
+            :code:`AToL-C` to :code:`atolc`).
+
+    Returns:
+        Statistics on the merged responses.
+
+    Raises:
+        BackupError: Raised if the merged store could not be written, or if a
+            worker process died.
+    """
+    output = Path(output)
+    started = time.perf_counter()
+    logger.info(f"Merging {len(archives)} backup archive(s) into '{output}'...")
+    try:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(output)
+        connection.execute("PRAGMA journal_mode=WAL")
+        SQLiteBackend.create_schema(connection)
+    except (OSError, sqlite3.Error) as e:
+        raise BackupError(f"Could not open merged store '{output}': {e!s}") from e
+    try:
+        stats = _merge_archives(
+            connection, archives, output.parent, workers or default_workers(), task_dirs or {}
+        )
+    except (OSError, sqlite3.Error, BrokenProcessPool) as e:
+        raise BackupError(f"Could not merge backup archives: {e!s}") from e
+    finally:
+        connection.close()
+    logger.info(
+        f"Merged {stats.responses} response(s) from {stats.archives} archive(s) in "
+        f"{time.perf_counter() - started:.1f}s: {stats.added} added, {stats.replaced} "
+        f"replaced by newer versions, {stats.duplicates} duplicate(s), {stats.errors} error(s)."
+    )
+    return stats
@@ -1,11 +1,18 @@
 """API Base to expose data models via eel."""
 
 import logging
+import time
 from abc import ABC, abstractmethod
+from contextlib import ExitStack, contextmanager
 from functools import partial, wraps
-from typing import Any, Callable, TypeVar, cast, overload
+from typing import Any, Callable, ClassVar, Iterable, Iterator, TypeVar, overload
 
 import eel
+from gevent.lock import RLock
+
+from . import offload as offload_module
+from .memo import EncodedResult, memoize_call
+from .metrics import get_rpc_metrics
 
 # TypeVar for function wrappers
 F = TypeVar("F", bound=Callable[..., Any])
@@ -22,6 +29,11 @@ def _get_class_bases(cls: object) -> set[object]:
     return bases
 
 
+def _is_exposed(attr: object) -> bool:
+    """Return whether the class attribute *attr* is a method marked by `EelAPI.exposed()`."""
+    return getattr(getattr(attr, "__func__", attr), "eel_exposed", False) is True
+
+
 class EelAPI(ABC):
     """Base class to build Eel APIs.
 
@@ -49,8 +61,8 @@ class EelAPI(ABC):
         Classes should not overwrite any other internally pre-defined methods or
         attributes, which might affect the basic behaviour of the class. The
         methods and attributes which should not be overwritten are: `_instance`,
-        `eel_api`, `_handle_exception`, `_get_exposed`, `_wrap_method`, `expose`
-        and `exposed`.
+        `_exposed_methods`, `eel_api`, `_handle_exception`, `_get_exposed`, `get_exposed_functions`,
+        `_wrap_method`, `expose`, `exposed`, `shared`, `batch` and `fetch`.
 
         If you do overwrite any of these methods to modify their behaviour, you
         must ensure that they remain fully compatible with originals.
@@ -114,6 +126,28 @@ class EelAPI(ABC):
 
             Nia has been greeted.
 
+    Every API also exposes a :code:`batch` method, which runs several calls to
+    the API's exposed methods in a single round trip (see `EelAPI.batch()` and
+    :code:`booteel.batch()` in :file:`booteel.js`), and a :code:`fetch` method,
+    which calls methods marked as read-only with
+    `research_assistant.booteel.memo.memoized()` conditionally (see
+    `EelAPI.fetch()` and :code:`booteel.fetch()`):
+
+        .. code-block:: javascript
+
+            booteel.batch("greetings", [["say_hello"], ["greet", ["Nia"]]])
+                .then(([_, feedback]) => report_feedback(feedback));
+
+    Methods doing CPU-heavy work can be exposed to run in a thread or process
+    pool rather than on gevent's event loop, declaring the instance state they
+    touch (see `research_assistant.booteel.offload`):
+
+        .. code-block:: python
+
+            @EelAPI.exposed(offload="thread", shares=("greeted",))
+            def greet_all(self, names: list[str]) -> str:
+                ...
+
     It doesn't matter if someone else somewhere else in our Python code
     later does something like :code:`api2 = GreetingsAPI()`, they will
     simply get a reference to the original :code:`GreetingsAPI` instance,
@@ -128,6 +162,13 @@ class EelAPI(ABC):
     # Singleton instance cache
     _instance: object | None = None
 
+    # Methods marked by `exposed()`, by the class defining them (filled in on
+    # demand by `get_exposed_functions()`)
+    _exposed_methods: ClassVar[dict[type, set[Any]]] = {}
+
+    # Locks of the instance state shared by exposed methods, by name
+    _eel_locks: dict[str, RLock]
+
     @property
     @abstractmethod
     def eel_namespace(self) -> str:
@@ -178,6 +219,7 @@ class EelAPI(ABC):
             cls._instance = object.__new__(cls)
         if not hasattr(cls._instance, "eel_api"):
             cls._instance.eel_api = {}
+            cls._instance._eel_locks = {}
         return cls._instance
 
     def _handle_exception(self, exc: Exception) -> None:
@@ -189,32 +231,103 @@ class EelAPI(ABC):
 
     def _get_exposed(self):
         """Get a list of the defined APIs exposed functions."""
-        cache = self.__class__.exposed(None)
-        if not isinstance(cache, dict):
-            raise RuntimeError("EelAPI cache failed to return dictionary of callables.")
-        cache = cast(dict[str, set[F]], cache)
+        return self.__class__.get_exposed_functions()
+
+    @classmethod
+    def get_exposed_functions(cls) -> set[F]:
+        """Get the exposed functions of the class, including those of its bases."""
         relevant: set[F] = set()
-        bases = _get_class_bases(self.__class__)
-        bases.add(self.__class__)
+        bases = _get_class_bases(cls)
+        bases.add(cls)
         for base in bases:
-            if base.__name__ in cache:
-                relevant |= cache[base.__name__]
+            if base not in EelAPI._exposed_methods:
+                EelAPI._exposed_methods[base] = set(filter(_is_exposed, vars(base).values()))
+            relevant |= EelAPI._exposed_methods[base]
         return relevant
 
+    @contextmanager
+    def shared(self, names: Iterable[str]) -> Iterator[None]:
+        """Context manager holding the locks of the instance state *names* (see `exposed()`).
+
+        Must be used in a greenlet on the thread running gevent's hub. The
+        locks are reentrant, and acquired in a fixed order.
+        """
+        with ExitStack() as stack:
+            for name in sorted(set(names)):
+                lock = self._eel_locks.get(name)
+                if lock is None:
+                    lock = self._eel_locks[name] = RLock()
+                stack.enter_context(lock)
+            yield
+
     def _wrap_method(self, func: F) -> F:
-        """Wraps a method as a partial with the first argument fixed as *self*."""
-        partial_func = partial(func, self)
+        """Wraps a method as a partial with the first argument fixed as *self*.
+
+        The calls to the wrapped method are recorded in the app's RPC metrics
+        (see `research_assistant.booteel.metrics`) under its exposed name. If
+        the method is memoized, the wrapper returns its encoded result from the
+        app's result cache (see `research_assistant.booteel.memo`). If the
+        method is offloaded, it runs in a thread or process pool while the
+        wrapper holds the locks of its shares (see
+        `research_assistant.booteel.offload`).
+        """
+        name = f"{self.eel_namespace}_{func.__name__}"
+        if isinstance(func, staticmethod):
+            func = func.__func__
+            partial_func = self._get_call(func)
+        else:
+            partial_func = self._get_call(partial(func, self))
+        if getattr(func, "eel_memoized", False):
+            key = getattr(func, "eel_memo_key", None)
+            partial_func = memoize_call(name, partial_func, key and partial(key, self))
+        metrics = get_rpc_metrics()
 
         @wraps(func)
         def eel_api_wrapper(*args: list[Any], **kwargs: dict[str, Any]) -> Any:
+            started = time.perf_counter()
+            error = None
+            result: Any = False
             try:
-                return partial_func(*args, **kwargs)
+                result = partial_func(*args, **kwargs)
+                return result
             except Exception as exc:
+                error = exc
                 self._handle_exception(exc)
                 return False
+            finally:
+                if metrics.enabled:
+                    metrics.record(name, time.perf_counter() - started, error, args, result)
 
         return eel_api_wrapper
 
+    def _get_call(self, func: Callable[..., Any]) -> Callable[..., Any]:
+        """Return a function calling the exposed method *func* in its mode, holding its shares."""
+        method = getattr(func, "func", func)
+        mode = getattr(method, "eel_offload", None)
+        shares = getattr(method, "eel_shares", ())
+        if mode is not None:
+            func = offload_module.offload_call(func, mode)
+        if not shares:
+            return func
+
+        def call(*args: Any, **kwargs: Any) -> Any:
+            with self.shared(shares):
+                return func(*args, **kwargs)
+
+        return call
+
+    def _call_exposed(self, method: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Call the exposed *method* of the API from another method, as Eel would.
+
+        Calling an exposed method directly runs it on gevent's event loop,
+        without holding the locks of its shares. Exposed methods calling an
+        offloaded method should call it with this method instead, so that it
+        runs in its mode holding the locks of its shares. Unlike a call via
+        Eel, the call isn't recorded in the RPC metrics and its exceptions are
+        propagated to the caller.
+        """
+        return self._get_call(method)(*args, **kwargs)
+
     def expose(self) -> None:
         """Expose the API defined by the class via Eel's JavaScript API."""
         funcs = self._get_exposed()
@@ -232,7 +345,11 @@ class EelAPI(ABC):
                         f"'eel.{name!s}' continues to point to {self.eel_api[name]}."
                     )
                     continue
-            eel._expose(name, func)
+            if getattr(eel._exposed_functions.get(name), "eel_api_stub", False):
+                # Replace the stub exposed in its place until the API was loaded
+                eel._exposed_functions[name] = func
+            else:
+                eel._expose(name, func)
             self.eel_api[name] = func
 
     @overload
@@ -240,22 +357,108 @@ class EelAPI(ABC):
         ...
 
     @overload
-    def exposed(func: None) -> dict[str, set[F]]:
+    def exposed(
+        func: None = None, *, offload: str | None = None, shares: Iterable[str] = ()
+    ) -> Callable[[F], F]:
         ...
 
-    def exposed(func: F, cache={}) -> F | dict[str, set[F]]:
-        """Decorator to mark a method for exposure via Eel's JavaScript API."""
+    def exposed(
+        func: F | None = None,
+        *,
+        offload: str | None = None,
+        shares: Iterable[str] = (),
+    ) -> F | Callable[[F], F]:
+        """Decorator to mark a method for exposure via Eel's JavaScript API.
+
+        Used without arguments (:code:`@EelAPI.exposed`), it marks the method
+        directly. Called with only *offload* and *shares*, it returns a
+        decorator marking the method with these options.
+
+        Arguments:
+            func: The method to expose.
+            offload: The mode to run the method in off gevent's event loop,
+                :code:`"thread"` or :code:`"process"` (see
+                `research_assistant.booteel.offload`). By default, the method
+                runs on the event loop.
+            shares: The names of the instance state the method touches. Calls
+                to methods sharing some state never overlap (see `shared()`).
+                Methods run in a thread must declare all the state they share
+                with the other methods of the API.
+        """
         if func is None:
-            return cache
-        qualname = func.__qualname__.split(".")
-        if len(qualname) < 2:
-            raise RuntimeError(
-                f"Qualified name of {func} does not contain identifiable parent class,"
-                " argument 'func' must be a bound method"
-            )
-        classname = qualname[-2]
-        if classname in cache:
-            cache[classname].add(func)
-        else:
-            cache[classname] = {func}
+            return partial(EelAPI.exposed, offload=offload, shares=shares)
+        offload_module.mark(func, offload, shares)
+        getattr(func, "__func__", func).eel_exposed = True
         return func
+
+    @exposed
+    def batch(self, calls: list[Any]) -> list[Any]:
+        """Run several calls to the API's exposed methods, in order, in a single round trip.
+
+        Each call goes through the wrapper of its method, so that it is
+        recorded and its exceptions are handled just as if it had been made on
+        its own (e.g. its result is `False` if the API's *exception_handler*
+        handled an exception).
+
+        Arguments:
+            calls: The calls to run, each a list of the name of an exposed
+                method (without the API's namespace) and, optionally, the list
+                of its arguments, e.g. :code:`[["get_trials"], ["get_traits"]]`.
+
+        Returns:
+            The results of the calls, in the same order.
+
+        Raises:
+            ValueError: Raised (before running any of the calls) if a call is
+                invalid or names a method that isn't exposed by the API.
+        """
+        funcs = [self._get_batch_call(call) for call in calls]
+        return [func(*args) for func, args in funcs]
+
+    @exposed
+    def fetch(self, method: str, args: list[Any] | None = None, etag: str | None = None) -> Any:
+        """Call a memoized method, sending its result only if it has changed since *etag*.
+
+        Arguments:
+            method: The name of an exposed method marked with
+                `research_assistant.booteel.memo.memoized()` (without the API's
+                namespace).
+            args: The arguments of the call.
+            etag: The etag of the result the caller already has, if any.
+
+        Returns:
+            A dictionary with the result's :code:`etag` and whether it was
+            :code:`modified`, and if so the result as :code:`value`. If the
+            call raised an exception that was handled by the API's
+            *exception_handler*, `False` is returned instead.
+
+        Raises:
+            ValueError: Raised if *method* isn't an exposed memoized method.
+        """
+        func = self.eel_api.get(f"{self.eel_namespace}_{method}")
+        if func is None or not getattr(func, "eel_memoized", False):
+            raise ValueError(
+                f"Method {method!r} is not memoized by the {self.eel_namespace!r} API."
+            )
+        result = func(*(args or []))
+        if not isinstance(result, EncodedResult):  # The exception handler's result
+            return result
+        if result.etag == etag:
+            return {"etag": etag, "modified": False}
+        return EncodedResult(
+            f'{{"etag": "{result.etag}", "modified": true, "value": {result.json}}}', result.etag
+        )
+
+    def _get_batch_call(self, call: Any) -> tuple[Callable[..., Any], list[Any]]:
+        """Return the wrapped method and arguments of a *call* in a batch (see `batch()`)."""
+        if not isinstance(call, (list, tuple)) or not 1 <= len(call) <= 2:
+            raise ValueError(f"Invalid batch call {call!r}, expected [method, args].")
+        name = f"{self.eel_namespace}_{call[0]}"
+        if call[0] == "batch" or name not in self.eel_api:
+            raise ValueError(
+                f"Method {call[0]!r} is not exposed by the {self.eel_namespace!r} API."
+            )
+        args = call[1] if len(call) > 1 else []
+        if not isinstance(args, (list, tuple)):
+            raise ValueError(f"Invalid arguments {args!r} for batch call to {call[0]!r}.")
+        return self.eel_api[name], list(args)
@@ -0,0 +1,148 @@
+"""Lifecycle of the app's backend: from its first window to its shutdown.
+
+The `Lifecycle` tracks the app's windows by the opening and closing of their
+websockets and shuts the backend down once no window has been open for a
+given delay. A single timer is started when the last websocket closes and
+cancelled as soon as another one opens (e.g. when the next page of a task is
+loaded), rather than polling for websockets.
+
+Before the backend exits, the lifecycle drains its pending work: it waits for
+the tasks it tracks (e.g. a data backup in progress) to finish, then runs its
+drain callbacks (e.g. flushing queued responses to storage) in the order they
+were added::
+
+    lifecycle = Lifecycle(lambda: config.shutdown_delay)
+    lifecycle.add_drain("flush responses", get_writer().flush)
+    lifecycle.install()
+    eel.start(..., close_callback=lifecycle.closed)
+    lifecycle.wait()  # Returns after draining, once the app should exit
+"""
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Callable
+
+import eel
+import gevent  # type: ignore
+from gevent.event import Event  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+class Lifecycle:
+    """Manager of the app backend's lifecycle, shutting it down once it is idle."""
+
+    delay: Callable[[], float]
+    _timer: gevent.Greenlet | None
+    _tasks: set[gevent.Greenlet]
+    _drains: list[tuple[str, Callable[[], Any]]]
+    _stopping: Event
+    reason: str | None
+
+    def __init__(self, delay: Callable[[], float]):
+        """Initialise the lifecycle of a backend shutting down *delay()* seconds after idling."""
+        self.delay = delay
+        self.reason = None
+        self._timer = None
+        self._tasks = set()
+        self._drains = []
+        self._stopping = Event()
+
+    @property
+    def stopping(self) -> bool:
+        """Whether the backend is shutting down."""
+        return self._stopping.is_set()
+
+    def install(self) -> None:
+        """Track the opening of Eel's websockets (must be called before `eel.start()`).
+
+        The closing of the websockets is tracked by passing `Lifecycle.closed()`
+        as the :code:`close_callback` to `eel.start()`.
+        """
+        route, options = eel.BOTTLE_ROUTES["/eel"]  # type: ignore
+        if getattr(route, "lifecycle", None) is self:
+            return
+
+        def websocket(ws: Any) -> None:
+            self.opened()
+            route(ws)
+
+        websocket.lifecycle = self  # type: ignore
+        eel.BOTTLE_ROUTES["/eel"] = (websocket, options)  # type: ignore
+
+    def opened(self) -> None:
+        """Record that a websocket has opened, cancelling a pending shutdown."""
+        if self._timer is not None:
+            logger.debug("Websocket opened, cancelling shutdown...")
+            self._timer.kill(block=False)
+            self._timer = None
+
+    def closed(self, page: str, sockets: list[Any]) -> None:
+        """Record that the websocket of *page* has closed (Eel's :code:`close_callback`).
+
+        Once no websockets are left open (*sockets*), the backend is shut down
+        after the lifecycle's delay unless another websocket opens first.
+        """
+        logger.debug(f"Socket closed: {page} ({len(sockets)} remaining)")
+        if sockets or self.stopping:
+            return
+        if self._timer is not None:
+            self._timer.kill(block=False)
+        delay = self.delay()
+        logger.debug(f"No websockets left, shutting down in {delay}s.")
+        self._timer = gevent.spawn_later(delay, self._idle)
+
+    def _idle(self) -> None:
+        self._timer = None
+        if eel._websockets:  # type: ignore # Opened while the timer fired
+            return
+        self.shutdown("no windows open")
+
+    def track(self, greenlet: gevent.Greenlet) -> gevent.Greenlet:
+        """Track the task run by *greenlet*, which must finish before the backend exits."""
+        self._tasks.add(greenlet)
+        greenlet.link(self._tasks.discard)
+        return greenlet
+
+    def spawn(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> gevent.Greenlet:
+        """Run *func* in a new greenlet tracked by the lifecycle (see `Lifecycle.track()`)."""
+        return self.track(gevent.spawn(func, *args, **kwargs))
+
+    def add_drain(self, name: str, callback: Callable[[], Any]) -> None:
+        """Add a *callback* draining pending work (named *name*) before the backend exits."""
+        self._drains.append((name, callback))
+
+    def shutdown(self, reason: str = "requested") -> None:
+        """Request the backend to shut down (for *reason*), waking `Lifecycle.wait()`."""
+        if self.stopping:
+            return
+        logger.info(f"App shutdown triggered ({reason})...")
+        self.reason = reason
+        if self._timer is not None:
+            self._timer.kill(block=False)
+            self._timer = None
+        self._stopping.set()
+
+    def drain(self) -> None:
+        """Wait for the tracked tasks to finish, then run the drain callbacks.
+
+        Errors raised by the callbacks are logged, so that the remaining
+        callbacks still run.
+        """
+        started = time.perf_counter()
+        if self._tasks:
+            logger.info(f"Waiting for {len(self._tasks)} task(s) in progress to finish...")
+            gevent.joinall(list(self._tasks))
+        for name, callback in self._drains:
+            logger.debug(f"Draining: {name}...")
+            try:
+                callback()
+            except Exception as e:  # Keep draining the remaining work
+                logger.error(f"Failed to {name} on shutdown: {e!s}")
+        logger.debug(f"Drained pending work in {time.perf_counter() - started:.3f}s.")
+
+    def wait(self) -> None:
+        """Block until the backend should shut down, then drain its pending work."""
+        self._stopping.wait()
+        self.drain()
@@ -0,0 +1,564 @@
+"""Discovery of the localisations available for a task.
+
+The localisations of a task are JSON files in the task's :code:`localisations`
+package, each with a :code:`meta` section naming the localisation's label
+(:code:`versionId`) and description (:code:`versionName`). Rather than parsing
+every localisation file to discover them, `discover_localisations()` reads a
+small metadata index listing the label and description from each file:
+
+    * When the app is built (see :code:`manage.py build`), an index is written
+      to :file:`_index.json` in each localisations package with
+      `write_index()`, recording a hash of each file's contents. The
+      modification times of installed files are those of their installation,
+      so this index is used as long as the same files with the same sizes and
+      contents are present.
+    * Otherwise (e.g. when running from source), the index is generated when
+      the localisations are first discovered and saved to a cache file. It is
+      regenerated whenever a localisation file is added, removed, or changes
+      its modification time or size.
+
+Once discovered, a localisation is loaded section by section (e.g. only the
+:code:`meta`, :code:`base` and :code:`lsb` sections for the first page of the
+LSBQe) from a `CompiledLocalisation`: a cache file holding each top-level
+section of the localisation as a separate marshal blob, preceded by a table of
+the sections' offsets. The cache file is recompiled whenever the hash of the
+localisation's source file changes.
+
+The loaded sections are kept in the process-wide `LocalisationCache` returned
+by `get_localisation_cache()`, shared by all tasks and bounded in size by the
+:code:`localisation_cache_size` setting.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import marshal
+import os
+import struct
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable
+
+from ..config import config
+from ..jsoncodec import get_codec
+
+if TYPE_CHECKING:
+    # Only available from Python 3.11 (`importlib.abc` before)
+    from importlib.resources.abc import Traversable
+
+logger = logging.getLogger(__name__)
+
+# Name of the metadata index in a localisations package. The leading underscore
+# marks it as private, so that it is never mistaken for a localisation.
+INDEX_FILENAME = "_index.json"
+
+# Version of the index format, increased on incompatible changes.
+INDEX_FORMAT = 2
+
+# Magic number and version of the compiled localisation format, followed in
+# the file by the length of the (marshalled) offset table.
+COMPILED_MAGIC = b"RALC"
+COMPILED_FORMAT = 1
+_COMPILED_PREFIX = struct.Struct("<4sI")
+
+
+def _is_localisation(name: str) -> bool:
+    """Check whether *name* is the file name of a (public) localisation."""
+    return name[0] not in ("_", ".") and name.endswith(".json")
+
+
+def _stat_localisations(directory: Path) -> dict[str, tuple[int, int]]:
+    """Return the size and modification time of each localisation file in *directory*."""
+    stats: dict[str, tuple[int, int]] = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if _is_localisation(entry.name) and entry.is_file():
+                stat = entry.stat()
+                stats[entry.name] = (stat.st_size, stat.st_mtime_ns)
+    return stats
+
+
+def fingerprint_localisations(directory: Traversable) -> str:
+    """Return a fingerprint of the localisation files in the localisations package *directory*.
+
+    The fingerprint changes whenever a localisation file is added, removed or
+    modified. It is empty for resources not on the file system (e.g. in a zip
+    archive), which can't change.
+    """
+    if not isinstance(directory, Path):
+        return ""
+    stats = sorted(_stat_localisations(directory).items())
+    return hashlib.blake2b(repr(stats).encode("utf-8"), digest_size=12).hexdigest()
+
+
+def _hash_file(item: Traversable) -> str | None:
+    """Return the hash of the contents of the file *item* (`None` if it can't be read)."""
+    try:
+        return hashlib.blake2b(item.read_bytes(), digest_size=16).hexdigest()
+    except OSError:
+        return None
+
+
+def read_metadata(fp: Any) -> tuple[str, str] | None:
+    """Read the label and description of the localisation in the open file *fp*.
+
+    Returns:
+        The label and description, or `None` if the localisation's
+        :code:`meta` section lacks either of them.
+    """
+    meta = get_codec().loads(fp.read()).get("meta", {})
+    if "versionId" in meta and "versionName" in meta:
+        return str(meta["versionId"]), str(meta["versionName"])
+    return None
+
+
+def build_index(directory: Traversable) -> dict[str, Any]:
+    """Build the metadata index of the localisations in *directory*.
+
+    Every localisation file is parsed once to read its label and description,
+    and recorded with its size, modification time and the hash of its
+    contents. Files that cannot be read or lack the required metadata are
+    recorded without a label, so that they are not parsed again until they
+    change.
+    """
+    stats = _stat_localisations(directory) if isinstance(directory, Path) else {}
+    files: dict[str, dict[str, Any]] = {}
+    for item in sorted(directory.iterdir(), key=lambda item: item.name):
+        if not (_is_localisation(item.name) and item.is_file()):
+            continue
+        size, mtime_ns = stats.get(item.name, (None, None))
+        entry: dict[str, Any] = {
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "hash": _hash_file(item),
+            "label": None,
+            "description": None,
+        }
+        metadata = _read_file_metadata(directory, item)
+        if metadata is not None:
+            entry["label"], entry["description"] = metadata
+        files[item.name] = entry
+    return {"format": INDEX_FORMAT, "files": files}
+
+
+def _read_file_metadata(directory: Traversable, item: Traversable) -> tuple[str, str] | None:
+    """Read the label and description of the localisation file *item* in *directory*.
+
+    Returns:
+        The label and description, or `None` if the file can't be read or lacks
+        them (which is logged).
+    """
+    try:
+        with item.open("r", encoding="utf-8") as fp:
+            metadata = read_metadata(fp)
+    except (OSError, ValueError, AttributeError) as e:
+        logger.error(f"Could not read localisation '{directory}/{item.name}': {e!s}")
+        return None
+    if metadata is None:
+        logger.error(
+            f"Resource '{directory}/{item.name}' is missing one of the required keys "
+            "'meta.versionId' or 'meta.versionName'."
+        )
+    return metadata
+
+
+def write_index(index: dict[str, Any], filename: Path) -> None:
+    """Save the metadata *index* to *filename*."""
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    tmpfile = filename.with_name(f"{filename.name}.tmp")
+    tmpfile.write_bytes(get_codec().dumpb(index))
+    tmpfile.replace(filename)
+
+
+def _save_index(index: dict[str, Any], filename: Path) -> None:
+    """Save the metadata *index* to *filename*, logging (rather than raising) any error."""
+    try:
+        write_index(index, filename)
+    except OSError as e:
+        logger.warning(f"Could not save localisation index '{filename}': {e!s}")
+
+
+def _read_index(filename: Path) -> dict[str, Any] | None:
+    """Read the metadata index in *filename*, if it exists and is valid."""
+    try:
+        index = get_codec().loads(filename.read_bytes())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable localisation index '{filename}': {e!s}")
+        return None
+    if not isinstance(index, dict) or index.get("format") != INDEX_FORMAT:
+        return None
+    return index
+
+
+def _is_current(
+    index: dict[str, Any], stats: dict[str, tuple[int, int]], check_mtime: bool
+) -> bool:
+    """Check whether *index* describes the localisation files with the given *stats*."""
+    files = index.get("files", {})
+    if files.keys() != stats.keys():
+        return False
+    return all(
+        files[name].get("size") == size
+        and (not check_mtime or files[name].get("mtime_ns") == mtime_ns)
+        for name, (size, mtime_ns) in stats.items()
+    )
+
+
+def _has_same_contents(index: dict[str, Any], directory: Path) -> bool:
+    """Check whether the localisation files in *directory* have the hashes recorded in *index*."""
+    return all(
+        entry.get("hash") == _hash_file(directory / name)
+        for name, entry in index["files"].items()
+    )
+
+
+def _labels(index: dict[str, Any]) -> dict[str, str]:
+    return {
+        entry["label"]: entry["description"]
+        for entry in index["files"].values()
+        if entry["label"] is not None
+    }
+
+
+def _current_index(
+    directory: Path, stats: dict[str, tuple[int, int]], cache_file: Path | None
+) -> dict[str, Any] | None:
+    """Return the shipped or cached index of *directory*, if either is up to date.
+
+    The index shipped in *directory* is checked by the files' sizes and the
+    hashes of their contents (as their modification times are set when the
+    package is installed), the *cache_file* generated at runtime by their
+    sizes and modification times.
+    """
+    index = _read_index(directory / INDEX_FILENAME)
+    if (
+        index is not None
+        and _is_current(index, stats, check_mtime=False)
+        and _has_same_contents(index, directory)
+    ):
+        return index
+    if cache_file is not None:
+        index = _read_index(cache_file)
+        if index is not None and _is_current(index, stats, check_mtime=True):
+            return index
+    return None
+
+
+def discover_localisations(
+    directory: Traversable, cache_file: Path | None = None, force: bool = False
+) -> dict[str, str]:
+    """Discover the localisations in the localisations package *directory*.
+
+    Arguments:
+        directory: The localisations package (see
+            `importlib.resources.files()`).
+        cache_file: The file in which the index generated at runtime is
+            cached, if any.
+        force: Whether to regenerate the index even if it is up to date.
+
+    Returns:
+        A dictionary with the localisations' labels as keys and their
+        descriptions as values.
+    """
+    if not isinstance(directory, Path):
+        # Resources not on the file system (e.g. in a zip archive) can't be
+        # checked for changes, so they are always read in full.
+        return _labels(build_index(directory))
+    stats = _stat_localisations(directory)
+    if not force:
+        index = _current_index(directory, stats, cache_file)
+        if index is not None:
+            return _labels(index)
+    logger.debug(f"Generating localisation index for '{directory}'.")
+    index = build_index(directory)
+    if cache_file is not None:
+        _save_index(index, cache_file)
+    return _labels(index)
+
+
+def _absolute_offsets(
+    offsets: dict[str, tuple[int, int]], table_length: int
+) -> dict[str, tuple[int, int]]:
+    start = _COMPILED_PREFIX.size + table_length
+    return {section: (start + offset, size) for section, (offset, size) in offsets.items()}
+
+
+class CompiledLocalisation:
+    """A localisation whose sections are loaded independently from a cache file.
+
+    The cache file starts with a table of the offset and length of each
+    top-level section of the localisation, followed by the sections as marshal
+    blobs, so that loading a section takes a single seek and read. The table
+    records the SHA-256 hash of the source file it was compiled from, and the
+    cache file is recompiled when the source changes.
+
+    If the cache file cannot be written, the sections are kept in memory.
+    """
+
+    label: str
+    cache_file: Path
+    source_hash: str
+    _offsets: dict[str, tuple[int, int]]
+    _data: dict[str, Any] | None
+
+    def __init__(
+        self,
+        label: str,
+        cache_file: Path,
+        source_hash: str,
+        offsets: dict[str, tuple[int, int]],
+        data: dict[str, Any] | None = None,
+    ):
+        """Initialise a compiled localisation (see `CompiledLocalisation.open()`)."""
+        self.label = label
+        self.cache_file = cache_file
+        self.source_hash = source_hash
+        self._offsets = offsets
+        self._data = data
+
+    @classmethod
+    def open(cls, source: Traversable, cache_file: Path) -> CompiledLocalisation:
+        """Open the localisation in the file *source*, compiled to *cache_file*.
+
+        The localisation is (re)compiled if *cache_file* does not exist or was
+        compiled from a different version of *source*.
+
+        Raises:
+            OSError: Raised if *source* cannot be read.
+            ValueError: Raised if *source* is not valid JSON or not a JSON object.
+        """
+        label = source.name.removesuffix(".json")
+        source_bytes = source.read_bytes()
+        source_hash = hashlib.sha256(source_bytes).hexdigest()
+        offsets = cls._read_offsets(cache_file, source_hash)
+        if offsets is not None:
+            return cls(label, cache_file, source_hash, offsets)
+        data = get_codec().loads(source_bytes)
+        if not isinstance(data, dict):
+            raise ValueError("invalid format")
+        try:
+            offsets = cls._compile(data, cache_file, source_hash)
+        except OSError as e:
+            logger.warning(f"Could not save compiled localisation '{cache_file}': {e!s}")
+            return cls(label, cache_file, source_hash, {}, data)
+        logger.debug(f"Compiled localisation '{label}' to '{cache_file}'.")
+        return cls(label, cache_file, source_hash, offsets)
+
+    @staticmethod
+    def _read_offsets(cache_file: Path, source_hash: str) -> dict[str, tuple[int, int]] | None:
+        """Read the offset table of *cache_file*, if it was compiled from *source_hash*."""
+        try:
+            with cache_file.open("rb") as fp:
+                magic, length = _COMPILED_PREFIX.unpack(fp.read(_COMPILED_PREFIX.size))
+                if magic != COMPILED_MAGIC:
+                    return None
+                version, marshal_version, file_hash, offsets = marshal.loads(fp.read(length))
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError, TypeError, struct.error) as e:
+            logger.warning(f"Ignoring unreadable compiled localisation '{cache_file}': {e!s}")
+            return None
+        if (version, marshal_version, file_hash) != (
+            COMPILED_FORMAT, marshal.version, source_hash
+        ):
+            return None
+        return _absolute_offsets(offsets, length)
+
+    @staticmethod
+    def _compile(
+        data: dict[str, Any], cache_file: Path, source_hash: str
+    ) -> dict[str, tuple[int, int]]:
+        """Write the sections of *data* to *cache_file* and return their offsets."""
+        blobs = {section: marshal.dumps(value) for section, value in data.items()}
+        # Offsets are stored relative to the end of the table and made absolute
+        # when the table is read.
+        offsets: dict[str, tuple[int, int]] = {}
+        position = 0
+        for section, blob in blobs.items():
+            offsets[section] = (position, len(blob))
+            position += len(blob)
+        table = marshal.dumps((COMPILED_FORMAT, marshal.version, source_hash, offsets))
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmpfile = cache_file.with_name(f"{cache_file.name}.tmp")
+        with tmpfile.open("wb") as fp:
+            fp.write(_COMPILED_PREFIX.pack(COMPILED_MAGIC, len(table)))
+            fp.write(table)
+            for blob in blobs.values():
+                fp.write(blob)
+        tmpfile.replace(cache_file)
+        return _absolute_offsets(offsets, len(table))
+
+    @property
+    def sections(self) -> list[str]:
+        """The names of the localisation's sections."""
+        return list(self._data if self._data is not None else self._offsets)
+
+    def __contains__(self, section: object) -> bool:
+        """Check whether the localisation has a section named *section*."""
+        return section in (self._data if self._data is not None else self._offsets)
+
+    def load(self, sections: Iterable[str]) -> dict[str, Any]:
+        """Load the given *sections*, ignoring those the localisation lacks.
+
+        Raises:
+            OSError: Raised if the cache file cannot be read.
+            ValueError: Raised if the cache file is corrupted.
+        """
+        if self._data is not None:
+            return {section: self._data[section] for section in sections if section in self._data}
+        loaded: dict[str, Any] = {}
+        wanted = [section for section in sections if section in self._offsets]
+        if not wanted:
+            return loaded
+        with self.cache_file.open("rb") as fp:
+            for section in wanted:
+                offset, size = self._offsets[section]
+                fp.seek(offset)
+                try:
+                    loaded[section] = marshal.loads(fp.read(size))
+                except (EOFError, TypeError) as e:
+                    raise ValueError(f"corrupted section {section!r}: {e!s}") from e
+        return loaded
+
+
+def _intern(value: Any) -> tuple[Any, int]:
+    """Intern the strings in the section *value* and estimate its size in bytes.
+
+    Returns:
+        The section with its strings (including dictionary keys) replaced by
+        their interned copies, and the estimated size of the section.
+    """
+    if isinstance(value, str):
+        return sys.intern(value), sys.getsizeof(value)
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        interned: dict[str, Any] = {}
+        for key, item in value.items():
+            key, key_size = _intern(key)
+            interned[key], item_size = _intern(item)
+            size += key_size + item_size
+        return interned, size
+    if isinstance(value, list):
+        items = []
+        for item in value:
+            item, item_size = _intern(item)
+            items.append(item)
+            size += item_size
+        return items, size
+    return value, size
+
+
+class LocalisationCache:
+    """Process-wide LRU cache of the loaded sections of localisations.
+
+    Sections are cached by the source hash of their localisation and their
+    name, so that identical localisations are cached only once (whichever
+    task loads them) and changed localisations are never served from stale
+    entries. The strings in cached sections are interned, so that text
+    repeated across localisations (e.g. the consent text shared by several
+    task groups) is held in memory once.
+
+    When the estimated size of the cached sections exceeds *max_size* bytes,
+    the least recently used sections are evicted. Sections larger than
+    *max_size* are loaded but not cached.
+    """
+
+    max_size: int
+    size: int
+    hits: int
+    misses: int
+    evictions: int
+    _entries: OrderedDict[tuple[str, str], tuple[Any, int]]
+
+    def __init__(self, max_size: int):
+        """Initialise an empty cache holding at most *max_size* bytes of sections."""
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, localisation: CompiledLocalisation, sections: Iterable[str]) -> dict[str, Any]:
+        """Return the given *sections* of *localisation*, loading them if not cached.
+
+        Sections the localisation lacks are ignored.
+
+        Raises:
+            OSError: Raised if the sections cannot be loaded.
+            ValueError: Raised if the compiled localisation is corrupted.
+        """
+        sections = [section for section in sections if section in localisation]
+        found: dict[str, Any] = {}
+        missing: list[str] = []
+        with self._lock:
+            for section in sections:
+                key = (localisation.source_hash, section)
+                entry = self._entries.get(key)
+                if entry is None:
+                    missing.append(section)
+                    self.misses += 1
+                else:
+                    self._entries.move_to_end(key)
+                    found[section] = entry[0]
+                    self.hits += 1
+        if missing:
+            loaded = localisation.load(missing)
+            with self._lock:
+                for section, value in loaded.items():
+                    found[section] = self._store((localisation.source_hash, section), value)
+        return {section: found[section] for section in sections}
+
+    def _store(self, key: tuple[str, str], value: Any) -> Any:
+        """Add the section *value* to the cache as *key*, evicting sections as needed."""
+        value, size = _intern(value)
+        if size > self.max_size:
+            return value
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= previous[1]
+        self._entries[key] = (value, size)
+        self.size += size
+        while self.size > self.max_size:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+        return value
+
+    def clear(self) -> None:
+        """Remove all sections from the cache (the statistics are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self) -> dict[str, int]:
+        """Return the cache's hit, miss and eviction counts and its current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "sections": len(self._entries),
+                "size": self.size,
+                "max_size": self.max_size,
+            }
+
+
+_cache: LocalisationCache | None = None
+
+
+def get_localisation_cache() -> LocalisationCache:
+    """Return the app's shared `LocalisationCache`, creating it on first use.
+
+    The cache's size is set by the :code:`localisation_cache_size` setting
+    (in MiB).
+    """
+    global _cache
+    if _cache is None:
+        _cache = LocalisationCache(config.localisation_cache_size * 1024 * 1024)
+    return _cache
@@ -0,0 +1,219 @@
+"""Memoization of the JSON-encoded results of read-only exposed methods.
+
+Methods of an `EelAPI` that return the same (often large) results for the
+same arguments, e.g. a task's localisations, can be marked with `memoized()`
+below `EelAPI.exposed`. Calls to such a method via Eel then return an
+`EncodedResult`, which holds the result already encoded as JSON and is kept
+in the app's `ResultCache`, so that repeated calls neither run the method nor
+encode its result again. `install()` replaces Eel's encoder of websocket
+messages with `encode_message()`, which splices encoded results into the
+messages as they are, and has Eel decode the messages it receives with the
+app's JSON codec (see `research_assistant.jsoncodec`)::
+
+    class MyAPI(EelAPI):
+
+        @EelAPI.exposed
+        @memoized(key=lambda self, label: (self.version(), label))
+        def load(self, label: str) -> dict[str, Any]:
+            ...
+
+Calls from Python (e.g. :code:`api.load("en")`) are not affected.
+
+Each encoded result has an *etag* (a hash of its JSON), with which the
+frontend can make conditional calls to memoized methods through the API's
+:code:`fetch` method (see `EelAPI.fetch()` and :code:`booteel.fetch()` in
+:file:`booteel.js`): if the result hasn't changed, only a "not modified"
+reply is sent.
+
+The cache is cleared whenever the app's settings are saved. Results that
+depend on other state (e.g. the localisation files) must include a version of
+that state in their *key*.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import re
+import secrets
+import threading
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Callable, Hashable, TypeVar
+
+import eel
+
+from ..config import config
+from ..jsoncodec import JSONCodec, get_codec
+
+logger = logging.getLogger(__name__)
+
+# TypeVar for memoized methods
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Maximum number of encoded results kept in the cache.
+MAX_ENTRIES = 256
+
+# Placeholder for encoded results in messages, replaced by their JSON once the
+# rest of the message has been encoded. The random token keeps strings sent to
+# the frontend from being mistaken for placeholders. Both JSON codecs escape the
+# leading NUL character as in the pattern.
+_PLACEHOLDER = f"\x00{secrets.token_hex(8)}:"
+_PLACEHOLDER_PATTERN = re.compile(
+    re.escape(json.dumps(_PLACEHOLDER)[:-1]) + r'(\d+)"'
+)
+
+
+class EncodedResult:
+    """Result of a call to an exposed method, encoded as JSON."""
+
+    __slots__ = ("json", "etag")
+
+    json: str
+    etag: str
+
+    def __init__(self, json: str, etag: str | None = None):
+        """Initialise an encoded result with the given *json* (and *etag*, its hash by default)."""
+        self.json = json
+        self.etag = etag or hashlib.blake2b(json.encode("utf-8"), digest_size=12).hexdigest()
+
+    @classmethod
+    def encode(cls, value: Any) -> EncodedResult:
+        """Encode *value* as JSON (as Eel would, i.e. with unsupported objects as `None`)."""
+        return cls(encode_message(value))
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(etag={self.etag!r}, size={len(self.json)})"
+
+
+def encode_message(obj: Any, codec: JSONCodec | None = None) -> str:
+    """Encode the websocket message *obj* as JSON, splicing in any `EncodedResult`.
+
+    The message is encoded with *codec*, by default the app's JSON codec.
+    Objects that can't be encoded are encoded as `None`, as by Eel's own
+    encoder.
+    """
+    encoded: list[str] = []
+
+    def default(o: Any) -> Any:
+        if isinstance(o, EncodedResult):
+            encoded.append(o.json)
+            return f"{_PLACEHOLDER}{len(encoded) - 1}"
+        return None
+
+    message = (codec or get_codec()).dumps(obj, default=default)
+    if encoded:
+        message = _PLACEHOLDER_PATTERN.sub(lambda match: encoded[int(match[1])], message)
+    return message
+
+
+def install() -> None:
+    """Encode Eel's websocket messages with `encode_message()` and decode them with the codec."""
+    eel._safe_json = encode_message  # type: ignore
+    eel.jsn = get_codec()  # type: ignore
+
+
+class ResultCache:
+    """Process-wide LRU cache of encoded results, by method and key."""
+
+    max_entries: int
+    hits: int
+    misses: int
+    _entries: OrderedDict[Hashable, EncodedResult]
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        """Initialise an empty cache holding at most *max_entries* results."""
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, compute: Callable[[], Any]) -> EncodedResult:
+        """Return the result cached as *key*, computing and encoding it with *compute()* if needed.
+
+        Exceptions raised by *compute()* are propagated (and nothing is cached).
+        """
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+        result = EncodedResult.encode(compute())
+        with self._lock:
+            self._entries[key] = result
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def invalidate(self) -> None:
+        """Remove all results from the cache (the statistics are kept)."""
+        with self._lock:
+            self._entries.clear()
+        logger.debug("Cleared the memoized results of exposed methods.")
+
+    def stats(self) -> dict[str, int]:
+        """Return the cache's hit and miss counts and its current number of results."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+_cache: ResultCache | None = None
+
+
+def get_result_cache() -> ResultCache:
+    """Return the app's shared `ResultCache`, creating it on first use.
+
+    The cache is cleared whenever the app's settings are saved.
+    """
+    global _cache
+    if _cache is None:
+        _cache = ResultCache()
+        config.on_save(_cache.invalidate)
+    return _cache
+
+
+def memoized(
+    func: F | None = None, *, key: Callable[..., Hashable | None] | None = None
+) -> Any:
+    """Decorator marking an exposed method as read-only, so that its encoded results are cached.
+
+    Arguments:
+        func: The method to mark.
+        key: Optional function called with the same arguments as the method,
+            returning the key its result is cached by within the method (or
+            `None` if the result shouldn't be cached). By default, results are
+            cached by the method's arguments.
+    """
+    def decorator(func: F) -> F:
+        func.eel_memoized = True  # type: ignore
+        func.eel_memo_key = key  # type: ignore
+        return func
+
+    return decorator(func) if func is not None else decorator
+
+
+def memoize_call(
+    name: str, func: Callable[..., Any], key: Callable[..., Hashable | None] | None = None
+) -> Callable[..., Any]:
+    """Return a function calling *func* (exposed as *name*) through the result cache.
+
+    The function returns the encoded result of the call, cached by *name*
+    and the result of *key* (called with the call's arguments), or by the
+    arguments themselves if *key* is `None`. If *key* returns `None`, the
+    result is encoded but not cached.
+    """
+    cache = get_result_cache()
+
+    def call(*args: Any, **kwargs: Any) -> Any:
+        if key is None:
+            call_key: Hashable | None = json.dumps([args, kwargs], sort_keys=True, default=str)
+        else:
+            call_key = key(*args, **kwargs)
+        if call_key is None:
+            return EncodedResult.encode(func(*args, **kwargs))
+        return cache.get((name, call_key), partial(func, *args, **kwargs))
+
+    return call
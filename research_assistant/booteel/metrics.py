@@ -0,0 +1,220 @@
+"""Instrumentation of the calls to the methods exposed by the app's Eel APIs.
+
+Every call from JavaScript to a method exposed with `EelAPI` (e.g.
+:code:`lsbqe_add_club` or :code:`agt_add_ratings`) goes through the method's
+wrapper, which records it in the app's `RpcMetrics` (returned by
+`get_rpc_metrics()`). The metrics are kept per method, depending on the
+:code:`rpc_metrics` logging setting:
+
+    * :code:`off`: Nothing is recorded.
+    * :code:`basic`: The number of calls, the number of calls that raised an
+      exception (by exception type) and a histogram of the calls' latencies,
+      from which their 50th, 95th and 99th percentiles are estimated. This
+      costs about a microsecond per call and is safe to leave on.
+    * :code:`detailed`: Additionally, the sizes of the calls' arguments and
+      results encoded as JSON, as sent over the websocket. This encodes each
+      payload a second time, so it is meant for diagnosis only.
+
+On shutdown, the metrics are dumped to a JSON file in the path for log files
+(:file:`rpc_metrics_*.json`) with `RpcMetrics.dump()`, keeping as many of
+these files as log files.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import threading
+from bisect import bisect_left
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from ..config import config
+from .memo import encode_message
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (in seconds) of the buckets of the latency histograms, growing
+# by a quarter from 10µs to about 7 minutes (a last bucket catches the rest),
+# so that percentiles are estimated within 25%.
+LATENCY_BUCKETS: tuple[float, ...] = tuple(1e-5 * 1.25**i for i in range(80))
+
+# Percentiles of the latencies included in the metrics.
+PERCENTILES = (50, 95, 99)
+
+# Modes of the metrics, from least to most detailed.
+MODES = ("off", "basic", "detailed")
+
+# Name of the files the metrics are dumped to (formatted with a timestamp).
+DUMP_FILENAME = "rpc_metrics_{:%Y%m%dT%H%M%S_%f}.json"
+
+
+def _json_size(payload: Any) -> int:
+    """Return the size of *payload* encoded as JSON (0 if it can't be encoded)."""
+    try:
+        return len(encode_message(payload))
+    except (TypeError, ValueError):
+        return 0
+
+
+class MethodMetrics:
+    """Metrics of the calls to an exposed method."""
+
+    calls: int
+    errors: dict[str, int]
+    total_time: float
+    max_time: float
+    histogram: list[int]
+    args_bytes: int
+    result_bytes: int
+
+    def __init__(self) -> None:
+        """Initialise the metrics of a method that hasn't been called yet."""
+        self.calls = 0
+        self.errors = {}
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.args_bytes = 0
+        self.result_bytes = 0
+
+    def record(self, elapsed: float, error: BaseException | None = None) -> None:
+        """Record a call that took *elapsed* seconds (and raised *error*)."""
+        self.calls += 1
+        self.total_time += elapsed
+        if elapsed > self.max_time:
+            self.max_time = elapsed
+        self.histogram[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+        if error is not None:
+            name = type(error).__name__
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def percentile(self, percent: float) -> float:
+        """Estimate the *percent* percentile of the latencies (the bound of its bucket)."""
+        rank = self.calls * percent / 100
+        count = 0
+        for bucket, bucket_count in enumerate(self.histogram[:-1]):
+            count += bucket_count
+            if count >= rank:
+                return min(LATENCY_BUCKETS[bucket], self.max_time)
+        return self.max_time
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the metrics as a dictionary (with times in milliseconds)."""
+        metrics: dict[str, Any] = {
+            "calls": self.calls,
+            "errors": sum(self.errors.values()),
+            "errorTypes": dict(self.errors),
+            "meanMs": self.total_time / self.calls * 1e3 if self.calls else 0.0,
+            "maxMs": self.max_time * 1e3,
+        }
+        for percent in PERCENTILES:
+            metrics[f"p{percent}Ms"] = self.percentile(percent) * 1e3
+        if self.args_bytes or self.result_bytes:
+            metrics["argsBytes"] = self.args_bytes
+            metrics["resultBytes"] = self.result_bytes
+        return metrics
+
+
+class RpcMetrics:
+    """Metrics of the calls to the methods exposed by the app's Eel APIs."""
+
+    mode: str
+    methods: dict[str, MethodMetrics]
+    started: datetime
+
+    def __init__(self, mode: str = "basic"):
+        """Initialise metrics recording calls in *mode* (one of `MODES`).
+
+        Raises:
+            ValueError: Raised if *mode* is not a valid mode.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Invalid RPC metrics mode {mode!r}, must be one of {MODES}.")
+        self.mode = mode
+        self.methods = {}
+        self.started = datetime.now()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether calls are recorded."""
+        return self.mode != "off"
+
+    def record(
+        self,
+        name: str,
+        elapsed: float,
+        error: BaseException | None = None,
+        args: Any = None,
+        result: Any = None,
+    ) -> None:
+        """Record a call to the method exposed as *name*.
+
+        Arguments:
+            name: The name the method is exposed as.
+            elapsed: The duration of the call in seconds.
+            error: The exception raised by the call, if any.
+            args: The arguments of the call (only measured in detailed mode).
+            result: The result of the call (only measured in detailed mode).
+        """
+        if self.mode == "detailed":
+            args_bytes, result_bytes = _json_size(args), _json_size(result)
+        else:
+            args_bytes = result_bytes = 0
+        with self._lock:
+            metrics = self.methods.get(name)
+            if metrics is None:
+                metrics = self.methods[name] = MethodMetrics()
+            metrics.record(elapsed, error)
+            metrics.args_bytes += args_bytes
+            metrics.result_bytes += result_bytes
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the metrics of all methods called so far as a dictionary."""
+        with self._lock:
+            methods = {name: self.methods[name].as_dict() for name in sorted(self.methods)}
+        return {
+            "mode": self.mode,
+            "started": self.started.isoformat(),
+            "ended": datetime.now().isoformat(),
+            "methods": methods,
+        }
+
+    def dump(self, path: Path | None = None) -> Path | None:
+        """Write the metrics to a JSON file in the directory *path* and return its path.
+
+        By default, the file is written to the path for log files, removing
+        the oldest metrics files beyond the maximum number of log files kept.
+        Nothing is written if no calls have been recorded.
+        """
+        if not self.methods:
+            return None
+        path = path or config.paths.logs
+        path.mkdir(parents=True, exist_ok=True)
+        previous = sorted(path.glob(DUMP_FILENAME.split("{", 1)[0] + "*.json"))
+        for old in previous[:max(len(previous) - config.logging.max_files + 1, 0)]:
+            old.unlink(missing_ok=True)
+        filepath = path / DUMP_FILENAME.format(datetime.now())
+        filepath.write_text(json.dumps(self.snapshot(), indent=2), encoding="utf-8")
+        logger.info(f"Dumped the metrics of {len(self.methods)} RPC method(s) to '{filepath}'.")
+        return filepath
+
+
+_metrics: RpcMetrics | None = None
+
+
+def get_rpc_metrics() -> RpcMetrics:
+    """Return the app's `RpcMetrics`, creating them on first use.
+
+    The mode of the metrics is set by the :code:`rpc_metrics` logging setting
+    (recording nothing if the setting is invalid).
+    """
+    global _metrics
+    if _metrics is None:
+        try:
+            _metrics = RpcMetrics(config.logging.rpc_metrics)
+        except ValueError as e:
+            logger.warning(f"{e!s} Not recording RPC metrics.")
+            _metrics = RpcMetrics("off")
+    return _metrics
@@ -0,0 +1,177 @@
+"""Execution of CPU-heavy exposed methods off gevent's event loop.
+
+Calls from JavaScript to the methods exposed by an `EelAPI` run as greenlets
+on the thread running gevent's hub, so a method doing CPU-bound work (e.g.
+validating a large response) stalls all other websocket traffic until it
+returns. Such methods can opt into running elsewhere when they are exposed::
+
+    class MyAPI(EelAPI):
+
+        @EelAPI.exposed(offload="thread", shares=("_response_data",))
+        def store(self, response_id: str) -> bool:
+            ...
+
+        @EelAPI.exposed(offload="process")
+        @staticmethod
+        def score(answers: list[int]) -> float:
+            ...
+
+The offloaded method then runs in one of the following *modes*, while the
+greenlet handling the call waits for its result without blocking the hub:
+
+    * :code:`thread`: In gevent's thread pool. The method runs in parallel to
+      the event loop only while it releases the GIL (e.g. in pydantic's core,
+      file I/O or compression), but no longer holds up other calls while it
+      runs. It must not use gevent (e.g. greenlets, gevent queues and
+      `AsyncResult` objects) or Eel directly, but can run such code on the
+      hub with `on_hub()`.
+    * :code:`process`: In a pool of worker processes (see
+      `get_process_pool()`), for pure functions: the method must be a
+      `staticmethod`, and its arguments and result must be picklable.
+
+The instance state an offloaded method touches must be declared as its
+*shares*, the names of the state (usually the names of the attributes
+holding it). Each exposed method with shares holds the API's lock for each
+of them while it is called (see `EelAPI.shared()`), so that calls to methods
+sharing some state never overlap. Code touching the state on the hub outside
+of an exposed method with the same shares should hold the locks, too.
+Methods running in the process mode can't share any state.
+"""
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Iterable, TypeVar
+
+import gevent
+from gevent.hub import Hub
+
+logger = logging.getLogger(__name__)
+
+# TypeVar for functions run on the hub
+T = TypeVar("T")
+
+# Modes offloaded methods can run in.
+MODES = ("thread", "process")
+
+# Maximum number of worker processes in the process pool.
+MAX_PROCESSES = min(4, os.cpu_count() or 1)
+
+# Hub of the event loop the exposed methods are called from.
+_hub: Hub | None = None
+
+_process_pool: ProcessPoolExecutor | None = None
+
+
+def mark(func: Any, mode: str | None = None, shares: Iterable[str] = ()) -> None:
+    """Mark the method *func* to be run in *mode* holding the locks for its *shares*.
+
+    Raises:
+        ValueError: Raised if *mode* is not one of `MODES`, or if a method
+            run in the :code:`process` mode is not a `staticmethod` or
+            declares shares.
+    """
+    shares = tuple(shares)
+    if mode is not None and mode not in MODES:
+        raise ValueError(f"Invalid offload mode {mode!r} for {func!r}, must be one of {MODES}.")
+    if mode == "process" and (shares or not isinstance(func, staticmethod)):
+        raise ValueError(
+            f"Method {func!r} can't be offloaded to a process: only static methods "
+            "sharing no state can run in the process pool."
+        )
+    target = getattr(func, "__func__", func)
+    target.eel_offload = mode
+    target.eel_shares = shares
+
+
+def offload_call(func: Callable[..., Any], mode: str) -> Callable[..., Any]:
+    """Return a function running *func* in *mode* and waiting for its result.
+
+    The returned function must be called in a greenlet on the thread running
+    gevent's hub, which keeps running other greenlets while it waits.
+    Exceptions raised by *func* are propagated.
+    """
+    global _hub
+    _hub = gevent.get_hub()
+
+    if mode == "process":
+        return partial(run_in_process, func)
+    return partial(_run_in_thread, func)
+
+
+def run_in_process(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Call *func* in the process pool, waiting for its result (or raising its exception).
+
+    Must be called in a greenlet on the thread running gevent's hub, which
+    keeps running other greenlets while it waits. *func* runs on the main
+    thread of a worker process, so it may use GUI toolkits like Tk, and it
+    and its arguments must be picklable.
+    """
+    future = get_process_pool().submit(func, *args, **kwargs)
+    return _run_in_thread(future.result)
+
+
+def _run_in_thread(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Call *func* in gevent's thread pool, waiting for its result (or raising its exception).
+
+    Exceptions are passed back to the caller rather than raised in the
+    worker thread, where gevent would report them as unhandled errors.
+    """
+    def run() -> tuple[Any, BaseException | None]:
+        try:
+            return func(*args, **kwargs), None
+        except Exception as exc:
+            return None, exc
+
+    result, error = gevent.get_hub().threadpool.apply(run)
+    if error is not None:
+        raise error
+    return result
+
+
+def on_hub(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Call *func* in a greenlet on the hub and return its result (or raise its exception).
+
+    Lets methods running in the :code:`thread` mode use gevent or Eel. If
+    called on the hub's thread already, *func* is simply called.
+    """
+    if _hub is None or _hub.thread_ident == threading.get_ident():
+        return func(*args, **kwargs)
+    future: Future[T] = Future()
+
+    def run() -> None:
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as exc:
+            future.set_exception(exc)
+
+    _hub.loop.run_callback_threadsafe(gevent.spawn, run)
+    return future.result()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Return the pool of worker processes for offloaded methods, starting it on first use.
+
+    The worker processes are spawned (rather than forked from the process
+    running the app) and stopped with `shutdown()`.
+    """
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=MAX_PROCESSES, mp_context=multiprocessing.get_context("spawn")
+        )
+        logger.debug(f"Started a pool of up to {MAX_PROCESSES} worker process(es).")
+    return _process_pool
+
+
+def shutdown() -> None:
+    """Stop the worker processes of the process pool, if it was started."""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown()
+        _process_pool = None
+        logger.debug("Stopped the worker processes.")
@@ -0,0 +1,310 @@
+"""Server-side rendering of localised task pages.
+
+Task pages mark their localisable elements with a :code:`data-{task}-tr`
+attribute giving the translation ID (e.g. :code:`data-lsbqe-tr="lsb.title"`),
+which the frontend's :code:`lart.tr` module substitutes once the localisation
+has been fetched over Eel. The `PageRenderer` instead renders the page's Jinja
+template and substitutes the localised strings on the server, so that a page
+requested with the :code:`instance` of a response in progress arrives fully
+localised in a single HTTP response.
+
+Substituted elements have their :code:`data-{task}-tr` attribute renamed to
+:code:`data-{task}-tr-origin`, just as :code:`lart.tr` does, so that the
+frontend leaves them alone. Elements without a localised string are left as
+they are for the frontend to handle.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import re
+from collections import OrderedDict
+from html.parser import HTMLParser
+from typing import TYPE_CHECKING, Any, Callable, Mapping
+
+import bottle  # type: ignore
+import eel
+
+from .errors import TaskAPIException
+from .localisations import CompiledLocalisation, get_localisation_cache
+from .task_info import TaskRegistryError
+
+if TYPE_CHECKING:
+    from jinja2 import Environment as Jinja2Environment
+    from jinja2 import Template
+
+    from .task_api import ResearchTaskAPI
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of rendered pages kept in the render cache.
+RENDER_CACHE_SIZE = 64
+
+# Elements without content, which cannot be localised.
+_VOID_ELEMENTS = frozenset(
+    (
+        "area", "base", "br", "col", "embed", "hr", "img", "input",
+        "link", "meta", "param", "source", "track", "wbr",
+    )
+)
+
+
+class _TranslatableFinder(HTMLParser):
+    """Parser finding the (outermost) elements with a translation ID attribute."""
+
+    def __init__(self, attr: str):
+        super().__init__(convert_charrefs=False)
+        self.attr = attr
+        # Translatable elements as (tag start, content start, content end, trId).
+        self.found: list[tuple[int, int, int, str]] = []
+        self._line_offsets: list[int] = []
+        # The open translatable element as [tag, depth, tag start, content start, trId].
+        self._current: list[Any] | None = None
+
+    def find(self, html: str) -> list[tuple[int, int, int, str]]:
+        """Return the translatable elements in *html*."""
+        self._line_offsets = [0]
+        for line in html.splitlines(keepends=True):
+            self._line_offsets.append(self._line_offsets[-1] + len(line))
+        self.feed(html)
+        self.close()
+        return self.found
+
+    def _offset(self) -> int:
+        line, column = self.getpos()
+        return self._line_offsets[line - 1] + column
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if self._current is not None:
+            if tag == self._current[0]:
+                self._current[1] += 1
+            return
+        tr_id = dict(attrs).get(self.attr)
+        if not tr_id or tag in _VOID_ELEMENTS:
+            return
+        start = self._offset()
+        starttag = self.get_starttag_text() or ""
+        self._current = [tag, 1, start, start + len(starttag), tr_id]
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        pass  # Self-closing elements have no content to localise
+
+    def handle_endtag(self, tag: str) -> None:
+        if self._current is None or tag != self._current[0]:
+            return
+        self._current[1] -= 1
+        if self._current[1] == 0:
+            _, _, start, content_start, tr_id = self._current
+            self.found.append((start, content_start, self._offset(), tr_id))
+            self._current = None
+
+
+def _lookup(strings: Mapping[str, Any], tr_id: str) -> str | None:
+    """Look up the string for *tr_id* in the localisation sections *strings*.
+
+    This mirrors :code:`lart.tr.get()`: entries are either a string or a list
+    of the original string and, optionally, its localised version.
+    """
+    key, _, subkey = tr_id.partition(".")
+    entry = strings.get(key, {})
+    if not isinstance(entry, dict):
+        return None
+    value = entry.get(subkey)
+    if isinstance(value, list) and 0 < len(value) < 3:
+        value = value[-1]
+    return value if isinstance(value, str) and value else None
+
+
+def localise_html(html: str, ns: str, load: Callable[[set[str]], Mapping[str, Any]]) -> str:
+    """Substitute the localised strings in the elements of *html* marked for namespace *ns*.
+
+    Arguments:
+        html: The page's HTML.
+        ns: The translation namespace (the task name).
+        load: Callable returning the localisation sections with the given
+            names, e.g. using `research_assistant.booteel.localisations.LocalisationCache`.
+
+    Returns:
+        The localised HTML.
+    """
+    attr = f"data-{ns}-tr"
+    found = _TranslatableFinder(attr).find(html)
+    if not found:
+        return html
+    strings = load({tr_id.partition(".")[0] for *_, tr_id in found})
+    attr_pattern = re.compile(rf"\b{re.escape(attr)}(?=\s*=)", re.IGNORECASE)
+    parts: list[str] = []
+    position = 0
+    for start, content_start, content_end, tr_id in found:
+        localised = _lookup(strings, tr_id)
+        if localised is None:
+            continue
+        parts.append(html[position:start])
+        parts.append(attr_pattern.sub(f"{attr}-origin", html[start:content_start], count=1))
+        parts.append(localised)
+        position = content_end
+    parts.append(html[position:])
+    return "".join(parts)
+
+
+class PageRenderer:
+    """Renderer of localised task pages with a cache of the rendered pages.
+
+    Rendered pages are cached by template, localisation (and the hash of its
+    source) and the modification times of the template and of all templates
+    it extends, includes or imports (e.g. :file:`base.html`), so that a page
+    is rendered once per localisation and re-rendered when any of them is
+    modified.
+    """
+
+    tasks: Mapping[str, ResearchTaskAPI]
+    template_dir: str
+    max_pages: int
+    hits: int
+    misses: int
+    _pages: OrderedDict[tuple[str, str, str, tuple[int, ...]], str]
+    # Templates referenced by each template, with the modification time they were found at.
+    _references: dict[str, tuple[int, tuple[str, ...]]]
+
+    def __init__(
+        self,
+        tasks: Mapping[str, ResearchTaskAPI],
+        template_dir: str = "app",
+        max_pages: int = RENDER_CACHE_SIZE,
+    ):
+        """Initialise a renderer for the pages of the *tasks* (by task name).
+
+        Arguments:
+            tasks: The task APIs by task name, which is also the name of the
+                directory with the task's pages in *template_dir*.
+            template_dir: The directory with Eel's Jinja templates.
+            max_pages: The maximum number of rendered pages to cache.
+        """
+        self.tasks = tasks
+        self.template_dir = template_dir
+        self.max_pages = max_pages
+        self.hits = 0
+        self.misses = 0
+        self._pages = OrderedDict()
+        self._references = dict()
+
+    @property
+    def jinja_env(self) -> Jinja2Environment | None:
+        """Eel's Jinja environment (`None` before Eel is started with templates)."""
+        return eel._start_args.get("jinja_env")  # type: ignore
+
+    def render(self, task: str, page: str, instance: str) -> str | None:
+        """Render the *page* of *task* localised for the response *instance*.
+
+        Returns:
+            The localised page, or `None` if it can't be localised on the
+            server (e.g. because it is not a task page, the response is not
+            in progress, or the task or template is broken), in which case it
+            should be served as usual.
+        """
+        env = self.jinja_env
+        if env is None or not page.endswith(".html"):
+            return None
+        from jinja2 import TemplateError
+
+        try:
+            api = self.tasks.get(task)
+            if api is None:
+                return None
+            localisation = api.open_localisation(instance)
+            template = env.get_template(f"{task}/{page}")
+            mtimes = self._template_mtimes(env, template)
+            key = (template.name or page, localisation.label, localisation.source_hash, mtimes)
+            return self._render(key, template, task, localisation)
+        except (TaskAPIException, OSError) as e:  # Including jinja2.TemplateNotFound
+            logger.debug(f"Not localising page '{task}/{page}' on the server: {e!s}")
+        except (TaskRegistryError, TemplateError) as e:
+            logger.error(f"Could not localise page '{task}/{page}' on the server: {e!s}")
+        return None
+
+    def _template_mtimes(self, env: Jinja2Environment, template: Template) -> tuple[int, ...]:
+        """Return the modification times of *template* and all templates it references.
+
+        Raises:
+            OSError: Raised if a template can't be found (`jinja2.TemplateNotFound`)
+                or its modification time can't be read.
+        """
+        mtimes = []
+        pending = [template]
+        seen = {template.name}
+        while pending:
+            current = pending.pop()
+            mtime_ns = os.stat(current.filename).st_mtime_ns if current.filename else 0
+            mtimes.append(mtime_ns)
+            for name in self._referenced_templates(env, current, mtime_ns):
+                if name not in seen:
+                    seen.add(name)
+                    pending.append(env.get_template(name))
+        return tuple(mtimes)
+
+    def _referenced_templates(
+        self, env: Jinja2Environment, template: Template, mtime_ns: int
+    ) -> tuple[str, ...]:
+        """Return the names of the templates *template* extends, includes or imports.
+
+        The names are found by parsing the template's source once per
+        modification time *mtime_ns*. Names computed at runtime are ignored.
+        """
+        name = template.name or ""
+        cached = self._references.get(name)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+        from jinja2 import meta
+
+        source, _, _ = env.loader.get_source(env, name)  # type: ignore
+        references = tuple(
+            reference
+            for reference in meta.find_referenced_templates(env.parse(source))
+            if reference is not None
+        )
+        self._references[name] = (mtime_ns, references)
+        return references
+
+    def _render(
+        self, key: tuple[str, str, str, tuple[int, ...]], template: Template, task: str,
+        localisation: CompiledLocalisation,
+    ) -> str:
+        """Return the cached page *key*, or render and localise *template* and cache it.
+
+        Raises:
+            jinja2.TemplateError: Raised if *template* could not be rendered.
+        """
+        html = self._pages.get(key)
+        if html is not None:
+            self._pages.move_to_end(key)
+            self.hits += 1
+            return html
+        self.misses += 1
+        html = localise_html(
+            template.render(task=task, localisation=localisation.label),
+            task,
+            lambda sections: get_localisation_cache().get(localisation, sections),
+        )
+        self._pages[key] = html
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+        return html
+
+    def serve(self, task: str, page: str) -> bottle.HTTPResponse:
+        """Bottle route serving the (localised, if possible) *page* of *task*."""
+        instance = bottle.request.query.get("instance")
+        html = self.render(task, page, instance) if instance else None
+        if html is None:
+            return eel._static(f"{self.template_dir}/{task}/{page}")  # type: ignore
+        response = bottle.HTTPResponse(html)
+        eel._set_response_headers(response)  # type: ignore
+        return response
+
+    def register_routes(self, app: bottle.Bottle | None = None) -> None:
+        """Add the route serving the task pages to the Bottle *app*.
+
+        Must be called before Eel is started, so that the route takes
+        precedence over Eel's own routes (by default for Bottle's default app).
+        """
+        app = app or bottle.default_app()
+        app.route(f"/{self.template_dir}/<task>/<page>", callback=self.serve)
@@ -0,0 +1,125 @@
+"""Registry of the app's tasks, loading each task on demand.
+
+The `TaskRegistry` discovers the tasks from their metadata (see
+`research_assistant.booteel.task_info`) and exposes a lightweight stub via Eel
+for each of their API methods, without importing the tasks' modules. Only when
+one of a task's stubs is first called (or the task's API is requested from the
+registry) is the task's module imported, and its API, with its response
+models, built and exposed in place of the stubs.
+"""
+from __future__ import annotations
+
+import importlib
+import logging
+import threading
+import time
+from typing import Any, Callable, Iterator, Mapping
+
+import eel
+
+from ..storage import get_index
+from .task_api import ResearchTaskAPI
+from .task_info import TaskInfo, TaskRegistryError, discover_tasks
+
+logger = logging.getLogger(__name__)
+
+
+class TaskRegistry(Mapping[str, ResearchTaskAPI]):
+    """Registry of the tasks in a package, loading each task's API on first use.
+
+    The registry is a mapping of task names to the tasks' APIs, in which a
+    task's API is loaded when it is first looked up.
+    """
+
+    package: str
+    tasks: dict[str, TaskInfo]
+    _apis: dict[str, ResearchTaskAPI]
+
+    def __init__(self, package: str):
+        """Initialise a registry of the tasks in the subpackages of *package*."""
+        self.package = package
+        self.tasks = discover_tasks(package)
+        self._apis = dict()
+        self._lock = threading.RLock()
+
+    def __getitem__(self, task: str) -> ResearchTaskAPI:
+        """Return the API of *task*, loading it if needed (see `TaskRegistry.load()`)."""
+        return self.load(task)
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the names of the registered tasks."""
+        return iter(self.tasks)
+
+    def __len__(self) -> int:
+        """Return the number of registered tasks."""
+        return len(self.tasks)
+
+    @property
+    def loaded(self) -> list[str]:
+        """The names of the tasks whose APIs have been loaded."""
+        return list(self._apis)
+
+    def expose(self) -> None:
+        """Expose stubs for the API methods of all tasks via Eel.
+
+        The stubs load the task's API when first called. The tasks' data paths
+        are also registered with the response index, which otherwise happens
+        when a task's API is created.
+        """
+        for info in self.tasks.values():
+            get_index().register_task(info.name, info.data_path)
+            if info.name in self._apis:
+                continue
+            for name in info.exposed_names:
+                if name not in eel._exposed_functions:  # type: ignore
+                    eel._expose(name, self._stub(info.name, name))  # type: ignore
+
+    def _stub(self, task: str, name: str) -> Callable[..., Any]:
+        """Create the stub for the method exposed as *name* by the API of *task*."""
+
+        def stub(*args: Any, **kwargs: Any) -> Any:
+            return self.load(task).eel_api[name](*args, **kwargs)
+
+        stub.__name__ = name
+        stub.eel_api_stub = True  # type: ignore
+        return stub
+
+    def load(self, task: str) -> ResearchTaskAPI:
+        """Return the API of *task*, importing, creating and exposing it if needed.
+
+        Raises:
+            KeyError: Raised if there is no task named *task*.
+            TaskRegistryError: Raised if the task's API could not be imported.
+        """
+        api = self._apis.get(task)
+        if api is not None:
+            return api
+        info = self.tasks[task]
+        with self._lock:
+            if task in self._apis:
+                return self._apis[task]
+            started = time.perf_counter()
+            module_name, _, class_name = info.api.partition(":")
+            try:
+                module = importlib.import_module(f".{module_name}", info.package)
+                api_class = getattr(module, class_name)
+            except (ImportError, AttributeError) as e:
+                raise TaskRegistryError(
+                    f"Could not load the API {info.api!r} of task {task!r}: {e!s}"
+                ) from e
+            api = api_class()
+            api.expose()
+            exposed = set(info.exposed_names)
+            if exposed != set(api.eel_api):
+                logger.warning(
+                    f"The methods exposed by the API of task {task!r} don't match its "
+                    f"metadata (missing: {sorted(exposed - set(api.eel_api))}, "
+                    f"unlisted: {sorted(set(api.eel_api) - exposed)})."
+                )
+            self._apis[task] = api
+            logger.info(f"Loaded task {task!r} in {time.perf_counter() - started:.3f}s.")
+        return api
+
+    def load_all(self) -> dict[str, ResearchTaskAPI]:
+        """Load the APIs of all tasks and return them by task name."""
+        return {task: self.load(task) for task in self.tasks}
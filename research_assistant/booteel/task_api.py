@@ -2,23 +2,61 @@
 
 import json
 import logging
+import time
+from functools import partial
 from importlib import resources
 from pathlib import Path
-from typing import Any, Iterable, Literal, Type
+from typing import Any, Hashable, Iterable, Literal, Type
 from uuid import UUID, uuid1
 
+import gevent  # type: ignore
+from gevent.event import AsyncResult  # type: ignore
 from pydantic import ValidationError
+from pydantic_core import to_jsonable_python
 
 from ..config import config
 from ..datamodels.models import ResponseBase, ResponseMetadata
 from ..datamodels.types import _T, AnyUUID, KeyT
 from ..datamodels.utils import validation_error_to_html
+from ..jsoncodec import get_codec
+from ..storage import (ResponseJournal, StorageBackend, StorageError, get_backend,
+                       get_index, get_writer, write_response)
 from . import errors
 from . import utils as booteel_utils
 from .eel_api import EelAPI
+from .localisations import (CompiledLocalisation, discover_localisations,
+                            fingerprint_localisations, get_localisation_cache)
+from .memo import memoized
+from .offload import on_hub
 
 logger = logging.getLogger(__name__)
 
+# Name of the state shared by the methods touching the responses in progress and their
+# journals (see `EelAPI.shared()`).
+RESPONSES = "responses"
+
+# Minimum number of seconds between checks of a task's localisation files for changes.
+LOCALISATIONS_CHECK_INTERVAL = 1.0
+
+
+def _localisations_key(api: "ResearchTaskAPI", force_rediscovery: bool = False) -> Hashable | None:
+    """Return the key the result of `ResearchTaskAPI.get_localisations()` is memoized by."""
+    return None if force_rediscovery else api.localisations_version()
+
+
+def _localisation_key(
+    api: "ResearchTaskAPI",
+    label_or_uuid: str | AnyUUID,
+    sections: list[str] | None = None,
+    force_reload: bool = False,
+) -> Hashable | None:
+    """Return the key the result of `ResearchTaskAPI.load_localisation()` is memoized by."""
+    if force_reload:
+        return None
+    api.localisations_version()  # Forget the opened localisations if they changed
+    source_hash = api.open_localisation(label_or_uuid).source_hash
+    return (source_hash, None if sections is None else tuple(sections))
+
 
 class ResearchTaskAPI(EelAPI):
     """Base class for EelAPIs exposing a Research Assistant task.
@@ -39,6 +77,9 @@ class ResearchTaskAPI(EelAPI):
         * `ResearchTaskAPI.is_complete()`
         * `ResearchTaskAPI.store()`
         * `ResearchTaskAPI.end()`
+        * `ResearchTaskAPI.restored_responses()`
+        * `ResearchTaskAPI.resume()`
+        * `ResearchTaskAPI.export_response()`
     They can be overwritten if needed, but it is considered best practice to
     avoid this where possible because it makes debugging more difficult. Note
     also that overwriting an exposed method will trigger an INFO-level message.
@@ -49,6 +90,21 @@ class ResearchTaskAPI(EelAPI):
     i.e. you can call them from within your subclass, but you should not call
     them from outside a `ResearchTaskAPI`-derived class. Those methods not
     so marked are intended for calling both from within and without the class.
+
+    Subclasses should add data to a response in progress with the methods
+    `ResearchTaskAPI._set_response_field()`,
+    `ResearchTaskAPI._set_response_item()`,
+    `ResearchTaskAPI._append_response_item()` and
+    `ResearchTaskAPI._delete_response_field()` rather than by modifying
+    *_response_data* directly, so that the change is recorded in the response's
+    journal and can be restored if the app crashes before the response is stored.
+    These methods hold the API's lock of the :code:`responses` state (`RESPONSES`),
+    so that responses aren't modified while `ResearchTaskAPI.store()` validates
+    and writes them in gevent's thread pool. Subclasses storing a response from
+    one of their exposed methods must do so with
+    :code:`self._call_exposed(self.store, response_id)` (see
+    `EelAPI._call_exposed()`) rather than by calling `ResearchTaskAPI.store()`
+    directly, which would validate and write it on gevent's event loop.
     """
 
     # Logger used for logging errors originating from the tasks' Eel API.
@@ -57,7 +113,8 @@ class ResearchTaskAPI(EelAPI):
     response_class: Type[ResponseBase]
     # The version of the task.
     task_version: str
-    # The relative path (directory name) under which the task's data should be stored.
+    # The relative path (directory name) under which the task's data should be stored
+    # by file-based storage backends (see `research_assistant.storage`).
     task_data_path: Path
     # The non-qualified package name of the task (determined automatically).
     _task_name: str
@@ -67,8 +124,12 @@ class ResearchTaskAPI(EelAPI):
     # the final data model and storing it.
     _response_data: dict[UUID, dict[str, Any]]
     # Log of response ids of responses that have been successfully stored during
-    # the lifetime of this ResearchTaskAPI instance.
+    # the lifetime of this ResearchTaskAPI instance (responses stored earlier are
+    # looked up in the response index).
     _stored_responses: set[UUID]
+    # Results of the writes of responses queued with the background writer in the
+    # "background" write mode, until they complete.
+    _pending_stores: dict[UUID, AsyncResult]
     # A set of fields marked as required by the top-level Pydantic data model
     # (as specified in the *response_class*). This is used to determine when
     # temporary response data in *_response_data* is considered 'complete' for
@@ -77,9 +138,19 @@ class ResearchTaskAPI(EelAPI):
     # A dictionary of the available localisations that can be loaded on demand
     # (determined automatically).
     _localisations_available: dict[str, str]
-    # A dictionary of localisation data. Populated lazily as localisations are
-    # requested.
-    _localisation_data: dict[str, dict[Any, Any]]
+    # A dictionary of the compiled localisations, from which their sections are
+    # loaded. Populated lazily as localisations are requested.
+    _compiled_localisations: dict[str, CompiledLocalisation]
+    # Journal recording changes to *_response_data*, so that responses in progress
+    # can be restored after a crash (`None` if journalling is disabled).
+    _journal: ResponseJournal | None
+    # Ids of the responses in progress that were restored from the journal.
+    _restored_responses: set[UUID]
+    # Fingerprint of the localisation files when they were last checked for
+    # changes, and the (monotonic) time of the check (see
+    # `ResearchTaskAPI.localisations_version()`).
+    _localisations_fingerprint: str | None
+    _localisations_checked: float
 
     def __init__(self):
         """Initialise the EelTaskAPI."""
@@ -87,9 +158,87 @@ class ResearchTaskAPI(EelAPI):
         self._task_qualname = self._find_parent_package_qualname()
         self._response_data = dict()
         self._stored_responses = set()
+        self._pending_stores = dict()
         self._required_fields = self.response_class.get_required_fields()
         self._localisations_available = dict()
-        self._localisation_data = dict()
+        self._compiled_localisations = dict()
+        self._localisations_fingerprint = None
+        self._localisations_checked = 0.0
+        self._journal = None
+        self._restored_responses = set()
+        get_index().register_task(self._task_name, self.task_data_path)
+        if config.storage.journal:
+            self._journal = ResponseJournal(config.paths.cache / "journals" / self._task_name)
+            self._restore_journalled_responses()
+
+    @property
+    def task_name(self) -> str:
+        """The non-qualified package name of the task (e.g. :code:`"lsbqe"`)."""
+        return self._task_name
+
+    def _restore_journalled_responses(self) -> None:
+        """Restore the responses in progress recorded in the task's journal.
+
+        Journals that haven't changed for :code:`storage.journal_max_age`
+        days are removed first, and the journals of the restored responses are
+        compacted (see `ResponseJournal.compact()`). The restored responses can
+        be listed with `ResearchTaskAPI.restored_responses()`.
+        """
+        assert self._journal is not None
+        if config.storage.journal_max_age > 0:
+            self._journal.expire(config.storage.journal_max_age * 24 * 60 * 60)
+        for response_id, data in self._journal.replay().items():
+            try:
+                data["id"] = self._cast_uuid(data["id"])
+                data["meta"] = ResponseMetadata.model_validate(data["meta"])
+            except (KeyError, errors.InvalidUUIDError, ValidationError) as e:
+                self.logger.error(
+                    f"Could not restore {self._task_name} response with id "
+                    f"{response_id} from journal: {e!s}"
+                )
+                continue
+            self._response_data[response_id] = data
+            self._restored_responses.add(response_id)
+            self._journal.compact(response_id, data)
+            self.logger.info(
+                f"Restored {self._task_name} response with id {response_id} from journal."
+            )
+
+    def _set_response_field(self, response_id: UUID, field: str, value: Any) -> None:
+        """Set *field* of the response in progress to *value* and journal the change."""
+        with self.shared((RESPONSES,)):
+            self._response_data[response_id][field] = value
+            if self._journal is not None:
+                self._journal.append(response_id, "set", field, value)
+
+    def _set_response_item(
+        self, response_id: UUID, field: str, key: str, value: Any
+    ) -> None:
+        """Set item *key* of the dict in *field* of the response in progress to *value*.
+
+        The dictionary in *field* is created if it doesn't exist yet.
+        """
+        with self.shared((RESPONSES,)):
+            self._response_data[response_id].setdefault(field, {})[key] = value
+            if self._journal is not None:
+                self._journal.append(response_id, "setitem", field, value, key=key)
+
+    def _append_response_item(self, response_id: UUID, field: str, value: Any) -> None:
+        """Append *value* to the list in *field* of the response in progress.
+
+        The list in *field* is created if it doesn't exist yet.
+        """
+        with self.shared((RESPONSES,)):
+            self._response_data[response_id].setdefault(field, []).append(value)
+            if self._journal is not None:
+                self._journal.append(response_id, "append", field, value)
+
+    def _delete_response_field(self, response_id: UUID, field: str) -> None:
+        """Remove *field* from the response in progress and journal the change."""
+        with self.shared((RESPONSES,)):
+            del self._response_data[response_id][field]
+            if self._journal is not None:
+                self._journal.append(response_id, "delete", field)
 
     @classmethod
     def exception_handler(cls, exc: Exception) -> None:
@@ -373,7 +522,35 @@ class ResearchTaskAPI(EelAPI):
         """
         return booteel_utils.setlocation(location)
 
+    def localisations_version(self) -> str:
+        """Return a version of the task's localisation files.
+
+        The version changes whenever a localisation file is added, removed or
+        modified (the files are checked at most every
+        `LOCALISATIONS_CHECK_INTERVAL` seconds). If it changed since the last
+        check, the localisations discovered and opened so far are forgotten, so
+        that they are discovered and opened again when next requested.
+        """
+        now = time.monotonic()
+        if (
+            self._localisations_fingerprint is not None
+            and now - self._localisations_checked < LOCALISATIONS_CHECK_INTERVAL
+        ):
+            return self._localisations_fingerprint
+        fingerprint = fingerprint_localisations(
+            resources.files(".".join((self._task_qualname, "localisations")))
+        )
+        if fingerprint != self._localisations_fingerprint:
+            if self._localisations_fingerprint is not None:
+                self.logger.info(f"The localisations of {self._task_name} have changed.")
+                self._localisations_available = dict()
+                self._compiled_localisations = dict()
+            self._localisations_fingerprint = fingerprint
+        self._localisations_checked = now
+        return fingerprint
+
     @EelAPI.exposed
+    @memoized(key=_localisations_key)
     def get_localisations(self, force_rediscovery: bool = False) -> dict[str, str]:
         """Get a dictionary of available task localisations.
 
@@ -391,6 +568,13 @@ class ResearchTaskAPI(EelAPI):
         forced by specifying the optional *force_rediscovery* argument as
         `True`.
 
+        The labels and descriptions are read from a metadata index of the
+        localisations (see `research_assistant.booteel.localisations`), so that
+        the localisation files need not all be parsed to discover them.
+
+        When called via Eel, the encoded result is memoized until the
+        localisation files change (see `research_assistant.booteel.memo`).
+
         Note:
             The localisations themselves are not loaded simply by querying their
             availability. Localisations are individually lazy-loaded when
@@ -411,36 +595,17 @@ class ResearchTaskAPI(EelAPI):
         if not force_rediscovery and len(self._localisations_available) > 0:
             return self._localisations_available
 
-        self._localisations_available = dict()
         resource_target = ".".join((self._task_qualname, "localisations"))
-        for item in resources.contents(resource_target):
-            if not (
-                resources.is_resource(resource_target, item)
-                and item[0] not in ("_", ".")
-                and item.endswith(".json")
-            ):
-                continue  # Not a JSON file or marked as private
-            with resources.open_text(resource_target, item) as fp:
-                buf = json.load(fp)
-                if (
-                    "meta" in buf
-                    and "versionId" in buf["meta"]
-                    and "versionName" in buf["meta"]
-                ):
-                    label, description = (
-                        buf["meta"]["versionId"],
-                        buf["meta"]["versionName"],
-                    )
-                    self._localisations_available[label] = description
-                else:
-                    self.logger.error(
-                        f"Resource '{resource_target}/{item}' is missing one of the required keys "
-                        "'meta.versionId' or 'meta.versionName'."
-                    )
+        self._localisations_available = discover_localisations(
+            resources.files(resource_target),
+            config.paths.cache / "localisations" / f"{resource_target}.json",
+            force=force_rediscovery,
+        )
         return self._localisations_available
 
     @EelAPI.exposed
-    def load_localisation(  # noqa: C901
+    @memoized(key=_localisation_key)
+    def load_localisation(
         self,
         label_or_uuid: str | AnyUUID,
         sections: list[str] | None = None,
@@ -458,14 +623,21 @@ class ResearchTaskAPI(EelAPI):
         the section labels in *sections* are returned. If *sections* is not
         specified, all sections from the localisation are returned.
 
-        Each localisation is lazy-loaded and memoized the first time the
-        localisation with a specific localisation label is loaded using
-        `ResearchTaskAPI.load_localisation()`. All sections are
-        loaded when this happens, irrespective of the value of *sections*.
+        Each section of a localisation is lazy-loaded the first time it is
+        requested using `ResearchTaskAPI.load_localisation()`. The sections are
+        read from a compiled copy of the localisation in the cache directory
+        (see `research_assistant.booteel.localisations.CompiledLocalisation`),
+        so that only the requested sections are read, and are kept in the
+        size-bounded localisation cache shared by all tasks (see
+        `research_assistant.booteel.localisations.get_localisation_cache()`).
         To force reloading a localisation from disk (e.g. because it was
         modified during development or debugging), the optional argument
         *force_reload* can be specified as `True`.
 
+        When called via Eel, the encoded result is memoized until the
+        localisation files change (see `research_assistant.booteel.memo`), so
+        that the sections are neither loaded nor encoded again.
+
         Arguments:
             label_or_uuid: Either a UUID or a string specifying the label of the
                 localisation to be loaded.
@@ -484,19 +656,48 @@ class ResearchTaskAPI(EelAPI):
             actually present and populated.
 
         Raises:
-            ModuleNotFoundError: If the resources package for the task is not
-                found. This indicates a problem with package structure or the
-                configuration of the `ResearchTaskAPI` instance.
-            OSError: If the requested localisation label was found but the file
-                could either not be found or not be read for some reason. May
-                indicate a problem with the localisation file's name or its
-                metadata.
-            ValueError: Can be raised for two reasons. First, if an UUID was
-                specified for *label_or_uuid* and no response with that UUID
-                exists. Second, if the requested localisation file could be read
-                but its contents were invalid, e.g. because they are not valid
-                JSON or because they are in the wrong format or the file was
-                corrupted.
+            errors.ResponseNotFoundError: If *label_or_uuid* is a UUID and no
+                response with that UUID is in progress.
+            errors.ResponseCorruptedError: If the response with the UUID
+                *label_or_uuid* has no localisation label.
+            errors.ResourceError: If the resources package for the task is not
+                found, the localisation is unknown, or its file could not be
+                read, compiled or decoded (e.g. because it is not valid JSON
+                or was corrupted).
+        """
+        compiled = self.open_localisation(label_or_uuid, force_reload)
+        try:
+            return get_localisation_cache().get(
+                compiled, compiled.sections if sections is None else sections
+            )
+        except (OSError, ValueError) as e:
+            raise errors.ResourceError(
+                f"Could not load localisation '{compiled.label}': {e!s}",
+                task=self._task_name,
+            ) from e
+
+    def open_localisation(  # noqa: C901
+        self, label_or_uuid: str | AnyUUID, force_reload: bool = False
+    ) -> CompiledLocalisation:
+        """Open the compiled localisation indicated by *label_or_uuid*.
+
+        The localisation is resolved as in `ResearchTaskAPI.load_localisation()`
+        and memoized, but none of its sections are loaded.
+
+        Arguments:
+            label_or_uuid: Either a UUID or a string specifying the label of the
+                localisation to be opened.
+            force_reload: Whether to recompile the localisation if its source
+                has changed even if it has already been opened. Default: `False`.
+
+        Returns:
+            The compiled localisation.
+
+        Raises:
+            errors.ResponseNotFoundError: If *label_or_uuid* is a UUID and no
+                response with that UUID is in progress.
+            errors.ResourceError: If the localisation is unknown or could not be
+                read or compiled.
         """
         # Determine localisation label
         response_id: UUID | None = None
@@ -527,63 +728,54 @@ class ResearchTaskAPI(EelAPI):
         else:
             label = label_or_uuid
 
-        # Lazy-load localisation data if needed
-        if force_reload or label not in self._localisation_data:
-            resource_target = ".".join((self._task_qualname, "localisations"))
-            try:
+        # Open the compiled localisation if needed
+        resource_target = ".".join((self._task_qualname, "localisations"))
+        try:
+            if force_reload or label not in self._compiled_localisations:
                 if force_reload or not self._localisations_available:
                     self.get_localisations(force_rediscovery=force_reload)
                 self._localisations_available[
                     label
                 ]  # Raise KeyError if label not found
-                buffer = None
-                with resources.open_text(resource_target, f"{label}.json") as fp:
-                    buffer = json.load(fp)
-                assert isinstance(buffer, dict)
-                self._localisation_data[label] = buffer
+                self._compiled_localisations[label] = CompiledLocalisation.open(
+                    resources.files(resource_target) / f"{label}.json",
+                    config.paths.cache / "localisations" / resource_target / f"{label}.bin",
+                )
                 self.logger.debug(
-                    f"Successfully hard-loaded localisation {label} data for "
+                    f"Successfully opened localisation {label} for "
                     f"{self._task_name} from package {resource_target}."
                 )
-            except ModuleNotFoundError as e:
-                raise errors.ResourceError(
-                    f"The package {resource_target!r} was not found: {e.msg}",
-                    task=self._task_name,
-                ) from e
-            except OSError as e:
-                raise errors.ResourceError(
-                    (
-                        "An error occured while trying to access the resource "
-                        f"'{resource_target!s}.{label!s}.json' for reading: {e!s}"
-                    ),
-                    task=self._task_name,
-                ) from e
-            except KeyError as e:
-                raise errors.ResourceError(
-                    (
-                        "Could not hard-load localisation "
-                        f"'{resource_target!s}.{label!s}': unknown localisation label"
-                    ),
-                    task=self._task_name,
-                ) from e
-            except (json.JSONDecodeError, AssertionError) as e:
-                msg = e.msg if isinstance(e, json.JSONDecodeError) else "invalid format"
-                raise errors.ResourceError(
-                    (
-                        "Could not hard-load localisation "
-                        f"'{resource_target!s}.{label!s}': {msg}"
-                    ),
-                    task=self._task_name,
-                ) from e
-
-        # Return appropriate sections of localisation data
-        if sections is None:
-            return self._localisation_data[label]
-        buffer: dict[str, dict[str, Any]] = {}
-        for section in sections:
-            if section in self._localisation_data[label]:
-                buffer[section] = self._localisation_data[label][section]
-        return buffer
+            return self._compiled_localisations[label]
+        except ModuleNotFoundError as e:
+            raise errors.ResourceError(
+                f"The package {resource_target!r} was not found: {e.msg}",
+                task=self._task_name,
+            ) from e
+        except OSError as e:
+            raise errors.ResourceError(
+                (
+                    "An error occured while trying to access the resource "
+                    f"'{resource_target!s}.{label!s}.json' for reading: {e!s}"
+                ),
+                task=self._task_name,
+            ) from e
+        except KeyError as e:
+            raise errors.ResourceError(
+                (
+                    "Could not hard-load localisation "
+                    f"'{resource_target!s}.{label!s}': unknown localisation label"
+                ),
+                task=self._task_name,
+            ) from e
+        except ValueError as e:
+            msg = e.msg if isinstance(e, json.JSONDecodeError) else str(e)
+            raise errors.ResourceError(
+                (
+                    "Could not hard-load localisation "
+                    f"'{resource_target!s}.{label!s}': {msg}"
+                ),
+                task=self._task_name,
+            ) from e
 
     @EelAPI.exposed
     def new(self, data: dict[str, Any]) -> str:
@@ -634,14 +826,21 @@ class ResearchTaskAPI(EelAPI):
             consent_obtained=data["confirmConsent"],
         )
         self.logger.debug(f"... meta={meta!r}")
+        if previous := get_index().find_participant(meta.participant_id, self._task_name):
+            self.logger.warning(
+                f"... participant {meta.participant_id!r} already has {len(previous)} "
+                f"stored {self._task_name} response(s)."
+            )
         self._response_data[response_id] = {}
         self._response_data[response_id]["id"] = response_id
         self._response_data[response_id]["meta"] = meta
+        if self._journal is not None:
+            self._journal.append(response_id, "new", value=self._response_data[response_id])
         self.logger.debug("... success.")
         self.set_location(f"start.html?instance={response_id!s}")
         return str(response_id)
 
-    @EelAPI.exposed
+    @EelAPI.exposed(shares=(RESPONSES,))
     def discard(self, response_id: AnyUUID) -> Literal[True] | None:
         """Discard all data for response with id *response_id*.
 
@@ -661,6 +860,10 @@ class ResearchTaskAPI(EelAPI):
             f"Discarding {self._task_name} response with id {response_id}.."
         )
         del self._response_data[response_id]
+        stored = response_id in self._stored_responses or response_id in self._pending_stores
+        if self._journal is not None and not stored:
+            # Journals of stored responses are removed once the write completes
+            self._journal.remove(response_id)
         self.logger.debug("... success.")
         return True
 
@@ -695,40 +898,124 @@ class ResearchTaskAPI(EelAPI):
 
     @EelAPI.exposed
     def is_stored(self, response_id: AnyUUID) -> bool:
-        """Check whether response with id *response_id* has been stored."""
+        """Check whether response with id *response_id* has been stored.
+
+        Note:
+            With the :code:`"background"` write mode, a response counts as
+            stored as soon as it has been accepted by the background writer,
+            unless writing it fails.
+            With the :code:`"immediate"` and :code:`"durable"` write modes it
+            only counts as stored once it has been written (and, in the
+            :code:`"durable"` mode, flushed) to disk.
+
+        Responses stored before the app was (re)started are found in the
+        response index (see `research_assistant.storage.ResponseIndex`).
+        """
         response_id = self._cast_uuid(response_id)
-        return response_id in self._stored_responses
+        if response_id in self._stored_responses:
+            return True
+        if (result := self._pending_stores.get(response_id)) is not None:
+            return not result.ready() or result.successful()
+        return get_index().contains(response_id, self._task_name)
 
-    @EelAPI.exposed
+    @EelAPI.exposed(offload="thread", shares=(RESPONSES,))
     def store(self, response_id: AnyUUID) -> Literal[True] | None:
-        """Submit a complete response to long-term storage."""
+        """Submit a complete response to long-term storage.
+
+        How the response is written depends on the :code:`storage.write_mode`
+        setting: it is either written directly (:code:`"immediate"`), queued
+        with the background writer (:code:`"background"`), or queued with the
+        background writer while waiting until it has been flushed to disk
+        (:code:`"durable"`).
+
+        The response is validated (and, in the :code:`"immediate"` write
+        mode, written) in gevent's thread pool, leaving the event loop free to
+        handle other calls in the meantime (see
+        `research_assistant.booteel.offload`).
+        """
         response_id = self._cast_uuid(response_id)
         self._response_exists_or_fail(response_id)
         self.logger.info(
             f"Storing data for {self._task_name} response with id {response_id}.."
         )
         response = self.response_class(**self._response_data[response_id])
-        json = response.model_dump_json(indent=4)
-        self.logger.debug(f"... JSON serialization: {json}")
-        path = self.task_data_path / str(response.meta.task_localisation)
-        if not path.exists():
-            path.mkdir(parents=True, exist_ok=True)
-        filename = path / f"{response.meta.participant_id!s}_{response_id!s}.json"
-        self.logger.debug(f"... writing to file: {filename}")
+        backend = get_backend()
+        write_mode = config.storage.write_mode
+        self.logger.debug(
+            f"... storing with {backend.name!r} backend ({write_mode!r} write mode)."
+        )
         try:
-            with filename.open("w", encoding="utf-8") as fp:
-                fp.write(json)
-        except OSError as e:
+            if write_mode == "immediate":
+                location = write_response(
+                    backend, self._task_name, self.task_data_path, response
+                )
+            else:
+                location = on_hub(
+                    self._submit_response, response_id, backend, response, write_mode
+                )
+                if location is None:
+                    self.logger.debug("... queued.")
+                    return True
+        except StorageError as e:
             self.logger.debug("... failed.")
             raise errors.ResponseStorageError(
                 f"Could not store response with id {response_id}: {e!s}",
                 task=self._task_name,
                 response_id=response_id,
             ) from e
+        self.logger.debug(f"... stored at: {location}")
         self._stored_responses.add(response_id)
+        if self._journal is not None:
+            self._journal.remove(response_id)
         self.logger.debug("... success.")
         return True
 
+    def _submit_response(
+        self, response_id: UUID, backend: StorageBackend, response: ResponseBase, write_mode: str
+    ) -> Path | None:
+        """Queue *response* with the background writer (on the hub, see `store()`).
+
+        Returns:
+            The location the response was written to in the :code:`"durable"`
+            write mode, `None` once it has been queued in the
+            :code:`"background"` write mode.
+        """
+        result = get_writer().submit(
+            backend,
+            self._task_name,
+            self.task_data_path,
+            response,
+            sync=(write_mode == "durable"),
+        )
+        if write_mode == "durable":
+            return result.get()
+        self._pending_stores[response_id] = result
+        result.rawlink(partial(self._background_store_done, response_id))
+        return None
+
+    def _background_store_done(self, response_id: UUID, result: AsyncResult) -> None:
+        """Callback for responses written in the :code:`"background"` write mode.
+
+        The callback runs in the context of the gevent hub, so the exception
+        handler (which may need to talk to the frontend) is run in a new greenlet.
+        """
+        self._pending_stores.pop(response_id, None)
+        if result.successful():
+            self._stored_responses.add(response_id)
+            self.logger.debug(
+                f"Background write of {self._task_name} response with id "
+                f"{response_id} stored at: {result.value}"
+            )
+            if self._journal is not None:
+                self._journal.remove(response_id)
+            return
+        exc = errors.ResponseStorageError(
+            f"Could not store response with id {response_id}: {result.exception!s}",
+            task=self._task_name,
+            response_id=response_id,
+        )
+        gevent.spawn(self._handle_exception, exc)
+
     @EelAPI.exposed
     def end(self, response_id: AnyUUID, data: dict[str, Any] | None = None) -> str:
         """Redirect participant to next task in sequence and remove current response from memory.
@@ -736,6 +1023,8 @@ class ResearchTaskAPI(EelAPI):
         Important:
             Response data for *response_id* is discarded from memory once :func:`end()` is called.
             You **must** call :func:`store()` before calling :func:`end()` to store the data.
+            In the :code:`"background"` write mode, :func:`end()` waits until the response
+            has been written, and keeps its data if writing it failed.
         """
         response_id = self._cast_uuid(response_id)
         self._response_exists_or_fail(response_id)
@@ -748,6 +1037,9 @@ class ResearchTaskAPI(EelAPI):
                 task=self._task_name,
                 response_id=response_id,
             )
+        if (result := self._pending_stores.get(response_id)) is not None:
+            self.logger.debug("... waiting for the background write of the response.")
+            result.wait()
         if not self.is_stored(response_id):
             raise errors.ResponseNotStoredError(
                 f"Cannot redirect participant: response with id {response_id} has not been stored.",
@@ -781,3 +1073,89 @@ class ResearchTaskAPI(EelAPI):
             self.set_location(href)
         self.discard(response_id)
         return href
+
+    @EelAPI.exposed
+    def restored_responses(self) -> list[dict[str, Any]]:
+        """List the responses in progress that were restored from the journal.
+
+        Returns:
+            A list with a dictionary for each restored response that has been
+            neither stored nor discarded yet, with its *id*, *participant_id*,
+            *researcher_id* and *task_localisation*, and whether it is
+            *complete* (see `ResearchTaskAPI.is_complete()`).
+        """
+        restored = []
+        for response_id in sorted(self._restored_responses & self._response_data.keys()):
+            data = self._response_data[response_id]
+            restored.append(
+                {
+                    "id": str(response_id),
+                    "participant_id": data["meta"].participant_id,
+                    "researcher_id": data["meta"].researcher_id,
+                    "task_localisation": data["meta"].task_localisation,
+                    "complete": self._required_fields.issubset(data),
+                }
+            )
+        return restored
+
+    @EelAPI.exposed
+    def resume(self, response_id: AnyUUID) -> Literal[True]:
+        """Redirect to the start of the task to continue the response *response_id*.
+
+        The task is started from its first page again, with the response's
+        data collected so far (e.g. restored from the journal) kept: answers
+        given again replace the previous ones, except for tasks that append
+        answers to lists (e.g. trials), where they are added again.
+
+        Raises:
+            ResponseNotFoundError: Raised if no response with *response_id* is in
+                progress.
+        """
+        response_id = self._cast_uuid(response_id)
+        self._response_exists_or_fail(response_id)
+        self.logger.info(f"Resuming {self._task_name} response with id {response_id}..")
+        self.set_location(f"start.html?instance={response_id!s}")
+        return True
+
+    @EelAPI.exposed
+    def export_response(self, response_id: AnyUUID) -> str:
+        """Export the data collected so far for the response *response_id* as JSON.
+
+        The data of a response in progress (e.g. an incomplete response
+        restored from the journal) is written as is, without being validated,
+        to :file:`recovered/<task>/<participant_id>_<response_id>.json` in the
+        path for temporarily cached data, so that it can be recovered by hand.
+        As the method is exposed to every page of the app, the file can't be
+        chosen by the caller.
+
+        Arguments:
+            response_id: UUID of the response to export.
+
+        Returns:
+            The path of the file the data was written to.
+
+        Raises:
+            ResponseNotFoundError: Raised if no response with *response_id* is in
+                progress.
+            ResponseStorageError: Raised if the file could not be written.
+        """
+        response_id = self._cast_uuid(response_id)
+        self._response_exists_or_fail(response_id)
+        data = self._response_data[response_id]
+        path = (
+            config.paths.cache / "recovered" / self._task_name
+            / f"{data['meta'].participant_id}_{response_id!s}.json"
+        )
+        self.logger.info(
+            f"Exporting {self._task_name} response with id {response_id} to '{path}'.."
+        )
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(get_codec().dumpb(to_jsonable_python(data), indent=True))
+        except OSError as e:
+            raise errors.ResponseStorageError(
+                f"Could not export response with id {response_id}: {e!s}",
+                task=self._task_name,
+                response_id=response_id,
+            ) from e
+        return str(path)
@@ -0,0 +1,112 @@
+"""Metadata of the app's tasks.
+
+Every task package has a :file:`task.json` metadata file naming the task's API
+class, its Eel namespace, its data directory, and the methods its API exposes
+in addition to those of `ResearchTaskAPI`, e.g.::
+
+    {
+        "api": "eel:ConsentTaskAPI",
+        "eelNamespace": "consent",
+        "dataDir": "Consent",
+        "exposed": ["record_consent"]
+    }
+
+The metadata can be read without importing the tasks, or Eel, so that e.g. the
+app's command line interface can find the tasks' data directories quickly
+(see `research_assistant.booteel.registry` for loading the tasks' APIs).
+"""
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass
+from importlib import resources
+from pathlib import Path
+from typing import Any
+
+from ..config import config
+
+logger = logging.getLogger(__name__)
+
+# Name of the metadata file in a task's package.
+METADATA_FILENAME = "task.json"
+
+
+class TaskRegistryError(Exception):
+    """Error indicating that a task's metadata or API is invalid."""
+
+
+@dataclass(frozen=True)
+class TaskInfo:
+    """Metadata of a task, as read from the :file:`task.json` in its package."""
+
+    # Name of the task (the name of its package, e.g. "lsbqe").
+    name: str
+    # Qualified name of the task's package.
+    package: str
+    # Module (relative to *package*) and name of the task's API class, as "module:class".
+    api: str
+    # Namespace of the task's API on Eel's JavaScript API.
+    eel_namespace: str
+    # Name of the directory (in the path for data files) holding the task's responses.
+    data_dir: str
+    # Names of the methods exposed by the task's API in addition to those of
+    # `ResearchTaskAPI`.
+    exposed: tuple[str, ...]
+
+    @classmethod
+    def from_metadata(cls, name: str, package: str, metadata: dict[str, Any]) -> TaskInfo:
+        """Create the `TaskInfo` of task *name* from its *metadata*.
+
+        Raises:
+            TaskRegistryError: Raised if *metadata* lacks a required key.
+        """
+        try:
+            return cls(
+                name=name,
+                package=package,
+                api=str(metadata["api"]),
+                eel_namespace=str(metadata["eelNamespace"]),
+                data_dir=str(metadata["dataDir"]),
+                exposed=tuple(str(method) for method in metadata.get("exposed", ())),
+            )
+        except (KeyError, TypeError) as e:
+            raise TaskRegistryError(f"Invalid metadata for task {name!r}: {e!s}") from e
+
+    @property
+    def data_path(self) -> Path:
+        """The directory holding the task's responses."""
+        return config.paths.data / self.data_dir
+
+    @property
+    def exposed_names(self) -> list[str]:
+        """The names under which the task's API methods are exposed via Eel."""
+        from .task_api import ResearchTaskAPI
+
+        methods = {func.__name__ for func in ResearchTaskAPI.get_exposed_functions()}
+        methods.update(self.exposed)
+        return [f"{self.eel_namespace}_{method}" for method in sorted(methods)]
+
+
+def discover_tasks(package: str) -> dict[str, TaskInfo]:
+    """Discover the tasks in the subpackages of *package* from their metadata.
+
+    Subpackages without a metadata file are skipped, those with invalid
+    metadata are logged as errors and skipped.
+
+    Returns:
+        The tasks' metadata, by task name.
+    """
+    tasks: dict[str, TaskInfo] = {}
+    for item in sorted(resources.files(package).iterdir(), key=lambda item: item.name):
+        metadata_file = item / METADATA_FILENAME
+        if not (item.is_dir() and metadata_file.is_file()):
+            continue
+        try:
+            metadata = json.loads(metadata_file.read_text(encoding="utf-8"))
+            tasks[item.name] = TaskInfo.from_metadata(
+                item.name, f"{package}.{item.name}", metadata
+            )
+        except (OSError, ValueError, TaskRegistryError) as e:
+            logger.error(f"Could not register task {item.name!r}: {e!s}")
+    return tasks
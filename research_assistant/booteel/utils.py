@@ -2,11 +2,13 @@
 
 import html
 import logging
+import threading
 import traceback
 from typing import Any, Callable, Optional
 from urllib.parse import quote as urlquote
 
 import eel
+import gevent  # type: ignore
 
 # Set up module loggers
 pylogger = logging.getLogger(__name__ + ".py")
@@ -60,6 +62,49 @@ def displayexception(exc: Exception):
     modal(title, body, icon="bug-fill text-danger")
 
 
+class ProgressReporter:
+    """Forward progress updates from any thread to a client-side progress toast.
+
+    `ProgressReporter.update()` may be called from worker threads (e.g. from
+    the gevent thread pool). Updates are handed to the event loop through a
+    gevent async watcher and sent to the frontend from there; updates arriving
+    faster than they can be sent are coalesced, so that only the latest
+    progress is shown. The reporter must be created, and closed, on the thread
+    running the gevent hub.
+    """
+
+    def __init__(self, progress_id: str, title: str):
+        """Initialise a ProgressReporter for a new progress toast with *title*."""
+        self.progress_id = progress_id
+        self.title = title
+        self._latest: tuple[float, str, bool] = (0.0, "", False)
+        self._lock = threading.Lock()
+        self._watcher = gevent.get_hub().loop.async_()  # type: ignore
+        self._watcher.start(self._on_update)
+
+    def update(self, fraction: float, message: str = "", done: bool = False) -> None:
+        """Report progress as a *fraction* between 0 and 1 (thread-safe)."""
+        with self._lock:
+            self._latest = (fraction, message, done)
+        self._watcher.send()
+
+    def _on_update(self) -> None:
+        # Runs in the hub, which must not block, so the update is sent from a greenlet.
+        gevent.spawn(self._send)
+
+    def _send(self) -> None:
+        with self._lock:
+            fraction, message, done = self._latest
+        eel._booteel_progress(  # type: ignore
+            self.progress_id, self.title, fraction, message, done
+        )
+
+    def close(self) -> None:
+        """Send the latest progress one last time and stop forwarding updates."""
+        self._watcher.close()
+        self._send()
+
+
 def buildquery(params: dict[str, str]) -> str:
     """Build a URL query string based on a set of key-value pairs of parameters."""
     return "&".join(
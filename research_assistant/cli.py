@@ -0,0 +1,382 @@
+"""Command line interface of the LART Research Assistant app.
+
+`main()` parses the command line and runs the app's maintenance commands
+(:code:`--backup`, :code:`--restore`, :code:`--merge`, :code:`--export-tables`,
+:code:`--config` and :code:`--rebuild-index`) without importing the app itself,
+so that they start quickly, e.g. when scripted across many devices. Each
+command imports only the modules it needs, and logs only to stderr. Without a
+maintenance command, the app is launched with `research_assistant.app.run()`.
+"""
+import argparse
+import logging
+import multiprocessing
+import sys
+from typing import TYPE_CHECKING, Any, Callable, Sequence
+
+from .config import config
+
+if TYPE_CHECKING:
+    from .logqueue import LogListener
+
+logger = logging.getLogger(__name__)
+
+# Name of the app's root logger.
+ROOT_LOGGER_NAME = __name__.split(".", maxsplit=1)[0]
+
+# Qualified name of the package holding the tasks.
+TASKS_PACKAGE = f"{ROOT_LOGGER_NAME}.tasks"
+
+# Listener writing the root logger's queued records (see `configure_logging()`).
+log_listener: "LogListener | None" = None
+
+
+class StoreOptionalAction(argparse.Action):
+    """Store the (optional) value of an argument, `None` if it is given without one."""
+
+    def __call__(
+        self,
+        parser: argparse.ArgumentParser,
+        namespace: argparse.Namespace,
+        values: str | Sequence[Any] | None,
+        option_string: str | None = ...,
+    ) -> None:
+        setattr(namespace, self.dest, values)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the parser for the app's command line arguments."""
+    argparser = argparse.ArgumentParser(
+        description="Launch the LART Research Assistant App."
+    )
+
+    argparser.add_argument(
+        "-b",
+        "--backup",
+        action=StoreOptionalAction,
+        nargs="?",
+        dest="backup",
+        metavar="FILE",
+        help=(
+            "backup data as ZIP archive to FILE if given,\n"
+            "otherwise display a save as ... dialog."
+        ),
+        default=False,
+    )
+
+    argparser.add_argument(
+        "--incremental",
+        dest="incremental",
+        action="store_true",
+        help=(
+            "with --backup, only include data added or changed\n"
+            "since the previous backup."
+        ),
+    )
+
+    argparser.add_argument(
+        "--restore",
+        dest="restore",
+        metavar="ARCHIVE",
+        nargs="+",
+        help=(
+            "restore a full backup and all of its incremental backups\n"
+            "(given in any order) to a new directory and exit."
+        ),
+    )
+
+    argparser.add_argument(
+        "--restore-to",
+        dest="restore_to",
+        metavar="DIR",
+        help=(
+            "directory to restore backups to with --restore,\n"
+            "default = ARCHIVE_restored next to the latest archive."
+        ),
+    )
+
+    argparser.add_argument(
+        "--merge",
+        dest="merge",
+        metavar="ARCHIVE",
+        nargs="+",
+        help=(
+            "merge the responses in backup archives from many devices\n"
+            "into a single SQLite database and exit. ARCHIVE may be a\n"
+            "directory of archives or a wildcard pattern. Responses are\n"
+            "de-duplicated by id, keeping the most recently modified version."
+        ),
+    )
+
+    argparser.add_argument(
+        "--merge-to",
+        dest="merge_to",
+        metavar="FILE",
+        help=(
+            "SQLite database to merge responses into with --merge,\n"
+            "default = merged_responses.sqlite3."
+        ),
+    )
+
+    argparser.add_argument(
+        "--export-tables",
+        dest="export_tables",
+        metavar="DIR",
+        help=(
+            "export the stored responses of all tasks as flat tables\n"
+            "(one file per table) to the directory DIR and exit."
+        ),
+    )
+
+    argparser.add_argument(
+        "--table-format",
+        dest="table_format",
+        choices=("csv", "parquet"),
+        default="csv",
+        help=(
+            "format of the tables written with --export-tables,\n"
+            "choices = {csv, parquet} (requires pyarrow),\n"
+            "default = csv"
+        ),
+    )
+
+    argparser.add_argument(
+        "--export-from",
+        dest="export_from",
+        metavar="FILE",
+        help=(
+            "with --export-tables, read the responses from the SQLite\n"
+            "database FILE (e.g. one created with --merge) instead."
+        ),
+    )
+
+    argparser.add_argument(
+        "-c",
+        "--config",
+        action=StoreOptionalAction,
+        nargs="?",
+        dest="config",
+        metavar="CMD",
+        help=(
+            "Modify the app's settings file according to CMD.\n"
+            "CMD may be one of the literals 'clear' (delete the "
+            "current settings file), 'update' (ensure the settings "
+            "file is updated to include all current app settings, "
+            "preserving compatible already-saved settings), or "
+            "'reset' (overwrite the current settings file with the "
+            "app defaults.\n"
+            "Alternatively, CMD may be a JSON string of key-value "
+            "pairs enclosed by curly braces ('{...}'), where each key "
+            "represents a configuration attribute and the value the new "
+            'value it should be set to. For example \'{"sequences.consent":'
+            '"memorytask"\'} will set the follow-on sequence for the consent '
+            "task to the memorytask."
+        ),
+        default=False,
+    )
+
+    argparser.add_argument(
+        "--debug",
+        dest="level",
+        metavar="LEVEL",
+        choices=("debug", "info", "warning", "error", "critical"),
+        help=(
+            "set the debug level,\n"
+            "choices = {debug, info, warning, error, critical},\n"
+            "default = warning"
+        ),
+    )
+
+    argparser.add_argument(
+        "--disable-gpu",
+        dest="disable_gpu",
+        action="store_true",
+        help=(
+            "Pass the --disable-gpu flag to created chrome "
+            "instances.\nCan be useful when running in a VM."
+        ),
+    )
+
+    argparser.add_argument(
+        "--rebuild-index",
+        dest="rebuild_index",
+        action="store_true",
+        help=(
+            "Rebuild the index of stored responses from the files in\n"
+            "the path for data files and exit."
+        ),
+    )
+
+    return argparser
+
+
+def configure_logging(log_file: bool = False, queued: bool = False) -> logging.Logger:
+    """Set up the app's root logger to log to stderr and, if *log_file*, the app log dir.
+
+    Any handlers previously added to the root logger are replaced. If *queued*,
+    the records are written by a `research_assistant.logqueue.LogListener`
+    thread (available as `log_listener`), so that logging doesn't block the
+    caller on I/O.
+
+    Returns:
+        The app's root logger.
+    """
+    global log_listener
+    logging.getLogger("geventwebsocket.handler").setLevel(logging.WARNING)
+    root_logger = logging.getLogger(ROOT_LOGGER_NAME)
+    root_logger.setLevel(config.logging.default_level)
+    for handler in list(root_logger.handlers):  # Including the default NullHandler
+        root_logger.removeHandler(handler)
+    if log_listener is not None:
+        log_listener.stop()
+        log_listener = None
+    handlers: list[logging.Handler] = [
+        config.logging.get_stream_handler(batched=queued)  # > sys.stderr
+    ]
+    if log_file:
+        handlers.append(
+            config.logging.get_file_handler(ROOT_LOGGER_NAME, batched=queued)  # > app log dir
+        )
+    if queued:
+        from .logqueue import LogListener, LogQueueHandler
+
+        log_listener = LogListener(handlers)
+        log_listener.start()
+        handlers = [LogQueueHandler(log_listener.queue)]
+    for handler in handlers:
+        root_logger.addHandler(handler)
+    root_logger.propagate = False
+    return root_logger
+
+
+def get_log_level(args: argparse.Namespace) -> int:
+    """Return the log level selected with :code:`--debug` (or the default level)."""
+    try:
+        return getattr(logging, args.level.upper())
+    except AttributeError:
+        return config.logging.default_level
+
+
+def register_tasks() -> None:
+    """Register the tasks' data paths with the response index, without loading the tasks."""
+    from .booteel.task_info import discover_tasks
+    from .storage import get_index
+
+    for info in discover_tasks(TASKS_PACKAGE).values():
+        get_index().register_task(info.name, info.data_path)
+
+
+def _backup(args: argparse.Namespace) -> bool:
+    from .utils import export_backup
+
+    _flush_running_instance()
+    return export_backup(args.backup, incremental=args.incremental)
+
+
+def _flush_running_instance() -> None:
+    """Ask the running instance of the app, if any, to write the responses it has queued.
+
+    Only possible in single-instance mode (see `research_assistant.instance`).
+    """
+    if not config.single_instance:
+        return
+    from .instance import InstanceLock, hand_off
+
+    lock = InstanceLock()
+    if lock.acquire():
+        lock.release()  # The app isn't running
+        return
+    if not hand_off("flush"):
+        logger.warning("Responses queued by the running app may be missing from the backup.")
+
+
+def _restore(args: argparse.Namespace) -> bool:
+    from .utils import restore_backups
+
+    return restore_backups(args.restore, args.restore_to)
+
+
+def _merge(args: argparse.Namespace) -> bool:
+    from .utils import merge_data_backups
+
+    register_tasks()
+    return merge_data_backups(args.merge, args.merge_to)
+
+
+def _export_tables(args: argparse.Namespace) -> bool:
+    from .booteel.registry import TaskRegistry
+    from .utils import export_data_tables
+
+    tasks = {
+        task: (api.response_class, api.task_data_path)
+        for task, api in TaskRegistry(TASKS_PACKAGE).load_all().items()
+    }
+    return export_data_tables(args.export_tables, tasks, args.table_format, args.export_from)
+
+
+def _config(args: argparse.Namespace) -> bool:
+    from .utils import manage_settings
+
+    return manage_settings(args.config)
+
+
+def _rebuild_index(args: argparse.Namespace) -> bool:
+    from .storage import get_index
+
+    register_tasks()
+    get_index().rebuild()
+    return True
+
+
+def get_command(args: argparse.Namespace) -> Callable[[argparse.Namespace], bool] | None:
+    """Return the maintenance command selected by *args*, `None` to launch the app.
+
+    If several commands are given, the first of :code:`--backup`,
+    :code:`--restore`, :code:`--merge`, :code:`--export-tables`,
+    :code:`--config` and :code:`--rebuild-index` is selected.
+    """
+    commands: tuple[tuple[bool, Callable[[argparse.Namespace], bool]], ...] = (
+        (args.backup is not False, _backup),
+        (bool(args.restore), _restore),
+        (bool(args.merge), _merge),
+        (bool(args.export_tables), _export_tables),
+        (args.config is not False, _config),
+        (bool(args.rebuild_index), _rebuild_index),
+    )
+    return next((command for selected, command in commands if selected), None)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Parse the command line arguments *argv*, then run a maintenance command or the app.
+
+    Maintenance commands exit with status 0 if they succeed, 1 otherwise. If
+    the app is launched while it is already running (and `Config.single_instance`
+    is enabled), the running instance is asked to open a new window instead
+    (see `research_assistant.instance`).
+    """
+    # Enable multiprocessing in frozen apps (e.g. pyinstaller)
+    multiprocessing.freeze_support()
+    args = build_parser().parse_args(argv)
+    root_logger = configure_logging()
+    root_logger.setLevel(get_log_level(args))
+    command = get_command(args)
+    if command is None:
+        instance_lock = None
+        if config.single_instance:
+            from .instance import InstanceLock, hand_off
+
+            instance_lock = InstanceLock()
+            if not instance_lock.acquire():
+                if hand_off("open"):
+                    sys.exit(0)
+                logger.warning("Starting a separate instance of the app.")
+                instance_lock = None
+        from . import app
+
+        app.run(args, instance_lock)
+        return
+    logger.debug("Running command with command line arguments: %s", args)
+    sys.exit(0 if command(args) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -30,17 +30,21 @@ Example:
 """
 from __future__ import annotations
 
-import json
 import logging
 from copy import copy
 from dataclasses import MISSING, asdict, dataclass, field, fields, is_dataclass
 from datetime import datetime
+from json import JSONDecodeError
+from logging.handlers import RotatingFileHandler
 from pathlib import Path
 from typing import (Any, Callable, ClassVar, Final, Optional, Union,
                     get_type_hints)
 
 from platformdirs import PlatformDirs
 
+from ..jsoncodec import get_codec
+from ..logqueue import BatchRotatingFileHandler, BatchStreamHandler
+
 __all__ = ["config", "Config", "_default_paths"]
 
 logger = logging.getLogger(__name__)
@@ -52,14 +56,15 @@ _safeappauthor: str = "LART"
 _default_paths = PlatformDirs(_safeappname, _safeappauthor, roaming=True)
 
 
-class JSONPathEncoder(json.JSONEncoder):
-    """JSON Encoder capable of serialising pathlib Path objects."""
+def encode_path(o: Any) -> str:
+    """Encode pathlib Path objects as strings when saving the configuration as JSON.
 
-    def default(self, o: Any):
-        """Encodes pathlib Path objects as strings, otherwise uses default JSONEncoder."""
-        if isinstance(o, Path):
-            return str(o)
-        return json.JSONEncoder.default(self, o)
+    Raises:
+        TypeError: Raised if *o* is not a Path.
+    """
+    if isinstance(o, Path):
+        return str(o)
+    raise TypeError(f"Object of type {o.__class__.__name__} is not JSON serializable")
 
 
 class DataclassDictMixin:
@@ -260,6 +265,18 @@ class Logging(DataclassDictMixin, DataclassDocMixin):
             },
         },
     )
+    max_file_size: int = field(
+        default=10,
+        metadata={
+            "doc_label": "Maximum log file size (MiB)",
+            "doc_help": (
+                "The size, in mebibytes, at which a log file is rotated: the "
+                "file is then renamed (with the suffix '.1', replacing the "
+                "previously rotated file) and a new log file is started. "
+                "Set to 0 to never rotate log files."
+            ),
+        },
+    )
     stream_format: str = field(
         default="[{levelname}]\t{name}: {message}",
         metadata={
@@ -274,17 +291,44 @@ class Logging(DataclassDictMixin, DataclassDocMixin):
             "doc_help": "Format for log and error messages in the log files.",
         },
     )
+    rpc_metrics: str = field(
+        default="basic",
+        metadata={
+            "doc_label": "Record metrics of the app's backend calls",
+            "doc_help": (
+                "Determines which metrics are recorded for the calls from the "
+                "app's pages to its backend (e.g. to store an answer), and "
+                "written to a file in the path for log files when the app "
+                "shuts down. 'Basic' records the number, duration and errors "
+                "of the calls at a negligible cost. 'Detailed' also records "
+                "the amount of data sent by the calls, which slows them down "
+                "and is only meant for diagnosing problems."
+            ),
+            "doc_values": {"Off": "off", "Basic": "basic", "Detailed": "detailed"},
+        },
+    )
+
+    def get_stream_handler(
+        self, stream: Any = None, batched: bool = False
+    ) -> logging.StreamHandler[Any]:
+        """Return a `logging.StreamHandler` object for logging.
 
-    def get_stream_handler(self, stream: Any = None) -> logging.StreamHandler[Any]:
-        """Return a `logging.StreamHandler` object for logging."""
-        sh = logging.StreamHandler(stream)
+        If *batched*, the handler only flushes its stream once per batch of
+        records written by a `research_assistant.logqueue.LogListener`.
+        """
+        sh = BatchStreamHandler(stream) if batched else logging.StreamHandler(stream)
         sh.setFormatter(logging.Formatter(self.stream_format, style="{"))
         return sh
 
     def get_file_handler(
-        self, name: str, path: Optional[Union[Path, str]] = None
+        self, name: str, path: Optional[Union[Path, str]] = None, batched: bool = False
     ) -> logging.FileHandler:
-        """Return a `logging.FileHandler` object for logging."""
+        """Return a `logging.FileHandler` object for logging.
+
+        The log file is rotated once it reaches *max_file_size* MiB. If
+        *batched*, the handler only flushes the file once per batch of records
+        written by a `research_assistant.logqueue.LogListener`.
+        """
         if path is None:
             path = config.paths.logs
         elif isinstance(path, str):
@@ -296,7 +340,10 @@ class Logging(DataclassDictMixin, DataclassDocMixin):
                 f"The specified path '{path}' is not a valid directory name."
             )
         filepath = self._get_file_path(name, path)
-        fh = logging.FileHandler(filepath, mode="w", delay=True)
+        handler_class = BatchRotatingFileHandler if batched else RotatingFileHandler
+        fh = handler_class(
+            filepath, maxBytes=max(self.max_file_size, 0) * 1024 * 1024, backupCount=1, delay=True
+        )
         fh.setFormatter(logging.Formatter(self.file_format, style="{"))
         return fh
 
@@ -312,6 +359,8 @@ class Logging(DataclassDictMixin, DataclassDocMixin):
         if len(files) >= (self.max_files - 1):
             for i in range(len(files) - self.max_files - 1):
                 files[i].unlink()
+                for rotated in path.glob(f"{files[i].name}.*"):
+                    rotated.unlink()
         return path / f"{name}_{datetime.now():%Y%m%dT%H%M%S_%f}.log"
 
 
@@ -372,10 +421,95 @@ class Sequences(DataclassDictMixin, DataclassDocMixin):
     )
 
 
+@dataclass
+class Storage(DataclassDictMixin, DataclassDocMixin):
+    """Class for response storage configuration."""
+
+    _backend_options: ClassVar[dict[str, str]] = {
+        "One JSON file per response": "json",
+        "SQLite database": "sqlite",
+    }
+    backend: str = field(
+        default="json",
+        metadata={
+            "doc_label": "Response storage backend",
+            "doc_help": (
+                "Determines how responses are stored in the path for data files. "
+                "By default each response is stored in its own JSON file, "
+                "organised by task and localisation. Alternatively, responses "
+                "can be stored as rows in a single SQLite database, which is "
+                "faster to back up and scan when very many responses have been "
+                "collected on the same device.\n"
+                "Changing the backend does not move responses that have "
+                "already been stored."
+            ),
+            "doc_values": _backend_options,
+        },
+    )
+    write_mode: str = field(
+        default="durable",
+        metadata={
+            "doc_label": "Response write mode",
+            "doc_help": (
+                "Determines how responses are written to storage when a task "
+                "is completed. 'Immediate' writes the response before the app "
+                "continues, which can make the app unresponsive on slow disks "
+                "or USB sticks. 'Background' hands the response to a "
+                "background writer and continues straight away. 'Background, "
+                "wait for disk' also uses the background writer, but only "
+                "continues once the response has been safely flushed to disk."
+            ),
+            "doc_values": {
+                "Immediate": "immediate",
+                "Background": "background",
+                "Background, wait for disk": "durable",
+            },
+        },
+    )
+    journal: bool = field(
+        default=True,
+        metadata={
+            "doc_label": "Journal responses in progress",
+            "doc_help": (
+                "If enabled, every answer given in a task is immediately "
+                "recorded in a journal in the path for temporarily cached data, "
+                "so that responses in progress can be restored if the app is "
+                "closed or crashes before the task is completed. The journal "
+                "of a response is removed once the response has been stored."
+            ),
+            "doc_values": {"Enabled": True, "Disabled": False},
+        },
+    )
+    journal_max_age: int = field(
+        default=30,
+        metadata={
+            "doc_label": "Days to keep journals of unfinished responses",
+            "doc_help": (
+                "Journals of responses that were neither stored nor discarded "
+                "are removed when the app starts if they haven't changed for "
+                "this many days. Set to 0 to keep them until the responses "
+                "are stored or discarded."
+            ),
+        },
+    )
+    sqlite_filename: str = field(
+        default="responses.sqlite3",
+        metadata={
+            "doc_label": "SQLite database file name",
+            "doc_help": (
+                "Name of the database file (inside the path for data files) "
+                "used when responses are stored with the SQLite backend."
+            ),
+        },
+    )
+
+
 @dataclass
 class Config(DataclassDictMixin, DataclassDocMixin):
     """Class for keeping track of App configuration data."""
 
+    # Callbacks called whenever the configuration has been saved (see `Config.on_save()`).
+    _save_callbacks: ClassVar[list[Callable[[], Any]]] = []
     appname: str = field(default=_appname, init=False)
     appauthor: str = field(default=_appauthor, init=False)
     appversion: str = field(default="0.3.4", init=False)
@@ -425,6 +559,16 @@ class Config(DataclassDictMixin, DataclassDocMixin):
             ),
         },
     )
+    storage: Storage = field(
+        default_factory=lambda: Storage(),
+        metadata={
+            "doc_label": "Response storage",
+            "doc_help": (
+                "Configures how the responses collected by the app's tasks "
+                "are stored."
+            ),
+        },
+    )
     shutdown_delay: float = field(
         default=2.0,
         metadata={
@@ -437,6 +581,46 @@ class Config(DataclassDictMixin, DataclassDocMixin):
             ),
         },
     )
+    single_instance: bool = field(
+        default=True,
+        metadata={
+            "doc_label": "Single instance",
+            "doc_help": (
+                "If enabled, launching the app while it is already running "
+                "opens a new window of the running app rather than starting "
+                "the app again, which is almost instant."
+            ),
+            "doc_values": {"Enabled": True, "Disabled": False},
+        },
+    )
+    resident_time: float = field(
+        default=0.0,
+        metadata={
+            "doc_label": "Keep running in the background (seconds)",
+            "doc_help": (
+                "With 'Single instance' enabled, the number of seconds the "
+                "app's backend keeps running in the background after the last "
+                "window has been closed (if longer than the shutdown delay), "
+                "so that the app opens instantly when it is launched again "
+                "within that time, e.g. for the next participant.\n"
+                "Responses are stored as usual while the backend keeps running."
+            ),
+        },
+    )
+    localisation_cache_size: int = field(
+        default=16,
+        metadata={
+            "doc_label": "Localisation cache size (MiB)",
+            "doc_help": (
+                "The maximum amount of memory, in mebibytes, used to keep the "
+                "texts of task localisations in memory once they have been "
+                "loaded. When the limit is reached, the texts used least "
+                "recently are dropped and loaded again when needed.\n"
+                "Lowering this number can help on devices with very little "
+                "memory, at the cost of slightly slower page loads."
+            ),
+        },
+    )
 
     def save(self, filename: str = "settings.json"):
         """Save configuration to a file."""
@@ -444,32 +628,38 @@ class Config(DataclassDictMixin, DataclassDocMixin):
         if not path.parent.exists():
             path.parent.mkdir(parents=True, exist_ok=True)
         d = self.asdict()
+        codec = get_codec()
         logging.debug(
             f"Saving configuration to file: '{path}' "
-            f"with values {json.dumps(d, cls=JSONPathEncoder)}"
+            f"with values {codec.dumps(d, default=encode_path)}"
         )
         try:
-            with path.open("w") as fp:
-                json.dump(d, fp, indent=4, cls=JSONPathEncoder)
+            path.write_bytes(codec.dumpb(d, indent=True, default=encode_path))
         except Exception as e:
             logging.error(e)
             raise
+        for callback in self._save_callbacks:
+            callback()
+
+    def on_save(self, callback: Callable[[], Any]) -> None:
+        """Call *callback* whenever the configuration has been saved (e.g. to clear caches)."""
+        self._save_callbacks.append(callback)
 
     @classmethod
     def load(cls, filename: str = "settings.json") -> Config:
         """Load configuration from a file or return default Config()."""
         path = _default_paths.user_config_path / filename
         if path.exists():
+            codec = get_codec()
             try:
-                with path.open("r") as fp:
-                    d = json.load(fp)
+                d = codec.loads(path.read_bytes())
                 cfg = Config.fromdict(d, ignorefaults=True)
                 logging.debug(
                     f"Successfully loaded config from file ('{path}') with "
-                    f"values: {json.dumps(cfg.asdict(), cls=JSONPathEncoder)}"
+                    f"values: {codec.dumps(cfg.asdict(), default=encode_path)}"
                 )
                 return cfg
-            except (IOError, json.JSONDecodeError) as e:
+            except (IOError, JSONDecodeError) as e:
                 logging.error(f"Failed to load config file: {e}.")
                 return Config()
         logging.debug(
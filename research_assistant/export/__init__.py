@@ -0,0 +1,42 @@
+"""Export of the stored responses to flat tables for analysis.
+
+Analysis software generally works best with flat tables rather than the nested
+JSON in which responses are stored. `export_tables()` flattens the responses
+of each task into a set of tables, as described by the `TableSchema` derived
+once from the task's response model by `table_schema()`:
+
+    * a top-level table named after the task (e.g. :code:`lsbqe`), with one
+      row per response and one column per scalar field, with the names of
+      nested fields joined with dots (e.g. :code:`meta.participant_id`,
+      :code:`club.life_stages.infancy_age`);
+    * a long-format child table for each list in the response (e.g.
+      :code:`lsbqe.ldb.languages`), with one row per list item, keyed by the
+      column :code:`response_id` and the item's position in the list.
+
+Responses are streamed from the storage backend and written in batches, so
+that memory use stays constant however many responses are exported. Tables
+are written as CSV files, or as Parquet files if the optional *pyarrow*
+package is installed (see `available_formats()`)::
+
+    from research_assistant.export import export_tables
+    from research_assistant.tasks.memorytask.datamodel import MemoryTaskResponse
+
+    export_tables("tables", {"memorytask": (MemoryTaskResponse, data_path)})
+"""
+from .schema import Column, TableSchema, table_schema
+from .tables import (TABLE_FORMATS, CsvTableWriter, ExportError, ParquetTableWriter,
+                     TableWriter, available_formats, export_task_tables, export_tables)
+
+__all__ = [
+    "TABLE_FORMATS",
+    "Column",
+    "CsvTableWriter",
+    "ExportError",
+    "ParquetTableWriter",
+    "TableSchema",
+    "TableWriter",
+    "available_formats",
+    "export_task_tables",
+    "export_tables",
+    "table_schema",
+]
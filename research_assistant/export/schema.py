@@ -0,0 +1,208 @@
+"""Flat table schemas derived from the tasks' response data models."""
+from __future__ import annotations
+
+import collections.abc
+import json
+import types
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Annotated, Any, Iterator, Literal, Union, get_args, get_origin
+from uuid import UUID
+
+from pydantic import (AwareDatetime, BaseModel, FutureDate, FutureDatetime, NaiveDatetime,
+                      PastDate, PastDatetime)
+
+# Types of the values in table columns, in the order in which they are matched
+# (bool before int, datetime before date). Columns of any other type hold the
+# JSON serialisation of their values.
+COLUMN_TYPES: tuple[type, ...] = (bool, int, float, str, datetime, date, UUID)
+
+# Pydantic's constrained date and time types, which are not subclasses of the
+# types they validate.
+_TYPE_ALIASES: dict[Any, type] = {
+    PastDate: date,
+    FutureDate: date,
+    AwareDatetime: datetime,
+    NaiveDatetime: datetime,
+    PastDatetime: datetime,
+    FutureDatetime: datetime,
+}
+
+# Generic origins of the types exported as child tables.
+_LIST_ORIGINS = (
+    list,
+    set,
+    frozenset,
+    collections.abc.Collection,
+    collections.abc.Sequence,
+    collections.abc.Set,
+)
+
+
+@dataclass(frozen=True)
+class Column:
+    """A column of a table, holding a single (nested) scalar field of a model."""
+
+    # Name of the column: the path of the field, joined with dots.
+    name: str
+    # Path of the field in the data of a row's item.
+    path: tuple[str, ...]
+    # Type of the values (one of `COLUMN_TYPES`, or `object` for JSON values).
+    type: type
+    # Whether the column may contain missing values.
+    nullable: bool
+
+    def value(self, data: Any) -> Any:
+        """Return the value of the column for *data*, the raw data of a row's item."""
+        for key in self.path:
+            if not isinstance(data, dict):
+                return None
+            data = data.get(key)
+        if self.type is object and data is not None:
+            return json.dumps(data, ensure_ascii=False)
+        return data
+
+
+@dataclass
+class TableSchema:
+    """Schema of a flat table holding the data of a response model.
+
+    The top-level table of a task has one row per response, with one column
+    per scalar field of the response model, including the fields of nested
+    models (e.g. :code:`meta.participant_id` or :code:`lsb.sex`).
+
+    Fields holding lists (e.g. the residencies in an LSBQe response) are
+    exported as long-format child tables with one row per list item. The rows
+    of a child table are keyed by the response id (column
+    :code:`response_id`) and the position of the item in each enclosing list
+    (e.g. :code:`residencies_index`), so that they can be joined with their
+    parent tables.
+    """
+
+    # Name of the table, e.g. "lsbqe" or "lsbqe.lsb.residencies".
+    name: str
+    # Names of the key columns, which precede the data columns.
+    keys: tuple[str, ...] = ()
+    # Data columns.
+    columns: list[Column] = field(default_factory=list)
+    # Child tables for the list fields of the table's items.
+    children: list[TableSchema] = field(default_factory=list)
+    # Path of the list holding the table's items in the items of its parent table.
+    path: tuple[str, ...] = ()
+
+    @property
+    def column_names(self) -> list[str]:
+        """The names of all columns of the table, key columns first."""
+        return [*self.keys, *(column.name for column in self.columns)]
+
+    def walk(self) -> Iterator[TableSchema]:
+        """Iterate over the table and all of its descendant tables."""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def rows(self, data: dict[str, Any]) -> Iterator[tuple[TableSchema, tuple[Any, ...]]]:
+        """Flatten the raw data of a response into rows.
+
+        Yields:
+            Pairs of the table (this table or one of its descendants) and a row
+            for the table.
+        """
+        yield from self._rows(data, (), (data.get("id"),))
+
+    def _rows(
+        self, data: Any, keys: tuple[Any, ...], child_keys: tuple[Any, ...]
+    ) -> Iterator[tuple[TableSchema, tuple[Any, ...]]]:
+        yield self, (*keys, *(column.value(data) for column in self.columns))
+        for child in self.children:
+            items = _lookup(data, child.path)
+            if not isinstance(items, list):
+                continue
+            for i, item in enumerate(items):
+                item_keys = (*child_keys, i)
+                yield from child._rows(item, item_keys, item_keys)
+
+
+def _lookup(data: Any, path: tuple[str, ...]) -> Any:
+    for key in path:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def _unwrap(annotation: Any) -> tuple[Any, bool]:
+    """Strip :code:`Annotated` and :code:`Optional` from *annotation*.
+
+    Returns:
+        The bare type and whether it was optional.
+    """
+    nullable = False
+    while True:
+        origin = get_origin(annotation)
+        if origin is Annotated:
+            annotation = get_args(annotation)[0]
+        elif origin in (Union, types.UnionType):
+            args = get_args(annotation)
+            members = [arg for arg in args if arg is not type(None)]
+            nullable = nullable or len(members) < len(args)
+            if len(members) != 1:
+                return Any, nullable
+            annotation = members[0]
+        elif origin is Literal:
+            return type(get_args(annotation)[0]), nullable
+        else:
+            return annotation, nullable
+
+
+def _column_type(annotation: Any) -> type:
+    annotation = _TYPE_ALIASES.get(annotation, annotation)
+    if isinstance(annotation, type):
+        for column_type in COLUMN_TYPES:
+            if issubclass(annotation, column_type):
+                return column_type
+    return object
+
+
+def _add_field(table: TableSchema, annotation: Any, path: tuple[str, ...], nullable: bool) -> None:
+    """Add the columns (or child table) for the field at *path* of type *annotation*."""
+    annotation, optional = _unwrap(annotation)
+    nullable = nullable or optional
+    origin = get_origin(annotation) or annotation
+    if origin in _LIST_ORIGINS:
+        args = get_args(annotation)
+        child = TableSchema(
+            name=".".join((table.name, *path)),
+            keys=(*(table.keys or ("response_id",)), f"{path[-1]}_index"),
+            path=path,
+        )
+        _add_field(child, args[0] if args else Any, (), False)
+        table.children.append(child)
+    elif isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        for name, info in annotation.model_fields.items():
+            _add_field(table, info.annotation, (*path, name), nullable)
+    else:
+        table.columns.append(
+            Column(
+                name=".".join(path) or "value",
+                path=path,
+                type=_column_type(annotation),
+                nullable=nullable,
+            )
+        )
+
+
+@lru_cache(maxsize=None)
+def table_schema(model: type[BaseModel], name: str) -> TableSchema:
+    """Return the schema of the tables for the response model *model*.
+
+    The schema is derived from the model's fields once and then cached.
+
+    Arguments:
+        model: The (top-level) response model, e.g. `LsbqeResponse`.
+        name: The name of the top-level table, usually the task's name.
+    """
+    table = TableSchema(name)
+    _add_field(table, model, (), False)
+    return table
@@ -0,0 +1,297 @@
+"""Streaming export of the stored responses to flat tables (CSV or Parquet)."""
+from __future__ import annotations
+
+import csv
+import importlib.util
+import logging
+import sys
+import time
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from pathlib import Path
+from typing import IO, Any, Callable, Iterable, Mapping
+from uuid import UUID
+
+from ..datamodels.models import ResponseBase
+from ..storage import StorageBackend, StorageError, get_backend
+from .schema import TableSchema, table_schema
+
+logger = logging.getLogger(__name__)
+
+# Table formats by name, with the file name suffix of the tables.
+TABLE_FORMATS: dict[str, str] = {
+    "csv": ".csv",
+    "parquet": ".parquet",
+}
+
+# Number of rows buffered per table before they are written.
+DEFAULT_BATCH_SIZE = 1000
+
+# Exceptions that may be raised when reading the responses or writing the tables
+# (see `_export_errors()`).
+_EXPORT_ERRORS: tuple[type[Exception], ...] = (OSError, StorageError)
+
+
+class ExportError(Exception):
+    """Error indicating that the responses could not be exported."""
+
+
+def available_formats() -> list[str]:
+    """Return the names of the table formats available on this system.
+
+    The :code:`"parquet"` format requires the optional *pyarrow* package.
+    """
+    has_pyarrow = importlib.util.find_spec("pyarrow") is not None
+    return [name for name in TABLE_FORMATS if name != "parquet" or has_pyarrow]
+
+
+def _import_pyarrow() -> Any:
+    """Import the optional *pyarrow* package, which is only imported once needed.
+
+    Returns:
+        The :code:`pyarrow` module (with :code:`pyarrow.parquet`), or `None`
+        if it is not installed.
+    """
+    try:
+        import pyarrow  # type: ignore
+        import pyarrow.parquet  # type: ignore
+    except ImportError:  # pragma: no cover - optional dependency
+        return None
+    return pyarrow
+
+
+def _export_errors() -> tuple[type[Exception], ...]:
+    """Return the exceptions that may be raised when reading the responses or writing the tables."""
+    pyarrow = sys.modules.get("pyarrow")
+    return _EXPORT_ERRORS + ((pyarrow.ArrowException,) if pyarrow is not None else ())
+
+
+class TableWriter(ABC):
+    """Base class for writers streaming the rows of a table to a file."""
+
+    filename: Path
+    schema: TableSchema
+    rows_written: int
+
+    def __init__(self, filename: Path, schema: TableSchema):
+        """Initialise a writer for the table *schema*, creating the file *filename*."""
+        self.filename = filename
+        self.schema = schema
+        self.rows_written = 0
+
+    @abstractmethod
+    def write(self, rows: list[tuple[Any, ...]]) -> None:
+        """Append a batch of *rows* to the table."""
+        ...
+
+    @abstractmethod
+    def close(self) -> None:
+        """Finish writing the table and close its file."""
+        ...
+
+
+class CsvTableWriter(TableWriter):
+    """Writer for tables in CSV format (UTF-8, with a header row)."""
+
+    _fp: IO[str]
+
+    def __init__(self, filename: Path, schema: TableSchema):
+        """Initialise a writer for the table *schema*, creating the file *filename*."""
+        super().__init__(filename, schema)
+        self._fp = filename.open("w", encoding="utf-8", newline="")
+        self._writer = csv.writer(self._fp)
+        self._writer.writerow(schema.column_names)
+
+    def write(self, rows: list[tuple[Any, ...]]) -> None:
+        """Append a batch of *rows* to the table."""
+        self._writer.writerows(rows)
+        self.rows_written += len(rows)
+
+    def close(self) -> None:
+        """Finish writing the table and close its file."""
+        self._fp.close()
+
+
+def _parse_datetime(value: Any) -> Any:
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _parse_date(value: Any) -> Any:
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+class ParquetTableWriter(TableWriter):
+    """Writer for tables in Parquet format, written in record batches.
+
+    Requires the optional *pyarrow* package.
+    """
+
+    def __init__(self, filename: Path, schema: TableSchema):
+        """Initialise a writer for the table *schema*, creating the file *filename*."""
+        self._pyarrow = pyarrow = _import_pyarrow()
+        if pyarrow is None:
+            raise ExportError("The 'parquet' table format requires the pyarrow package.")
+        super().__init__(filename, schema)
+        arrow_types = {
+            bool: pyarrow.bool_(),
+            int: pyarrow.int64(),
+            float: pyarrow.float64(),
+            str: pyarrow.string(),
+            datetime: pyarrow.timestamp("us"),
+            date: pyarrow.date32(),
+            UUID: pyarrow.string(),
+            object: pyarrow.string(),
+        }
+        converters: dict[type, Callable[[Any], Any]] = {
+            datetime: _parse_datetime,
+            date: _parse_date,
+        }
+        # The key columns are the response id followed by the positions in the lists.
+        key_types = [pyarrow.string()] + [pyarrow.int64()] * (len(schema.keys) - 1)
+        fields = [
+            pyarrow.field(key, key_type, nullable=False)
+            for key, key_type in zip(schema.keys, key_types)
+        ]
+        fields.extend(
+            pyarrow.field(column.name, arrow_types[column.type], nullable=column.nullable)
+            for column in schema.columns
+        )
+        self._schema = pyarrow.schema(fields)
+        self._converters = [None] * len(schema.keys) + [
+            converters.get(column.type) for column in schema.columns
+        ]
+        self._writer = pyarrow.parquet.ParquetWriter(filename, self._schema)
+
+    def write(self, rows: list[tuple[Any, ...]]) -> None:
+        """Append a batch of *rows* to the table as a record batch."""
+        if not rows:
+            return
+        pyarrow = self._pyarrow
+        arrays = []
+        for values, field_, converter in zip(zip(*rows), self._schema, self._converters):
+            if converter is not None:
+                values = map(converter, values)
+            arrays.append(pyarrow.array(list(values), type=field_.type))
+        self._writer.write_batch(pyarrow.record_batch(arrays, schema=self._schema))
+        self.rows_written += len(rows)
+
+    def close(self) -> None:
+        """Finish writing the table, writing the Parquet footer, and close its file."""
+        self._writer.close()
+
+
+_writer_classes: dict[str, type[TableWriter]] = {
+    "csv": CsvTableWriter,
+    "parquet": ParquetTableWriter,
+}
+
+
+def _write_rows(
+    schema: TableSchema,
+    responses: Iterable[dict[str, Any]],
+    writers: Mapping[str, TableWriter],
+    batch_size: int,
+) -> None:
+    """Write the rows of the *responses* with the *writers* of their tables.
+
+    Rows are buffered and written in batches of *batch_size* rows per table.
+    """
+    buffers: dict[str, list[tuple[Any, ...]]] = {name: [] for name in writers}
+    for data in responses:
+        for table, row in schema.rows(data):
+            buffer = buffers[table.name]
+            buffer.append(row)
+            if len(buffer) >= batch_size:
+                writers[table.name].write(buffer)
+                buffer.clear()
+    for name, buffer in buffers.items():
+        writers[name].write(buffer)
+
+
+def export_task_tables(
+    output_dir: Path,
+    task: str,
+    response_class: type[ResponseBase],
+    data_path: Path,
+    backend: StorageBackend,
+    table_format: str = "csv",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> dict[str, int]:
+    """Export the responses for a single *task* (see `export_tables()`).
+
+    Returns:
+        The number of rows written to each of the task's tables, by table name.
+    """
+    schema = table_schema(response_class, task)
+    writer_class = _writer_classes[table_format]
+    suffix = TABLE_FORMATS[table_format]
+    writers: dict[str, TableWriter] = {}
+    try:
+        for table in schema.walk():
+            writers[table.name] = writer_class(output_dir / f"{table.name}{suffix}", table)
+        _write_rows(schema, backend.iter_responses(task, data_path), writers, batch_size)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return {name: writer.rows_written for name, writer in writers.items()}
+
+
+def export_tables(
+    output_dir: Path | str,
+    tasks: Mapping[str, tuple[type[ResponseBase], Path]],
+    table_format: str = "csv",
+    backend: StorageBackend | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> dict[str, int]:
+    """Export the stored responses of all *tasks* to flat tables in *output_dir*.
+
+    Each task's responses are flattened into the tables described by the
+    `TableSchema` derived from its response model: a top-level table named
+    after the task with one row per response, and a long-format child table
+    for each list in the response (e.g. :code:`lsbqe.ldb.languages`), keyed by
+    the response id. Responses are streamed from the storage *backend* and
+    written in batches of *batch_size* rows per table, so that memory use does
+    not depend on the number of responses.
+
+    Arguments:
+        output_dir: Directory to write the tables to, one file per table.
+        tasks: Mapping of task names to the task's response model and data
+            path (see `research_assistant.booteel.task_api.ResearchTaskAPI`).
+        table_format: The format of the tables, :code:`"csv"` or
+            :code:`"parquet"` (which requires the *pyarrow* package).
+        backend: The storage backend to read the responses from (by default
+            the backend selected in the app's settings).
+        batch_size: The number of rows buffered per table.
+
+    Returns:
+        The number of rows written to each table, by table name.
+
+    Raises:
+        ExportError: Raised if the responses could not be read or the tables
+            could not be written.
+    """
+    if table_format not in available_formats():
+        raise ExportError(
+            f"Table format {table_format!r} is not available "
+            f"(available formats: {', '.join(available_formats())})."
+        )
+    output_dir = Path(output_dir)
+    backend = backend or get_backend()
+    backend.flush()
+    rows: dict[str, int] = {}
+    started = time.perf_counter()
+    logger.info(f"Exporting responses as {table_format} tables to '{output_dir}'...")
+    try:
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for task, (response_class, data_path) in tasks.items():
+            task_rows = export_task_tables(
+                output_dir, task, response_class, data_path, backend, table_format, batch_size
+            )
+            logger.debug(f"... exported {task_rows[task]} {task} response(s).")
+            rows.update(task_rows)
+    except _export_errors() as e:
+        raise ExportError(f"Could not export responses: {e!s}") from e
+    logger.info(
+        f"Exported {len(rows)} table(s) in {time.perf_counter() - started:.1f}s to '{output_dir}'."
+    )
+    return rows
@@ -0,0 +1,266 @@
+"""Single-instance mode of the LART Research Assistant app.
+
+The running app holds an exclusive lock on :file:`instance.lock` in the path
+for temporarily cached data and listens for commands from later launches on a
+local socket, whose address (with a random token authenticating the clients)
+it records in :file:`instance.json` next to the lock. A later launch that
+finds the lock held hands off to the running instance with `hand_off()`
+instead of starting the app again, e.g. asking it to open a new window, which
+is almost instant as the running instance is already fully loaded::
+
+    lock = InstanceLock()
+    if not lock.acquire() and hand_off("open"):
+        sys.exit(0)  # The running instance opened a new window
+
+The lock is released by the operating system if the app exits without
+releasing it, so a crashed instance never blocks later launches.
+
+Commands are sent as a single line of JSON (:code:`{"token": ..., "command":
+..., "args": {...}}`) and answered with a line of JSON (:code:`{"ok": true,
+...}`). The socket is only bound to the loopback interface.
+"""
+from __future__ import annotations
+
+import hmac
+import json
+import logging
+import os
+import secrets
+import socket
+import time
+from pathlib import Path
+from typing import IO, Any, Callable
+
+from .config import config
+
+logger = logging.getLogger(__name__)
+
+# Name of the lock file held by the running instance.
+LOCK_FILENAME = "instance.lock"
+
+# Name of the file with the address of the running instance's socket.
+INFO_FILENAME = "instance.json"
+
+# Maximum length of a command sent to the running instance.
+MAX_COMMAND_SIZE = 64 * 1024
+
+
+def _lock_file(fp: IO[bytes], locked: bool) -> None:
+    """Lock (without blocking) or unlock the open file *fp*.
+
+    Raises:
+        OSError: Raised if the file can't be locked (e.g. because another
+            process holds the lock) or unlocked.
+    """
+    if os.name == "nt":
+        import msvcrt
+
+        fp.seek(0)
+        mode = msvcrt.LK_NBLCK if locked else msvcrt.LK_UNLCK  # type: ignore
+        msvcrt.locking(fp.fileno(), mode, 1)  # type: ignore
+    else:
+        import fcntl
+
+        fcntl.flock(fp.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB if locked else fcntl.LOCK_UN)
+
+
+class InstanceLock:
+    """Exclusive lock on a file, held by the running instance of the app."""
+
+    path: Path
+    _fp: IO[bytes] | None
+
+    def __init__(self, path: Path | str | None = None):
+        """Initialise a lock on the file *path* (by default in the path for cached data)."""
+        self.path = Path(path) if path is not None else config.paths.cache / LOCK_FILENAME
+        self._fp = None
+
+    @property
+    def locked(self) -> bool:
+        """Whether the lock is held by this process."""
+        return self._fp is not None
+
+    @property
+    def info_path(self) -> Path:
+        """The file with the address of the instance's socket."""
+        return self.path.with_name(INFO_FILENAME)
+
+    def acquire(self) -> bool:
+        """Try to acquire the lock (without blocking).
+
+        Returns:
+            Whether the lock was acquired, `False` if it is held by another
+            process (i.e. the app is already running).
+        """
+        if self._fp is not None:
+            return True
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fp = self.path.open("a+b")
+        except OSError as e:
+            logger.warning(f"Could not open the instance lock file '{self.path}': {e!s}")
+            return False
+        try:
+            _lock_file(fp, locked=True)
+        except OSError:
+            fp.close()
+            return False
+        self._fp = fp
+        self.info_path.unlink(missing_ok=True)  # Left behind if the previous instance crashed
+        return True
+
+    def release(self) -> None:
+        """Release the lock (if held) and remove the socket's address."""
+        if self._fp is None:
+            return
+        self.info_path.unlink(missing_ok=True)
+        try:
+            _lock_file(self._fp, locked=False)
+        except OSError as e:
+            logger.warning(f"Could not release the instance lock '{self.path}': {e!s}")
+        finally:
+            self._fp.close()
+            self._fp = None
+
+
+def read_info(path: Path) -> dict[str, Any] | None:
+    """Read the address of the running instance's socket from *path* (`None` if unavailable)."""
+    try:
+        info = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(info, dict) or not {"port", "token"} <= info.keys():
+        return None
+    return info
+
+
+def send_command(
+    command: str,
+    args: dict[str, Any] | None = None,
+    info_path: Path | None = None,
+    timeout: float = 5.0,
+) -> dict[str, Any]:
+    """Send *command* (with its *args*) to the running instance and return its reply.
+
+    If the running instance has not recorded the address of its socket yet
+    (e.g. because it is still starting), this waits for up to *timeout*
+    seconds for it to do so.
+
+    Raises:
+        OSError: Raised if the running instance could not be reached or
+            didn't reply.
+        ValueError: Raised if the reply is invalid.
+    """
+    info_path = info_path or config.paths.cache / INFO_FILENAME
+    deadline = time.monotonic() + timeout
+    info = read_info(info_path)
+    while info is None:
+        if time.monotonic() > deadline:
+            raise OSError(f"The running instance has no socket address in '{info_path}'.")
+        time.sleep(0.05)
+        info = read_info(info_path)
+    request = {"token": info["token"], "command": command, "args": args or {}}
+    with socket.create_connection(("127.0.0.1", int(info["port"])), timeout=timeout) as sock:
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as fp:
+            reply = json.loads(fp.readline(MAX_COMMAND_SIZE) or b"null")
+    if not isinstance(reply, dict):
+        raise ValueError("Invalid reply from the running instance.")
+    return reply
+
+
+def hand_off(command: str = "open", args: dict[str, Any] | None = None) -> bool:
+    """Hand off to the running instance of the app, asking it to run *command*.
+
+    Returns:
+        Whether the running instance ran the command.
+    """
+    started = time.perf_counter()
+    try:
+        reply = send_command(command, args)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not hand off to the running instance: {e!s}")
+        return False
+    if not reply.get("ok"):
+        logger.warning(f"The running instance failed to {command}: {reply.get('error')}")
+        return False
+    logger.info(
+        f"Handed off to the running instance in {time.perf_counter() - started:.3f}s."
+    )
+    return True
+
+
+class InstanceServer:
+    """Server for the commands sent to the running instance by later launches.
+
+    The server runs on gevent's event loop, handling each command in its own
+    greenlet by calling the handler registered for it with the command's args
+    as keyword arguments.
+    """
+
+    lock: InstanceLock
+    handlers: dict[str, Callable[..., Any]]
+    token: str
+
+    def __init__(self, lock: InstanceLock, handlers: dict[str, Callable[..., Any]]):
+        """Initialise a server with command *handlers* for the instance holding *lock*."""
+        self.lock = lock
+        self.handlers = handlers
+        self.token = secrets.token_urlsafe(32)
+        self._server: Any = None
+
+    @property
+    def port(self) -> int | None:
+        """The port the server is listening on (`None` if it isn't started)."""
+        return self._server.server_port if self._server is not None else None
+
+    def start(self) -> None:
+        """Start listening for commands and record the server's address.
+
+        Raises:
+            RuntimeError: Raised if this process doesn't hold the instance lock.
+            OSError: Raised if the server could not be started.
+        """
+        if not self.lock.locked:
+            raise RuntimeError("The instance server requires the instance lock.")
+        from gevent.server import StreamServer  # type: ignore
+
+        self._server = StreamServer(("127.0.0.1", 0), self._handle)
+        self._server.start()
+        info = json.dumps({"pid": os.getpid(), "port": self.port, "token": self.token})
+        tmp = self.lock.info_path.with_name(f"{INFO_FILENAME}.tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as fp:
+            fp.write(info)
+        os.replace(tmp, self.lock.info_path)
+        logger.info(f"Listening for later launches on port {self.port}.")
+
+    def stop(self) -> None:
+        """Stop listening for commands and release the instance lock."""
+        if self._server is not None:
+            self._server.stop(timeout=1)
+            self._server = None
+        self.lock.release()
+
+    def _handle(self, sock: socket.socket, address: Any) -> None:
+        """Handle a command received on the connection *sock*."""
+        with sock.makefile("rwb") as fp:
+            try:
+                reply = {"ok": True, "result": self._run(fp.readline(MAX_COMMAND_SIZE))}
+            except Exception as e:  # The error is reported to the client
+                logger.warning(f"Could not handle a command from a later launch: {e!s}")
+                reply = {"ok": False, "error": str(e)}
+            fp.write(json.dumps(reply, default=str).encode("utf-8") + b"\n")
+            fp.flush()
+
+    def _run(self, line: bytes) -> Any:
+        """Run the command in the request *line* and return its result."""
+        request = json.loads(line)
+        if not isinstance(request, dict) or not isinstance(request.get("args", {}), dict):
+            raise ValueError("Invalid command.")
+        if not hmac.compare_digest(str(request.get("token")), self.token):
+            raise PermissionError("Invalid token.")
+        handler = self.handlers.get(request.get("command"))
+        if handler is None:
+            raise ValueError(f"Unknown command {request.get('command')!r}.")
+        return handler(**request.get("args", {}))
@@ -0,0 +1,168 @@
+"""Pluggable JSON codec for the app's websocket messages, settings and data files.
+
+The app encodes and decodes JSON in several hot paths: every message between
+the frontend (:file:`booteel.js`, :file:`lart.js`) and the Eel APIs, the
+results of memoized methods (e.g. a task's localisations), the localisation
+files and their metadata index, the response journals and the settings file.
+All of these go through the `JSONCodec` returned by `get_codec()`::
+
+    from research_assistant.jsoncodec import get_codec
+
+    codec = get_codec()
+    data = codec.loads(path.read_bytes())
+    path.write_bytes(codec.dumpb(data, indent=True))
+
+If the optional *orjson* package is installed (e.g. with
+:code:`pip install research_assistant[orjson]`), the codec uses it, otherwise
+it falls back to Python's standard :code:`json` module. Both codecs read the
+same JSON and raise the same exceptions (a subclass of `ValueError` if the
+JSON is invalid, a `TypeError` if an object can't be encoded), but their output
+differs in its formatting: *orjson* writes compact JSON and indents by two
+rather than four spaces, and encodes `datetime`, `UUID` and dataclass
+instances natively rather than passing them to the *default* function.
+
+Responses themselves are still written with pydantic's
+:code:`model_dump_json()`, which is faster than either codec on a model's dump
+(see :file:`benchmarks/bench_json.py`).
+"""
+from __future__ import annotations
+
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Callable
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Names of the codecs, in order of preference.
+CODECS = ("orjson", "json")
+
+
+class JSONCodec(ABC):
+    """Encoder and decoder of JSON."""
+
+    name: str
+
+    @abstractmethod
+    def dumps(
+        self, obj: Any, *, indent: bool = False, default: Callable[[Any], Any] | None = None
+    ) -> str:
+        """Encode *obj* as JSON.
+
+        Arguments:
+            obj: The object to encode.
+            indent: Whether to pretty-print the JSON with indentation.
+            default: Function called with objects that can't be encoded,
+                returning an encodable replacement (or raising a `TypeError`).
+        """
+        ...
+
+    def dumpb(
+        self, obj: Any, *, indent: bool = False, default: Callable[[Any], Any] | None = None
+    ) -> bytes:
+        """Encode *obj* as UTF-8 encoded JSON (see `JSONCodec.dumps()`)."""
+        return self.dumps(obj, indent=indent, default=default).encode("utf-8")
+
+    @abstractmethod
+    def loads(self, data: str | bytes) -> Any:
+        """Decode the JSON in *data* (a string or UTF-8 encoded bytes).
+
+        Raises:
+            json.JSONDecodeError: Raised if *data* is not valid JSON.
+        """
+        ...
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} {self.name!r}>"
+
+
+class StdlibCodec(JSONCodec):
+    """`JSONCodec` using Python's standard :code:`json` module."""
+
+    name = "json"
+
+    def dumps(
+        self, obj: Any, *, indent: bool = False, default: Callable[[Any], Any] | None = None
+    ) -> str:
+        """Encode *obj* as JSON (see `JSONCodec.dumps()`)."""
+        return json.dumps(obj, ensure_ascii=False, indent=4 if indent else None, default=default)
+
+    def loads(self, data: str | bytes) -> Any:
+        """Decode the JSON in *data* (see `JSONCodec.loads()`)."""
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    """`JSONCodec` using the optional *orjson* package."""
+
+    name = "orjson"
+
+    def __init__(self) -> None:
+        """Initialise the codec.
+
+        Raises:
+            RuntimeError: Raised if the *orjson* package is not installed.
+        """
+        if orjson is None:
+            raise RuntimeError("The 'orjson' JSON codec requires the orjson package.")
+        self._options = orjson.OPT_NON_STR_KEYS
+        self._indented = orjson.OPT_NON_STR_KEYS | orjson.OPT_INDENT_2
+
+    def dumps(
+        self, obj: Any, *, indent: bool = False, default: Callable[[Any], Any] | None = None
+    ) -> str:
+        """Encode *obj* as JSON (see `JSONCodec.dumps()`)."""
+        return self.dumpb(obj, indent=indent, default=default).decode("utf-8")
+
+    def dumpb(
+        self, obj: Any, *, indent: bool = False, default: Callable[[Any], Any] | None = None
+    ) -> bytes:
+        """Encode *obj* as UTF-8 encoded JSON (see `JSONCodec.dumps()`)."""
+        return orjson.dumps(
+            obj, default=default, option=self._indented if indent else self._options
+        )
+
+    def loads(self, data: str | bytes) -> Any:
+        """Decode the JSON in *data* (see `JSONCodec.loads()`)."""
+        return orjson.loads(data)
+
+
+_codec_classes: dict[str, type[JSONCodec]] = {
+    OrjsonCodec.name: OrjsonCodec,
+    StdlibCodec.name: StdlibCodec,
+}
+
+_codecs: dict[str, JSONCodec] = {}
+
+
+def available_codecs() -> list[str]:
+    """Return the names of the codecs that can be used, in order of preference.
+
+    The :code:`"orjson"` codec requires the optional *orjson* package.
+    """
+    return [name for name in CODECS if name != "orjson" or orjson is not None]
+
+
+def get_codec(name: str | None = None) -> JSONCodec:
+    """Return the shared instance of the codec *name*.
+
+    If *name* is not given, the first of the `available_codecs()` is
+    returned, i.e. the :code:`"orjson"` codec if *orjson* is installed.
+
+    Raises:
+        ValueError: Raised if there is no codec *name*.
+        RuntimeError: Raised if the codec *name* is not available.
+    """
+    if name is None:
+        name = available_codecs()[0]
+    if name not in _codec_classes:
+        raise ValueError(f"Unknown JSON codec {name!r}, must be one of {CODECS}.")
+    if name not in _codecs:
+        _codecs[name] = _codec_classes[name]()
+        logger.debug(f"Using the {name!r} JSON codec.")
+    return _codecs[name]
@@ -0,0 +1,202 @@
+"""Queue-based logging, writing the app's log records on a background thread.
+
+Rather than writing each log record to the console and the log file while the
+caller waits (which blocks gevent's event loop, and with it all websockets,
+for the duration of the file I/O), the app's root logger only has a
+`LogQueueHandler`, which puts the records on a queue. A `LogListener` thread
+takes the records off the queue and hands them to the actual handlers in
+batches, flushing the handlers once per batch rather than once per record::
+
+    listener = LogListener([config.logging.get_stream_handler()])
+    listener.start()
+    logging.getLogger("research_assistant").addHandler(LogQueueHandler(listener.queue))
+    ...
+    listener.stop()  # Writes all queued records
+
+Records are handed to the listener in the state they were logged in, with
+only their message merged with its arguments, so that logging costs the
+caller little more than putting the record on the queue. Formatting (e.g. of
+timestamps and exception tracebacks) is left to the listener thread.
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import queue
+import threading
+from logging.handlers import RotatingFileHandler
+from typing import Any, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of records handled before the handlers are flushed.
+MAX_BATCH = 256
+
+
+class LogQueueHandler(logging.Handler):
+    """Handler putting log records on a queue for a `LogListener`."""
+
+    queue: queue.SimpleQueue[Any]
+
+    def __init__(self, log_queue: queue.SimpleQueue[Any]):
+        """Initialise a handler putting the log records on *log_queue*."""
+        super().__init__()
+        self.queue = log_queue
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Put the *record* on the queue (with its message merged with its arguments)."""
+        try:
+            record.msg = record.getMessage()
+            record.args = None
+            self.queue.put_nowait(record)
+        except Exception:
+            self.handleError(record)
+
+
+class _Flush:
+    """Marker on the queue, set once all records queued before it have been written."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+
+
+# Marker on the queue stopping the listener.
+_STOP = object()
+
+
+class LogListener:
+    """Thread writing the log records queued by a `LogQueueHandler` to its handlers."""
+
+    queue: queue.SimpleQueue[Any]
+    handlers: list[logging.Handler]
+    batches: int
+    records: int
+
+    def __init__(self, handlers: Iterable[logging.Handler], max_batch: int = MAX_BATCH):
+        """Initialise a listener writing the queued records to *handlers*.
+
+        Arguments:
+            handlers: The handlers to write the records to (respecting their
+                levels and filters).
+            max_batch: The maximum number of records handled before the
+                handlers are flushed.
+        """
+        self.queue = queue.SimpleQueue()
+        self.handlers = list(handlers)
+        self.max_batch = max_batch
+        self.batches = 0
+        self.records = 0
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the listener thread is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the listener thread (stopped at exit if it isn't stopped before)."""
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name="LogListener", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def flush(self, timeout: float | None = 5.0) -> bool:
+        """Wait for up to *timeout* seconds until all queued records have been written.
+
+        Returns:
+            Whether the records have been written (`True` if not running).
+        """
+        if not self.running:
+            return True
+        marker = _Flush()
+        self.queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def stop(self, timeout: float | None = 5.0) -> None:
+        """Write all queued records and stop the listener thread."""
+        atexit.unregister(self.stop)
+        if not self.running:
+            return
+        self.queue.put(_STOP)
+        self._thread.join(timeout)  # type: ignore
+        self._thread = None
+
+    def _run(self) -> None:
+        """Take the records off the queue and write them in batches until stopped."""
+        stopped = False
+        while not stopped:
+            stopped = self._write_batch(self._next_batch())
+        for handler in self.handlers:
+            handler.close()
+
+    def _next_batch(self) -> list[Any]:
+        """Wait for the next item on the queue, and return it with up to *max_batch* more."""
+        batch = [self.queue.get()]
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_batch(self, batch: list[Any]) -> bool:
+        """Write the records in *batch*, then flush the handlers and set its flush markers.
+
+        Returns:
+            Whether the batch contains the marker stopping the listener.
+        """
+        stopped = False
+        markers = []
+        for item in batch:
+            if item is _STOP:
+                stopped = True
+            elif isinstance(item, _Flush):
+                markers.append(item)
+            else:
+                self._handle(item)
+        for handler in self.handlers:
+            handler.flush()
+        self.batches += 1
+        for marker in markers:
+            marker.done.set()
+        return stopped
+
+    def _handle(self, record: logging.LogRecord) -> None:
+        """Hand the *record* to the handlers whose levels it meets."""
+        self.records += 1
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+class BatchFlushMixin:
+    """Mixin for stream handlers deferring their flushes to the end of a batch.
+
+    `logging.StreamHandler` flushes its stream after every record. Handlers
+    with this mixin only flush when flushed explicitly, i.e. by the
+    `LogListener` once per batch.
+    """
+
+    _emitting: bool = False
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Write the *record* to the stream without flushing it."""
+        self._emitting = True
+        try:
+            super().emit(record)  # type: ignore
+        finally:
+            self._emitting = False
+
+    def flush(self) -> None:
+        """Flush the stream (unless called while writing a record)."""
+        if not self._emitting:
+            super().flush()  # type: ignore
+
+
+class BatchStreamHandler(BatchFlushMixin, logging.StreamHandler):  # type: ignore
+    """`logging.StreamHandler` flushing its stream once per batch of records."""
+
+
+class BatchRotatingFileHandler(BatchFlushMixin, RotatingFileHandler):
+    """`logging.handlers.RotatingFileHandler` flushing its file once per batch of records."""
@@ -10,6 +10,7 @@ import eel
 from ..booteel import utils as booteel_utils
 from ..booteel.eel_api import EelAPI
 from ..booteel.errors import InvalidValueError
+from ..booteel.memo import memoized
 from ..config import config
 
 logger = logging.getLogger(__name__)
@@ -35,8 +36,13 @@ class SettingsAPI(EelAPI):
         cls.logger.exception(exc)
 
     @EelAPI.exposed
+    @memoized
     def load(self) -> dict[str, dict[str, Any]]:    # noqa: C901
-        """Return current settings and config documentation."""
+        """Return current settings and config documentation.
+
+        When called via Eel, the encoded result is memoized until the settings
+        are saved (see `research_assistant.booteel.memo`).
+        """
         self.logger.info("Fetching app settings..")
         dataclasses, fields = config.getdocs()
         settings: dict[str, dict[str, Any]] = dict()
@@ -96,6 +102,9 @@ class SettingsAPI(EelAPI):
                 continue
             self.logger.debug(f"  .. setting {property} on {target} to {value!r}")
             target_type = type(getattr(target, property))
+            if target_type is bool and isinstance(value, str):
+                # bool("false") is True, so boolean strings need special handling
+                value = value.strip().lower() in ("true", "yes", "1")
             if type(value) is not target_type:
                 debug_msg = f"  .. value is of type {type(value)}; coercion to {target_type} {{}}."
                 try:
@@ -0,0 +1,60 @@
+"""Response storage for the L'ART Research Assistant.
+
+This package provides the backends used to persist the responses collected by
+the app's tasks. All backends implement the interface defined by
+`StorageBackend`, so that the task APIs do not need to know how or where a
+response ends up being stored.
+
+Two backends are currently available:
+    * `JSONFileBackend` (:code:`"json"`): stores each response as a separate
+      JSON file under :code:`<task_data_path>/<localisation>/`. This is the
+      default and the layout used by all previous versions of the app.
+    * `SQLiteBackend` (:code:`"sqlite"`): stores each response as a row in a
+      single SQLite database (in WAL mode) in the path for data files, indexed
+      by task, localisation, participant, researcher and date.
+
+The backend in use is selected with the :code:`storage.backend` setting, and
+the backend instance for the running app should always be obtained via
+`get_backend()`::
+
+    from ..storage import get_backend
+
+    location = get_backend().store("agt", task_data_path, response)
+
+Writes can also be handed to the app's shared `BackgroundWriter` (obtained via
+`get_writer()`), which performs them on a worker thread so that the eel event
+loop is not blocked by slow disks (see the :code:`storage.write_mode` setting).
+
+Responses that are still in progress are recorded in an append-only
+`ResponseJournal`, from which they can be restored if the app is killed
+before they are stored (see the :code:`storage.journal` setting). Journals
+are flushed to disk in batches by the `JournalSyncer` obtained via
+`get_syncer()`.
+
+Every response written with `write_response()` (which is also what the
+`BackgroundWriter` uses) is recorded in the `ResponseIndex` obtained via
+`get_index()`, a persistent manifest of all stored responses that can be
+queried without scanning the data directory.
+"""
+from .backends import (JSONFileBackend, SQLiteBackend, StorageBackend,
+                       StorageError, get_backend)
+from .index import IndexEntry, ResponseIndex, get_index
+from .journal import JournalSyncer, ResponseJournal, get_syncer
+from .writer import BackgroundWriter, get_writer, write_response
+
+__all__ = [
+    "BackgroundWriter",
+    "IndexEntry",
+    "JSONFileBackend",
+    "JournalSyncer",
+    "ResponseIndex",
+    "ResponseJournal",
+    "SQLiteBackend",
+    "StorageBackend",
+    "StorageError",
+    "get_backend",
+    "get_index",
+    "get_syncer",
+    "get_writer",
+    "write_response",
+]
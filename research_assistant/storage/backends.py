@@ -0,0 +1,285 @@
+"""Storage backends for task responses."""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, ClassVar, Iterator
+
+from ..config import config
+from ..datamodels.models import ResponseBase
+from ..jsoncodec import get_codec
+
+logger = logging.getLogger(__name__)
+
+
+class StorageError(Exception):
+    """Error indicating that a storage backend failed to store or read data."""
+
+
+class StorageBackend(ABC):
+    """Base class for response storage backends.
+
+    A storage backend is responsible for persisting validated task responses
+    and for reading them back, e.g. for exports. Responses are always
+    identified by the name of the task they belong to (the unqualified package
+    name of the task, e.g. :code:`"lsbqe"`) and the task's *data_path*, the
+    directory in which the task's data is kept by file-based backends.
+
+    Backends must be safe to call from more than one thread.
+    """
+
+    # Name by which the backend is selected in the `storage.backend` setting.
+    name: ClassVar[str]
+
+    @abstractmethod
+    def store(
+        self, task: str, data_path: Path, response: ResponseBase, sync: bool = False
+    ) -> str:
+        """Persist *response* for *task* and return a description of its location.
+
+        If *sync* is `True`, the method only returns once the data has been
+        flushed to the storage device (i.e. after an fsync).
+
+        Raises:
+            StorageError: Raised if the response could not be stored.
+        """
+        ...
+
+    @abstractmethod
+    def iter_responses(self, task: str, data_path: Path) -> Iterator[dict[str, Any]]:
+        """Iterate over the raw (deserialised) data of the stored responses for *task*."""
+        ...
+
+    def flush(self) -> None:  # noqa: B027
+        """Make sure that everything stored so far is fully written to disk.
+
+        Intentionally a no-op here, for backends writing each response in full
+        as it is stored.
+        """
+
+    def close(self) -> None:  # noqa: B027
+        """Release any resources held by the backend.
+
+        Intentionally a no-op here, for backends holding no open resources.
+        """
+
+
+class JSONFileBackend(StorageBackend):
+    """Storage backend writing one JSON file per response.
+
+    Responses are stored as :code:`<participant_id>_<response_id>.json` in a
+    subdirectory of the task's *data_path* named after the response's task
+    localisation.
+    """
+
+    name = "json"
+
+    @staticmethod
+    def response_path(data_path: Path, response: ResponseBase) -> Path:
+        """Return the path of the file in which *response* is stored."""
+        return (
+            data_path
+            / str(response.meta.task_localisation)
+            / f"{response.meta.participant_id!s}_{response.id!s}.json"
+        )
+
+    def store(
+        self, task: str, data_path: Path, response: ResponseBase, sync: bool = False
+    ) -> str:
+        """Write *response* to its own JSON file and return the file's path."""
+        filename = self.response_path(data_path, response)
+        logger.debug(f"Writing {task} response {response.id} to file: {filename}")
+        try:
+            filename.parent.mkdir(parents=True, exist_ok=True)
+            with filename.open("w", encoding="utf-8") as fp:
+                fp.write(response.model_dump_json(indent=4))
+                if sync:
+                    fp.flush()
+                    os.fsync(fp.fileno())
+        except OSError as e:
+            raise StorageError(f"Could not write file '{filename}': {e!s}") from e
+        return str(filename)
+
+    def iter_responses(self, task: str, data_path: Path) -> Iterator[dict[str, Any]]:
+        """Iterate over the responses stored in JSON files under *data_path*."""
+        codec = get_codec()
+        for filename in sorted(data_path.glob("*/*.json")):
+            try:
+                data = codec.loads(filename.read_bytes())
+            except (OSError, json.JSONDecodeError) as e:
+                logger.error(f"Skipping unreadable response file '{filename}': {e!s}")
+            else:
+                yield data
+
+
+class SQLiteBackend(StorageBackend):
+    """Storage backend keeping all responses in a single SQLite database.
+
+    The database is opened in WAL mode and holds one row per response in the
+    table *responses*, with the full JSON serialisation of the response in the
+    *data* column. The columns used to look up responses (task, localisation,
+    participant, researcher and creation date) are indexed.
+    """
+
+    name = "sqlite"
+
+    _schema: ClassVar[tuple[str, ...]] = (
+        """
+        CREATE TABLE IF NOT EXISTS responses (
+            id TEXT PRIMARY KEY,
+            task TEXT NOT NULL,
+            localisation TEXT NOT NULL,
+            participant_id TEXT NOT NULL,
+            researcher_id TEXT NOT NULL,
+            research_location TEXT NOT NULL,
+            date_created TEXT NOT NULL,
+            date_modified TEXT NOT NULL,
+            data TEXT NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS responses_task ON responses (task, localisation)",
+        "CREATE INDEX IF NOT EXISTS responses_participant ON responses (participant_id)",
+        "CREATE INDEX IF NOT EXISTS responses_researcher ON responses (researcher_id)",
+        "CREATE INDEX IF NOT EXISTS responses_date ON responses (date_created)",
+    )
+
+    path: Path
+    _connection: sqlite3.Connection | None
+    _lock: threading.Lock
+
+    def __init__(self, path: Path | str | None = None):
+        """Initialise a new SQLiteBackend for the database file at *path*.
+
+        If *path* is not given, the file named by the `storage.sqlite_filename`
+        setting in the path for data files is used. The database is only opened
+        (and created if needed) once it is first used.
+        """
+        if path is None:
+            path = config.paths.data / config.storage.sqlite_filename
+        self.path = Path(path)
+        self._connection = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create_schema(cls, connection: sqlite3.Connection) -> None:
+        """Create the backend's tables and indexes in *connection* if they don't exist."""
+        with connection:
+            for statement in cls._schema:
+                connection.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return the open database connection, opening it first if needed."""
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.create_schema(connection)
+            self._connection = connection
+            logger.debug(f"Opened SQLite response store at '{self.path}'.")
+        return self._connection
+
+    def store(
+        self, task: str, data_path: Path, response: ResponseBase, sync: bool = False
+    ) -> str:
+        """Insert (or replace) *response* in the database and return its location.
+
+        In WAL mode with :code:`synchronous=NORMAL`, commits are only synced to
+        disk at checkpoints, so for *sync* writes the transaction is committed
+        with :code:`synchronous=FULL` instead.
+        """
+        meta = response.meta
+        row = (
+            str(response.id),
+            task,
+            meta.task_localisation,
+            meta.participant_id,
+            meta.researcher_id,
+            meta.research_location,
+            meta.date_created.isoformat(),
+            meta.date_modified.isoformat(),
+            response.model_dump_json(),
+        )
+        logger.debug(f"Writing {task} response {response.id} to database: {self.path}")
+        try:
+            with self._lock:
+                connection = self._connect()
+                connection.execute(f"PRAGMA synchronous={'FULL' if sync else 'NORMAL'}")
+                with connection:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        row,
+                    )
+        except (OSError, sqlite3.Error) as e:
+            raise StorageError(f"Could not write to database '{self.path}': {e!s}") from e
+        return f"{self.path}#{response.id!s}"
+
+    def iter_responses(self, task: str, data_path: Path) -> Iterator[dict[str, Any]]:
+        """Iterate over the responses for *task* stored in the database.
+
+        Rows are read through a separate read-only connection, so that the
+        iteration neither holds the write lock nor loads all rows at once.
+        """
+        if not self.path.exists():
+            return
+        codec = get_codec()
+        try:
+            reader = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True)
+            try:
+                cursor = reader.execute(
+                    "SELECT data FROM responses WHERE task = ? ORDER BY date_created",
+                    (task,),
+                )
+                for (data,) in cursor:
+                    yield codec.loads(data)
+            finally:
+                reader.close()
+        except sqlite3.Error as e:
+            raise StorageError(f"Could not read from database '{self.path}': {e!s}") from e
+
+    def flush(self) -> None:
+        """Checkpoint the write-ahead log into the main database file."""
+        with self._lock:
+            if self._connection is None and not self.path.exists():
+                return
+            self._connect().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self) -> None:
+        """Close the database connection, checkpointing the write-ahead log."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+_backend_classes: dict[str, type[StorageBackend]] = {
+    JSONFileBackend.name: JSONFileBackend,
+    SQLiteBackend.name: SQLiteBackend,
+}
+
+_backends: dict[str, StorageBackend] = {}
+
+
+def get_backend(name: str | None = None) -> StorageBackend:
+    """Return the shared instance of the storage backend *name*.
+
+    If *name* is not given, the backend selected by the `storage.backend`
+    setting is returned. Unknown backend names are logged as an error and
+    the default JSON file backend is used instead, so that responses are never
+    lost because of a misconfiguration.
+    """
+    if name is None:
+        name = config.storage.backend
+    if name not in _backend_classes:
+        logger.error(
+            f"Unknown storage backend {name!r}, falling back to {JSONFileBackend.name!r}."
+        )
+        name = JSONFileBackend.name
+    if name not in _backends:
+        _backends[name] = _backend_classes[name]()
+    return _backends[name]
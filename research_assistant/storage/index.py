@@ -0,0 +1,392 @@
+"""Persistent index of the responses stored in the path for data files."""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, ClassVar, Iterable, Iterator
+from uuid import UUID
+
+from ..config import config
+from ..datamodels.models import ResponseBase
+from .backends import StorageError
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class IndexEntry:
+    """A single stored response as recorded in the `ResponseIndex`."""
+
+    id: UUID
+    task: str
+    localisation: str
+    participant_id: str
+    researcher_id: str
+    research_location: str
+    date_created: str
+    date_modified: str
+    # Location of the response relative to the path for data files: a file path
+    # for the JSON backend, or :code:`<database>#<id>` for the SQLite backend.
+    location: str
+    size: int
+    sha256: str
+
+
+class ResponseIndex:
+    """Manifest of all responses stored in the path for data files.
+
+    The index is a small SQLite database, kept next to the stored responses,
+    with one row per stored response recording its id, task, localisation,
+    participant, researcher, research location, creation and modification
+    dates, its location, and the size and SHA-256 hash of its stored data.
+    It is updated incrementally whenever a response is stored (see
+    `research_assistant.storage.write_response()`), so that looking up whether
+    a response has been stored, which responses a participant has given, or
+    which files a backup needs to include does not require walking the data
+    directory.
+
+    The index only ever describes data that is stored elsewhere, so it can
+    always be thrown away and rebuilt from the data directory in a single pass
+    with `ResponseIndex.rebuild()`. To map the directories found there to the
+    tasks they belong to, each task registers its data path with
+    `ResponseIndex.register_task()` when its API is initialised.
+    """
+
+    filename: ClassVar[str] = "response_index.sqlite3"
+
+    _schema: ClassVar[tuple[str, ...]] = (
+        """
+        CREATE TABLE IF NOT EXISTS entries (
+            id TEXT PRIMARY KEY,
+            task TEXT NOT NULL,
+            localisation TEXT NOT NULL,
+            participant_id TEXT NOT NULL,
+            researcher_id TEXT NOT NULL,
+            research_location TEXT NOT NULL,
+            date_created TEXT NOT NULL,
+            date_modified TEXT NOT NULL,
+            location TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            sha256 TEXT NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS entries_task ON entries (task, localisation)",
+        "CREATE INDEX IF NOT EXISTS entries_participant ON entries (participant_id, task)",
+        "CREATE INDEX IF NOT EXISTS entries_location ON entries (location)",
+    )
+
+    data_path: Path
+    path: Path
+    _tasks: dict[str, Path]
+    _connection: sqlite3.Connection | None
+    _lock: threading.Lock
+
+    def __init__(self, data_path: Path | None = None):
+        """Initialise a ResponseIndex for the responses stored under *data_path*.
+
+        If *data_path* is not given, the path for data files is used. The index
+        database is only opened (and created if needed) once it is first used.
+        """
+        self.data_path = Path(data_path if data_path is not None else config.paths.data)
+        self.path = self.data_path / self.filename
+        self._tasks = dict()
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return the open database connection, opening it first if needed."""
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            with connection:
+                for statement in self._schema:
+                    connection.execute(statement)
+            self._connection = connection
+            logger.debug(f"Opened response index at '{self.path}'.")
+        return self._connection
+
+    def register_task(self, task: str, data_path: Path) -> None:
+        """Register *data_path* as the directory holding the data of *task*."""
+        self._tasks[task] = Path(data_path)
+
+    @property
+    def tasks(self) -> dict[str, Path]:
+        """The data paths of all registered tasks, by task name."""
+        return dict(self._tasks)
+
+    def relative_location(self, location: str | Path) -> str:
+        """Return *location* relative to the data path (as a POSIX path) if possible."""
+        location = Path(location)
+        try:
+            return location.relative_to(self.data_path).as_posix()
+        except ValueError:
+            return location.as_posix()
+
+    def add(self, task: str, response: ResponseBase, location: str) -> IndexEntry:
+        """Record *response*, stored for *task* at *location*, in the index.
+
+        The size and hash are computed from the stored file if *location* is a
+        file, and from the response's compact JSON serialisation (as stored by
+        the SQLite backend) otherwise.
+        """
+        if os.path.isfile(location):
+            with open(location, "rb") as fp:
+                content = fp.read()
+        else:
+            content = response.model_dump_json().encode("utf-8")
+        # Dates are recorded exactly as serialised in the stored data.
+        meta = response.meta.model_dump(mode="json")
+        entry = IndexEntry(
+            id=response.id,
+            task=task,
+            localisation=meta["task_localisation"],
+            participant_id=meta["participant_id"],
+            researcher_id=meta["researcher_id"],
+            research_location=meta["research_location"],
+            date_created=meta["date_created"],
+            date_modified=meta["date_modified"],
+            location=self.relative_location(location),
+            size=len(content),
+            sha256=hashlib.sha256(content).hexdigest(),
+        )
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    self._entry_to_row(entry),
+                )
+        return entry
+
+    def get(self, response_id: UUID) -> IndexEntry | None:
+        """Return the index entry for the response *response_id*, if it is stored."""
+        rows = self._query("SELECT * FROM entries WHERE id = ?", (str(response_id),))
+        return next(rows, None)
+
+    def contains(self, response_id: UUID, task: str | None = None) -> bool:
+        """Check whether the response *response_id* (for *task*, if given) is stored."""
+        entry = self.get(response_id)
+        return entry is not None and (task is None or entry.task == task)
+
+    def find_participant(self, participant_id: str, task: str | None = None) -> list[IndexEntry]:
+        """Return the entries of all stored responses by *participant_id*.
+
+        If *task* is given, only responses for that task are returned.
+        """
+        if task is None:
+            return list(
+                self._query(
+                    "SELECT * FROM entries WHERE participant_id = ? ORDER BY date_created",
+                    (participant_id,),
+                )
+            )
+        return list(
+            self._query(
+                "SELECT * FROM entries WHERE participant_id = ? AND task = ? "
+                "ORDER BY date_created",
+                (participant_id, task),
+            )
+        )
+
+    def entries(self, task: str | None = None) -> Iterator[IndexEntry]:
+        """Iterate over all entries in the index (for *task*, if given)."""
+        if task is None:
+            return self._query("SELECT * FROM entries ORDER BY task, date_created")
+        return self._query(
+            "SELECT * FROM entries WHERE task = ? ORDER BY date_created", (task,)
+        )
+
+    def read(self, entry: IndexEntry) -> dict[str, Any]:
+        """Read the raw (deserialised) data of the response recorded in *entry*.
+
+        Raises:
+            StorageError: Raised if the response could not be read.
+        """
+        database, _, response_id = entry.location.partition("#")
+        location = self.data_path / database
+        try:
+            if not response_id:
+                with location.open("rb") as fp:
+                    return json.load(fp)
+            reader = sqlite3.connect(f"{location.resolve().as_uri()}?mode=ro", uri=True)
+            try:
+                row = reader.execute(
+                    "SELECT data FROM responses WHERE id = ?", (response_id,)
+                ).fetchone()
+            finally:
+                reader.close()
+            if row is None:
+                raise StorageError(f"Response '{entry.location}' not found.")
+            return json.loads(row[0])
+        except (OSError, ValueError, sqlite3.Error) as e:
+            raise StorageError(f"Could not read response '{entry.location}': {e!s}") from e
+
+    def __len__(self) -> int:
+        """Return the number of responses in the index."""
+        with self._lock:
+            (count,) = self._connect().execute("SELECT COUNT(*) FROM entries").fetchone()
+        return count
+
+    def _query(self, sql: str, params: tuple[Any, ...] = ()) -> Iterator[IndexEntry]:
+        """Run the query *sql* and return its results as index entries."""
+        with self._lock:
+            rows = self._connect().execute(sql, params).fetchall()
+        return (self._row_to_entry(row) for row in rows)
+
+    @staticmethod
+    def _entry_to_row(entry: IndexEntry) -> tuple[Any, ...]:
+        """Convert *entry* to a row of the *entries* table."""
+        return (
+            str(entry.id),
+            entry.task,
+            entry.localisation,
+            entry.participant_id,
+            entry.researcher_id,
+            entry.research_location,
+            entry.date_created,
+            entry.date_modified,
+            entry.location,
+            entry.size,
+            entry.sha256,
+        )
+
+    @staticmethod
+    def _row_to_entry(row: tuple[Any, ...]) -> IndexEntry:
+        """Convert a row of the *entries* table to an `IndexEntry`."""
+        return IndexEntry(UUID(row[0]), *row[1:])
+
+    def rebuild(self) -> int:
+        """Rebuild the index from the responses stored in the data path.
+
+        The data directories of all registered tasks are scanned for JSON
+        response files, and the SQLite backend's database (if any) is read,
+        in a single pass. The old index is replaced only once the scan is
+        complete.
+
+        Returns:
+            The number of responses found.
+        """
+        logger.info(f"Rebuilding response index for '{self.data_path}'...")
+        entries: list[IndexEntry] = []
+        for task, task_path in self._tasks.items():
+            entries.extend(self._scan_json_files(task, task_path))
+        database = self.data_path / config.storage.sqlite_filename
+        if database.is_file():
+            entries.extend(self._scan_database(database))
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("DELETE FROM entries")
+                connection.executemany(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self._entry_to_row(entry) for entry in entries),
+                )
+        logger.info(f"... indexed {len(entries)} stored response(s).")
+        return len(entries)
+
+    def _scan_json_files(self, task: str, task_path: Path) -> Iterable[IndexEntry]:
+        """Yield entries for the JSON response files of *task* under *task_path*."""
+        for filename in self._json_files(task_path):
+            try:
+                with open(filename, "rb") as fp:
+                    content = fp.read()
+                entry = self._entry_from_json(task, filename, content)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.error(f"Could not index response file '{filename}': {e!s}")
+                continue
+            yield entry
+
+    @staticmethod
+    def _json_files(task_path: Path) -> Iterator[str]:
+        """Yield the paths of the JSON files in the localisation directories under *task_path*."""
+        if not task_path.is_dir():
+            return
+        for localisation_dir in os.scandir(task_path):
+            if not localisation_dir.is_dir():
+                continue
+            for file in os.scandir(localisation_dir.path):
+                if file.is_file() and file.name.endswith(".json"):
+                    yield file.path
+
+    def _scan_database(self, database: Path) -> Iterable[IndexEntry]:
+        """Yield entries for the responses stored in the SQLite backend's *database*."""
+        for task, data in self._database_rows(database):
+            entry = self._entry_from_row(database, task, data)
+            if entry is not None:
+                yield entry
+
+    @staticmethod
+    def _database_rows(database: Path) -> Iterator[tuple[str, str]]:
+        """Yield the task and data of each response stored in the SQLite backend's *database*.
+
+        Errors opening or reading the database are logged, ending the iteration.
+        """
+        try:
+            reader = sqlite3.connect(f"{database.resolve().as_uri()}?mode=ro", uri=True)
+        except sqlite3.Error as e:
+            logger.error(f"Could not open response database '{database}': {e!s}")
+            return
+        try:
+            yield from reader.execute("SELECT task, data FROM responses")
+        except sqlite3.Error as e:
+            logger.error(f"Could not read response database '{database}': {e!s}")
+        finally:
+            reader.close()
+
+    def _entry_from_row(self, database: Path, task: str, data: str) -> IndexEntry | None:
+        """Create an index entry from a row of the SQLite backend's *database*.
+
+        Returns:
+            The entry, or `None` if the response's data is invalid (which is logged).
+        """
+        location = f"{database}#?"
+        try:
+            location = f"{database}#{json.loads(data)['id']}"
+            return self._entry_from_json(task, location, data.encode("utf-8"))
+        except (ValueError, KeyError, TypeError) as e:
+            logger.error(f"Could not index response '{location}': {e!s}")
+            return None
+
+    def _entry_from_json(self, task: str, location: str, content: bytes) -> IndexEntry:
+        """Create an index entry from the raw JSON *content* of a stored response."""
+        data = json.loads(content)
+        meta = data["meta"]
+        return IndexEntry(
+            id=UUID(data["id"]),
+            task=task,
+            localisation=meta["task_localisation"],
+            participant_id=meta["participant_id"],
+            researcher_id=meta["researcher_id"],
+            research_location=meta["research_location"],
+            date_created=meta["date_created"],
+            date_modified=meta["date_modified"],
+            location=self.relative_location(location),
+            size=len(content),
+            sha256=hashlib.sha256(content).hexdigest(),
+        )
+
+    def close(self) -> None:
+        """Close the index database."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+_index: ResponseIndex | None = None
+
+
+def get_index() -> ResponseIndex:
+    """Return the app's shared `ResponseIndex`, creating it on first use."""
+    global _index
+    if _index is None:
+        _index = ResponseIndex()
+    return _index
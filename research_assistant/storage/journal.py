@@ -0,0 +1,267 @@
+"""Append-only journals for responses in progress."""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Literal
+from uuid import UUID
+
+from pydantic_core import to_jsonable_python
+
+from ..jsoncodec import get_codec
+
+logger = logging.getLogger(__name__)
+
+JournalOp = Literal["new", "set", "setitem", "append", "delete"]
+
+
+class JournalSyncer:
+    """Thread flushing the journal files changed by `ResponseJournal.append()` to disk.
+
+    Files are flushed in batches: all files changed while the previous batch
+    was being flushed are flushed together, each of them once, however often it
+    changed in the meantime.
+    """
+
+    def __init__(self):
+        """Initialise a JournalSyncer, which starts its thread on first use."""
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._pending: set[Path] = set()
+        self._syncing = False
+        self._thread: threading.Thread | None = None
+
+    def schedule(self, filename: Path) -> None:
+        """Schedule the file *filename* to be flushed to disk."""
+        with self._lock:
+            self._pending.add(filename)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="JournalSyncer", daemon=True
+                )
+                self._thread.start()
+            self._changed.notify_all()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Wait for up to *timeout* seconds until all scheduled files have been flushed.
+
+        Returns:
+            Whether all scheduled files have been flushed.
+        """
+        with self._lock:
+            return self._changed.wait_for(
+                lambda: not (self._pending or self._syncing), timeout
+            )
+
+    def _run(self) -> None:
+        """Flush the scheduled files to disk in batches, forever."""
+        while True:
+            with self._lock:
+                self._syncing = False
+                self._changed.notify_all()
+                self._changed.wait_for(lambda: self._pending)
+                batch, self._pending = self._pending, set()
+                self._syncing = True
+            for filename in batch:
+                self._sync(filename)
+
+    @staticmethod
+    def _sync(filename: Path) -> None:
+        """Flush the file *filename* to disk (ignoring files removed in the meantime)."""
+        try:
+            with filename.open("ab") as fp:
+                os.fsync(fp.fileno())
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Could not flush journal '{filename}' to disk: {e!s}")
+
+
+_syncer: JournalSyncer | None = None
+
+
+def get_syncer() -> JournalSyncer:
+    """Return the app's shared `JournalSyncer`, creating it on first use."""
+    global _syncer
+    if _syncer is None:
+        _syncer = JournalSyncer()
+    return _syncer
+
+
+class ResponseJournal:
+    """Crash-safe journal of the changes made to responses in progress.
+
+    Each response in progress has its own journal file,
+    :code:`<response_id>.jsonl`, in the journal's directory *path*. Every change
+    to the response's temporary data is appended to the file as a single line
+    of JSON describing the change (a *delta*), rather than rewriting the whole
+    response, so that writing to the journal stays cheap no matter how much
+    data a response has collected. Each line is written to the file before
+    `ResponseJournal.append()` returns, so that it survives the app crashing,
+    and flushed to disk shortly after by a background thread (see
+    `JournalSyncer`), so that the thread handling the change doesn't wait for
+    the disk.
+
+    The following operations are recorded, where *field* is a top-level key
+    of the response's temporary data:
+        * :code:`new`: the response was created with the data in *value*.
+        * :code:`set`: *field* was set to *value*.
+        * :code:`setitem`: the item *key* of the dictionary in *field* was set
+          to *value*.
+        * :code:`append`: *value* was appended to the list in *field*.
+        * :code:`delete`: *field* was removed.
+
+    Replaying all operations in order with `ResponseJournal.replay()` restores
+    the temporary data of every response that was in progress when the app
+    last exited. Once a response has been stored (or discarded), its journal is
+    no longer needed and is removed with `ResponseJournal.remove()`. The
+    journal of a restored response can be rewritten as a single :code:`new`
+    record with `ResponseJournal.compact()`, so that it doesn't keep growing
+    across restarts, and journals of responses that were abandoned long ago
+    are removed with `ResponseJournal.expire()`.
+
+    Values are recorded in their JSON-compatible form (e.g. pydantic models as
+    dictionaries), so replayed data contains plain dictionaries and lists where
+    the original data may have contained model instances.
+    """
+
+    path: Path
+
+    def __init__(self, path: Path):
+        """Initialise a ResponseJournal keeping its journal files in *path*."""
+        self.path = path
+
+    def _journal_file(self, response_id: UUID) -> Path:
+        """Return the path of the journal file for *response_id*."""
+        return self.path / f"{response_id!s}.jsonl"
+
+    def append(
+        self,
+        response_id: UUID,
+        op: JournalOp,
+        field: str | None = None,
+        value: Any = None,
+        key: str | None = None,
+    ) -> None:
+        """Append the operation *op* to the journal of the response *response_id*.
+
+        Failing to write to the journal never interrupts data collection: errors
+        are logged, and the response simply is not recoverable after a crash.
+        """
+        record: dict[str, Any] = {"op": op}
+        if field is not None:
+            record["field"] = field
+        if key is not None:
+            record["key"] = key
+        if op != "delete":
+            record["value"] = to_jsonable_python(value)
+        line = get_codec().dumps(record) + "\n"
+        filename = self._journal_file(response_id)
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            with filename.open("a", encoding="utf-8") as fp:
+                fp.write(line)
+        except OSError as e:
+            logger.error(f"Could not write to journal of response {response_id}: {e!s}")
+            return
+        get_syncer().schedule(filename)
+
+    def remove(self, response_id: UUID) -> None:
+        """Remove the journal of the response with id *response_id*, if any."""
+        try:
+            self._journal_file(response_id).unlink(missing_ok=True)
+        except OSError as e:
+            logger.error(f"Could not remove journal of response {response_id}: {e!s}")
+
+    def compact(self, response_id: UUID, data: dict[str, Any]) -> None:
+        """Replace the journal of the response *response_id* with a single :code:`new` record.
+
+        The compacted journal is written to a temporary file first, which only
+        replaces the journal once it has been flushed to disk.
+        """
+        line = get_codec().dumps({"op": "new", "value": to_jsonable_python(data)}) + "\n"
+        filename = self._journal_file(response_id)
+        tmpfile = filename.with_name(f"{filename.name}.tmp")
+        try:
+            with tmpfile.open("w", encoding="utf-8") as fp:
+                fp.write(line)
+                fp.flush()
+                os.fsync(fp.fileno())
+            tmpfile.replace(filename)
+        except OSError as e:
+            logger.error(f"Could not compact journal of response {response_id}: {e!s}")
+            tmpfile.unlink(missing_ok=True)
+
+    def expire(self, max_age: float) -> int:
+        """Remove the journals that were last changed more than *max_age* seconds ago.
+
+        Returns:
+            The number of journals removed.
+        """
+        cutoff = time.time() - max_age
+        removed = 0
+        for filename in self.path.glob("*.jsonl"):
+            try:
+                if filename.stat().st_mtime < cutoff:
+                    filename.unlink()
+                    removed += 1
+            except OSError as e:
+                logger.error(f"Could not expire journal '{filename}': {e!s}")
+        if removed:
+            logger.info(f"Removed {removed} expired journal(s) from '{self.path}'.")
+        return removed
+
+    def replay(self) -> dict[UUID, dict[str, Any]]:
+        """Replay all journals and return the restored response data by response id."""
+        restored: dict[UUID, dict[str, Any]] = {}
+        if not self.path.is_dir():
+            return restored
+        for filename in sorted(self.path.glob("*.jsonl")):
+            try:
+                response_id = UUID(filename.stem)
+            except ValueError:
+                logger.warning(f"Ignoring journal with invalid name '{filename}'.")
+                continue
+            data = self._replay_file(filename)
+            if data is not None:
+                restored[response_id] = data
+        return restored
+
+    @staticmethod
+    def _replay_file(filename: Path) -> dict[str, Any] | None:  # noqa: C901
+        """Replay the operations in the journal file *filename*."""
+        data: dict[str, Any] | None = None
+        try:
+            with filename.open("r", encoding="utf-8") as fp:
+                lines = fp.readlines()
+        except OSError as e:
+            logger.error(f"Could not read journal '{filename}': {e!s}")
+            return None
+        for lineno, line in enumerate(lines, start=1):
+            try:
+                record = get_codec().loads(line)
+            except json.JSONDecodeError:
+                # Most likely a partial line written as the app was killed.
+                logger.warning(f"Skipping unreadable line {lineno} of journal '{filename}'.")
+                continue
+            op = record.get("op")
+            if op == "new":
+                data = dict(record["value"])
+            elif data is None:
+                logger.warning(f"Journal '{filename}' does not start with a 'new' record.")
+                return None
+            elif op == "set":
+                data[record["field"]] = record["value"]
+            elif op == "setitem":
+                data.setdefault(record["field"], {})[record["key"]] = record["value"]
+            elif op == "append":
+                data.setdefault(record["field"], []).append(record["value"])
+            elif op == "delete":
+                data.pop(record["field"], None)
+            else:
+                logger.warning(f"Unknown operation {op!r} in journal '{filename}'.")
+        return data
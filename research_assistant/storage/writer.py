@@ -0,0 +1,128 @@
+"""Background writer persisting responses off the gevent event loop."""
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+
+import gevent  # type: ignore
+from gevent.event import AsyncResult  # type: ignore
+from gevent.queue import JoinableQueue  # type: ignore
+
+from ..datamodels.models import ResponseBase
+from .backends import StorageBackend
+from .index import get_index
+
+logger = logging.getLogger(__name__)
+
+
+def write_response(
+    backend: StorageBackend,
+    task: str,
+    data_path: Path,
+    response: ResponseBase,
+    sync: bool = False,
+) -> str:
+    """Store *response* with *backend* and record it in the response index.
+
+    The arguments are passed on to `StorageBackend.store()` unchanged, and its
+    result is returned. Failing to update the index is logged but does not
+    fail the write, as the index can always be rebuilt from the stored data.
+
+    Raises:
+        StorageError: Raised if the response could not be stored.
+    """
+    location = backend.store(task, data_path, response, sync)
+    try:
+        get_index().add(task, response, location)
+    except Exception as e:
+        logger.error(f"Could not add {task} response {response.id} to the index: {e!s}")
+    return location
+
+
+class BackgroundWriter:
+    """Persistence queue writing validated responses from a worker thread.
+
+    Responses submitted with `BackgroundWriter.submit()` are queued and written
+    one after the other by a single worker greenlet, which hands each write
+    (including the serialisation of the response) to gevent's thread pool. The
+    event loop, and with it all other eel calls, therefore keeps running while
+    a response is being written, even on slow disks.
+
+    Each submission returns a `gevent.event.AsyncResult`, which is set to the
+    location reported by the storage backend once the response has been
+    written, or to the exception raised by the backend if the write failed.
+    Callers that need to know that the response is on disk can simply wait on
+    the result; callers that don't can attach a callback with
+    :code:`result.rawlink()` and carry on.
+    """
+
+    _queue: JoinableQueue
+    _worker: gevent.Greenlet | None
+
+    def __init__(self):
+        """Initialise a new, empty BackgroundWriter."""
+        self._queue = JoinableQueue()
+        self._worker = None
+
+    @property
+    def pending(self) -> int:
+        """The number of submitted responses that have not been written yet."""
+        return self._queue.unfinished_tasks
+
+    def submit(
+        self,
+        backend: StorageBackend,
+        task: str,
+        data_path: Path,
+        response: ResponseBase,
+        sync: bool = False,
+    ) -> AsyncResult:
+        """Queue *response* to be written with *backend* and return an `AsyncResult`.
+
+        The arguments are passed on to `write_response()` unchanged.
+        """
+        result = AsyncResult()
+        self._queue.put((backend, task, data_path, response, sync, result))
+        logger.debug(f"Queued {task} response {response.id} ({self.pending} pending).")
+        if self._worker is None or self._worker.dead:
+            self._worker = gevent.spawn(self._run)
+        return result
+
+    def _run(self) -> None:
+        """Worker loop writing queued responses on the hub's thread pool."""
+        threadpool = gevent.get_hub().threadpool  # type: ignore
+        while True:
+            backend, task, data_path, response, sync, result = self._queue.get()
+            try:
+                location = threadpool.apply(
+                    write_response, (backend, task, data_path, response, sync)
+                )
+            except Exception as exc:
+                logger.error(f"Background write of {task} response {response.id} failed.")
+                result.set_exception(exc)
+            else:
+                result.set(location)
+            finally:
+                self._queue.task_done()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until all queued responses have been written.
+
+        Returns:
+            `True` if the queue was fully flushed, `False` if *timeout* seconds
+            passed before all queued responses could be written.
+        """
+        if self.pending:
+            logger.info(f"Flushing {self.pending} queued response(s) to storage...")
+        return self._queue.join(timeout)
+
+
+_writer: BackgroundWriter | None = None
+
+
+def get_writer() -> BackgroundWriter:
+    """Return the app's shared `BackgroundWriter`, creating it on first use."""
+    global _writer
+    if _writer is None:
+        _writer = BackgroundWriter()
+    return _writer
@@ -20,29 +20,31 @@ class AgtTaskAPI(ResearchTaskAPI):
     task_data_path = config.paths.data / "AGT"
     eel_namespace = "agt"
 
-    # agt_practice_trials: Final[tuple[str, ...]] = (
-    #     "practice",     # Practice trial
-    # )
-
-    # agt_filler_trials: Final[tuple[str, ...]] = (
-    #     "f1",           # Filler 1
-    #     "f2",           # Filler 2
-    #     "f3",           # Filler 3
-    #     "f4",           # Filler 4
-    # )
-
-    # agt_guise_trials: Final[tuple[str, ...]] = (
-    #     "s1_maj",    # 1st recording of variety 1
-    #     "s1_rml",    # 1st recording of variety 2
-    #     "s2_maj",    # 2nd recording of variety 1
-    #     "s2_rml",    # 2md recording of variety 2
-    #     "s3_maj",    # 3rd recording of variety 1
-    #     "s3_rml",    # 3rd recording of variety 2
-    #     "s4_maj",    # 4th recording of variety 1
-    #     "s4_rml",    # 4th recording of variety 2
-    # )
-
-    # agt_trials: Final[tuple[str, ...]] = agt_practice_trials + agt_filler_trials + agt_guise_trials
+    agt_practice_trials: Final[tuple[str, ...]] = (
+        "practice",     # Practice trial
+    )
+
+    agt_filler_trials: Final[tuple[str, ...]] = (
+        "f1",           # Filler 1
+        "f2",           # Filler 2
+        "f3",           # Filler 3
+        "f4",           # Filler 4
+    )
+
+    agt_guise_trials: Final[tuple[str, ...]] = (
+        "s1_maj",    # 1st recording of variety 1
+        "s1_rml",    # 1st recording of variety 2
+        "s2_maj",    # 2nd recording of variety 1
+        "s2_rml",    # 2md recording of variety 2
+        "s3_maj",    # 3rd recording of variety 1
+        "s3_rml",    # 3rd recording of variety 2
+        "s4_maj",    # 4th recording of variety 1
+        "s4_rml",    # 4th recording of variety 2
+    )
+
+    agt_trials: Final[tuple[str, ...]] = (
+        agt_practice_trials + agt_filler_trials + agt_guise_trials
+    )
 
     agt_traits: Final[tuple[str, ...]] = (
         "amusing",
@@ -192,16 +194,13 @@ class AgtTaskAPI(ResearchTaskAPI):
             )
         trial_ratings = AgtTaskTrialRatings(trial=trial, ratings=trait_ratings)
         print("Trial ratings:", trial_ratings)
-        if "ratings_dict" not in self._response_data[response_id]:
-            # @TODO: MAKE THIS A DICT TO AVOID DUPLICATES!
-            self._response_data[response_id]["ratings_dict"] = dict()
-        if trial in self._response_data[response_id]["ratings_dict"]:
+        if trial in self._response_data[response_id].get("ratings_dict", {}):
             self.logger.warning(
                 f"... {self.__class__.__name__} response with id {response_id} "
                 f"already contains trial ratings for {trial} - the old trial "
                 "ratings will be overwritten."
             )
-        self._response_data[response_id]["ratings_dict"][trial] = trial_ratings
+        self._set_response_item(response_id, "ratings_dict", trial, trial_ratings)
         # Redirect to next trial or end (if all 13 collected)
         n_trials = len(self._response_data[response_id]["ratings_dict"])
         if n_trials < MAX_TRIALS:
@@ -220,11 +219,13 @@ class AgtTaskAPI(ResearchTaskAPI):
                 )
                 self.logger.error(str(exc))
                 raise exc
-            self._response_data[response_id]["stimulus_ratings"] = list(
-                self._response_data[response_id]["ratings_dict"].values()
+            self._set_response_field(
+                response_id,
+                "stimulus_ratings",
+                list(self._response_data[response_id]["ratings_dict"].values()),
             )
-            del self._response_data[response_id]["ratings_dict"]
-            if self.store(response_id):
+            self._delete_response_field(response_id, "ratings_dict")
+            if self._call_exposed(self.store, response_id):
                 self.set_location(f"end.html?instance={response_id}")
             else:
                 exc = RuntimeError(
@@ -3,6 +3,7 @@ import logging
 from typing import Any
 from uuid import UUID
 
+from ...booteel.memo import memoized
 from ...booteel.task_api import ResearchTaskAPI
 from ...config import config
 from .datamodel import AtolcTaskLanguageRatings, AtolcTaskResponse
@@ -38,6 +39,7 @@ class AtolcTaskAPI(ResearchTaskAPI):
     )
 
     @ResearchTaskAPI.exposed
+    @memoized
     def get_traits(self) -> list[str]:
         """Return a list of the AToL-C traits."""
         return list(self.atolc_traits)
@@ -101,14 +103,12 @@ class AtolcTaskAPI(ResearchTaskAPI):
             order=list(trait_ratings.keys()),
             **trait_ratings,
         )
-        if "ratings" not in self._response_data[response_id]:
-            self._response_data[response_id]["ratings"] = []
-        self._response_data[response_id]["ratings"].append(ratings)
+        self._append_response_item(response_id, "ratings", ratings)
         if language_trial < MAX_TRIALS:
             self.set_location(
                 f"start.html?instance={response_id}&trial={language_trial+1}"
             )
-        elif self.store(response_id):
+        elif self._call_exposed(self.store, response_id):
             self.set_location(f"end.html?instance={response_id}")
         else:
             exc = RuntimeError(
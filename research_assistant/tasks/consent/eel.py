@@ -47,17 +47,18 @@ class ConsentTaskAPI(ResearchTaskAPI):
             raise exc
         informed_consent = bool(data["confirmInformedConsent"])
         eligibility_confirmed = bool(data["confirmEligibility"])
-        self._response_data[response_id]["informed_consent"] = informed_consent
-        self._response_data[response_id][
-            "eligibility_confirmed"
-        ] = eligibility_confirmed
+        self._set_response_field(response_id, "informed_consent", informed_consent)
+        self._set_response_field(
+            response_id, "eligibility_confirmed", eligibility_confirmed
+        )
         # Fix task_localisation (includes ".xyz" for a task group, which needs to be split off)
         response_meta = self._response_data[response_id]["meta"]
         localisation_string: str = response_meta.task_localisation
         task_localisation, consent_task_group = localisation_string.split(".")
         response_meta.task_localisation = task_localisation
-        self._response_data[response_id]["consent_task_group"] = consent_task_group
-        if self.store(response_id):
+        self._set_response_field(response_id, "meta", response_meta)
+        self._set_response_field(response_id, "consent_task_group", consent_task_group)
+        if self._call_exposed(self.store, response_id):
             self.end(response_id)
         else:
             exc = RuntimeError(
@@ -172,7 +172,7 @@ class LsbqeTaskAPI(ResearchTaskAPI):
             residencies=residencies,
             education_level=data["education_level"],
         )
-        self._response_data[response_id]["lsb"] = lsb
+        self._set_response_field(response_id, "lsb", lsb)
         self.set_location(f"ldb.html?instance={response_id}")
 
     @ResearchTaskAPI.exposed
@@ -395,7 +395,7 @@ class LsbqeTaskAPI(ResearchTaskAPI):
                 )
                 languages_spoken.append(language_spoken)
         ldb = LdbResponse(languages=languages_spoken, parents=parent_info)
-        self._response_data[response_id]["ldb"] = ldb
+        self._set_response_field(response_id, "ldb", ldb)
         self.set_location(f"club.html?instance={response_id}")
 
     @ResearchTaskAPI.exposed
@@ -562,7 +562,7 @@ class LsbqeTaskAPI(ResearchTaskAPI):
             activities=activities,
             code_switching=code_switching,
         )
-        self._response_data[response_id]["club"] = club
+        self._set_response_field(response_id, "club", club)
         self.set_location(f"end.html?instance={response_id}")
 
     @ResearchTaskAPI.exposed
@@ -608,15 +608,15 @@ class LsbqeTaskAPI(ResearchTaskAPI):
             )
         data["participant_note"] = data["participant_note"].strip()
         if data["participant_note"]:
-            self._response_data[response_id]["note"] = data["participant_note"]
+            self._set_response_field(response_id, "note", data["participant_note"])
         else:
-            self._response_data[response_id]["note"] = None
+            self._set_response_field(response_id, "note", None)
 
     @ResearchTaskAPI.exposed
     def add_note_and_end(self, response_id: AnyUUID, data: dict[str, Any]) -> str:
         """Optionally add a participant note, store response, and direct to next task."""
         self.add_note(response_id, data)
-        self.store(response_id)
+        self._call_exposed(self.store, response_id)
         self.end(response_id)
 
 
@@ -51,12 +51,10 @@ class MemoryTaskAPI(ResearchTaskAPI):
                 self.logger.error(str(exc))
                 raise exc
             score = MemoryTaskScore(score=x["score"], time=x["time"])
-            if "scores" not in self._response_data[response_id]:
-                self._response_data[response_id]["scores"] = []
-            self._response_data[response_id]["scores"].append(score)
+            self._append_response_item(response_id, "scores", score)
 
         # This completes the Memory task, so store and finish up...
-        if self.store(response_id):
+        if self._call_exposed(self.store, response_id):
             self.set_location(f"end.html?instance={response_id!s}")
 
 
@@ -1,13 +1,23 @@
-"""Utility functions for the LART Research Assistant app."""
+"""Utility functions for the LART Research Assistant app.
+
+The modules needed by each function (e.g. tkinter for the dialogs, or the
+backup and export packages) are only imported when the function is called, so
+that the app's command line interface starts quickly (see
+`research_assistant.cli`).
+"""
+from __future__ import annotations
+
 import json
 import logging
 import os
-import shutil
 from pathlib import Path
-from tkinter import Label, Tk, filedialog, messagebox
-from typing import Any, Literal
+from typing import TYPE_CHECKING, Any, Literal, Mapping
+
+from .config import Config, _default_paths  # type: ignore
 
-from .config import Config, _default_paths, config  # type: ignore
+if TYPE_CHECKING:
+    from .backup.engine import ProgressCallback
+    from .datamodels.models import ResponseBase
 
 logger = logging.getLogger(__name__)
 
@@ -121,55 +131,168 @@ def _recursively_overwrite_attr(obj: object, attr: str, value: Any) -> bool:
     return False
 
 
-def export_backup(filename: Path | str | None = None) -> bool:
-    """Export app data as a ZIP archive. Prompt for filename if needed."""
+def ask_backup_filename() -> str:
+    """Display a save as ... dialog asking for the filename of a data backup."""
+    from tkinter import Label, Tk, filedialog
+
+    from .backup.engine import available_formats
+
+    tkroot = Tk()
+    tkroot.title("LART Research Assistant data backup")
+    if os.name == "nt":
+        tkroot.iconbitmap(  # type: ignore
+            str(Path(__file__).parent / "web" / "img" / "appicon.ico")
+        )
+    label = Label(
+        master=tkroot,
+        text="Please select the path to save the data backup to...",
+        font=("Helvetica 13"),
+    )
+    label.pack()
+    tkroot.geometry("500x50")
+    tkroot.lift()
+    tkroot.withdraw()
+    from datetime import datetime
+
+    filetypes = [("ZIP Archives", "*.zip")]
+    if "tar.zst" in available_formats():
+        filetypes.append(("Zstandard-compressed tar archives", "*.tar.zst"))
+    dialog = filedialog.SaveAs(
+        master=tkroot,
+        title="Save Data Backup as...",
+        initialfile=datetime.now().strftime("lartrc_backup_%Y-%m-%dT%H%M%S.zip"),
+        filetypes=filetypes,
+        # takefocus="initialfile",
+    )
+    filename = str(dialog.show())  # type: ignore
+    tkroot.destroy()
+    return filename
+
+
+def export_backup(
+    filename: Path | str | None = None,
+    incremental: bool = False,
+    progress: ProgressCallback | None = None,
+) -> bool:
+    """Export app data as a backup archive. Prompt for filename if needed.
+
+    If *incremental* is `True`, the archive only contains the data added or
+    changed since the previous backup (see `research_assistant.backup`). The
+    *progress* callback, if given, receives a `BackupProgress` as the archive
+    is written.
+    """
+    from .backup import BackupError, create_backup
+    from .backup.engine import ARCHIVE_FORMATS
+
     logger.debug("Exporting data backup...")
     if filename is None:
-        tkroot = Tk()
-        tkroot.title("LART Research Assistant data backup")
-        if os.name == "nt":
-            tkroot.iconbitmap(  # type: ignore
-                str(Path(__file__).parent / "web" / "img" / "appicon.ico")
-            )
-        label = Label(
-            master=tkroot,
-            text="Please select the path to save the data backup to...",
-            font=("Helvetica 13"),
-        )
-        label.pack()
-        tkroot.geometry("500x50")
-        tkroot.lift()
-        tkroot.withdraw()
-        from datetime import datetime
-
-        dialog = filedialog.SaveAs(
-            master=tkroot,
-            title="Save Data Backup as...",
-            initialfile=datetime.now().strftime("lartrc_backup_%Y-%m-%dT%H%M%S.zip"),
-            filetypes=[("ZIP Archives", "*.zip")],
-            # takefocus="initialfile",
-        )
-        filename = str(dialog.show())  # type: ignore
+        filename = ask_backup_filename()
     if not filename:
         logger.error("No filename provided.")
         return False
     filename = Path(filename)
     logger.debug(f"Backup filename: '{filename}'")
-    if str(filename).endswith(".zip"):
-        filename = filename.with_suffix("")
-    old_wd = Path.cwd()
-    os.chdir(config.paths.data)
-    result = shutil.make_archive(str(filename), "zip", logger=logger)
-    os.chdir(old_wd)
-    if Path(result).exists():
-        logger.info(f"Backup saved to file '{result}'.")
-        return True
-    logger.info("Failed to create backup.")
-    return False
+    if not str(filename).endswith(tuple(ARCHIVE_FORMATS.values())):
+        filename = filename.with_name(f"{filename.name}.zip")
+    try:
+        create_backup(filename, incremental=incremental, progress=progress)
+    except BackupError as e:
+        logger.error(str(e))
+        logger.info("Failed to create backup.")
+        return False
+    return True
+
+
+def restore_backups(archives: list[Path | str], target: Path | str | None = None) -> bool:
+    """Restore a full data backup and its increments to the directory *target*.
+
+    If *target* is not given, the data is restored to a new directory next to
+    the most recently modified archive.
+    """
+    from .backup import BackupError, restore_backup
+
+    if not archives:
+        logger.error("No backup archives provided.")
+        return False
+    try:
+        if target is None:
+            latest = max((Path(archive) for archive in archives), key=lambda p: p.stat().st_mtime)
+            target = latest.with_name(f"{latest.stem}_restored")
+        restore_backup(archives, target)
+    except (BackupError, OSError) as e:
+        logger.error(str(e))
+        logger.info("Failed to restore backup.")
+        return False
+    return True
+
+
+def merge_data_backups(
+    archives: list[Path | str], output: Path | str | None = None
+) -> bool:
+    """Merge the responses in backup archives from many devices into one SQLite database.
+
+    The *archives* may include directories (all archives in which are merged)
+    and wildcard patterns. If *output* is not given, the responses are merged
+    into :file:`merged_responses.sqlite3` in the current working directory.
+    """
+    from .backup import BackupError, find_archives, merge_backups
+    from .storage import get_index
+
+    found = find_archives(archives)
+    if not found:
+        logger.error("No backup archives found.")
+        return False
+    if output is None:
+        output = Path.cwd() / "merged_responses.sqlite3"
+    task_dirs = {path.name: task for task, path in get_index().tasks.items()}
+    try:
+        stats = merge_backups(found, output, task_dirs=task_dirs)
+    except BackupError as e:
+        logger.error(str(e))
+        logger.info("Failed to merge backups.")
+        return False
+    if stats.errors:
+        logger.warning(f"{stats.errors} error(s) occurred while merging backups.")
+    return stats.errors == 0
+
+
+def export_data_tables(
+    output: Path | str,
+    tasks: Mapping[str, tuple[type[ResponseBase], Path]],
+    table_format: str = "csv",
+    source: Path | str | None = None,
+) -> bool:
+    """Export the stored responses of *tasks* as flat tables to the directory *output*.
+
+    If *source* is given, the responses are read from that SQLite database
+    (e.g. one created with `merge_data_backups()`) rather than from the app's
+    storage backend.
+    """
+    from .export import ExportError, export_tables
+    from .storage import SQLiteBackend
+
+    backend = None
+    if source is not None:
+        if not Path(source).is_file():
+            logger.error(f"Response database '{source}' not found.")
+            return False
+        backend = SQLiteBackend(source)
+    try:
+        export_tables(output, tasks, table_format, backend=backend)
+    except ExportError as e:
+        logger.error(str(e))
+        logger.info("Failed to export data tables.")
+        return False
+    finally:
+        if backend is not None:
+            backend.close()
+    return True
 
 
 def show_error_dialog(title: str | None = None, message: str | None = None):
     """Display a graphical error message box even if eel is not active."""
+    from tkinter import Tk, messagebox
+
     tkroot = Tk()
     tkroot.withdraw()
     messagebox.showerror(
@@ -364,8 +364,132 @@ booteel.handleModal = async function (modal_id, choice, callback = null) {
     return result;
 }
 
+/**
+ * Run several calls to the Python methods of an Eel API in a single round trip.
+ * 
+ * The calls are sent to the API's `batch` method (e.g. `eel.agt_batch`) in one websocket
+ * message and run in order, and their results are returned in one message, rather than
+ * waiting for a round trip per call, e.g. to initialise a page:
+ * 
+ *     booteel.batch('agt', [['get_trials'], ['get_traits']])
+ *         .then(([trials, traits]) => { ... });
+ * 
+ * @param {string} namespace - The namespace of the Eel API (e.g. 'agt').
+ * @param {Array.<Array>} calls - The calls to run, each an array of the name of a method
+ *                                exposed by the API (without its namespace) and, optionally,
+ *                                an array of the method's arguments.
+ * @returns {Promise<Array|false>} A promise resolving to the results of the calls, in order,
+ *                                 or to `false` if the batch failed (e.g. because a call was
+ *                                 invalid) and the API's exception handler reported the error.
+ */
+booteel.batch = function (namespace, calls) {
+    const endpoint = eel[`${namespace}_batch`];
+    if (endpoint === undefined) {
+        booteel.logger.error(`No batch method exposed for namespace '${namespace}'.`);
+        return Promise.reject(new Error(`No batch method exposed for namespace '${namespace}'.`));
+    }
+    booteel.logger.debug(`Sending ${calls.length} batched calls to namespace '${namespace}':`, calls);
+    return endpoint(calls.map(([method, args = []]) => [method, args]))();
+}
+
+/**
+ * Call a memoized Python method of an Eel API, reusing its result if it hasn't changed.
+ * 
+ * The results of methods marked as read-only in Python (e.g. `get_localisations` or
+ * `load_localisation`) are kept in the session storage with their etag. When the method is
+ * called again with the same arguments, the etag is sent to the API's `fetch` method (e.g.
+ * `eel.lsbqe_fetch`), which replies without the result if it hasn't changed.
+ * 
+ *     booteel.fetch('lsbqe', 'get_localisations').then(populateSurveyVersions);
+ * 
+ * @param {string} namespace - The namespace of the Eel API (e.g. 'lsbqe').
+ * @param {string} method - The name of the memoized method (without its namespace).
+ * @param {Array} args - The arguments of the call.
+ * @returns {Promise<any>} A promise resolving to the result of the call.
+ */
+booteel.fetch = async function (namespace, method, args = []) {
+    const storageKey = `booteel.fetch:${namespace}_${method}:${JSON.stringify(args)}`;
+    let cached = null;
+    try {
+        cached = JSON.parse(window.sessionStorage.getItem(storageKey));
+    } catch (error) {
+        booteel.logger.debug(`Ignoring invalid cached result for '${storageKey}'.`);
+    }
+    const reply = await eel[`${namespace}_fetch`](method, args, cached ? cached.etag : null)();
+    if (!reply || reply.etag === undefined) {
+        return reply;  // The call failed and the error was handled by the backend
+    }
+    if (!reply.modified) {
+        booteel.logger.debug(`Result of '${namespace}_${method}' not modified (etag ${reply.etag}).`);
+        return cached.value;
+    }
+    try {
+        window.sessionStorage.setItem(storageKey, JSON.stringify({etag: reply.etag, value: reply.value}));
+    } catch (error) {
+        booteel.logger.debug(`Could not cache result for '${storageKey}':`, error);
+    }
+    return reply.value;
+}
+
 booteel.setLocation = function (location) {
     booteel.logger.debug(`Navigating to ${location}.`);
     window.location = location;
 }
-eel.expose(booteel.setLocation, "_booteel_setlocation");
\ No newline at end of file
+eel.expose(booteel.setLocation, "_booteel_setlocation");
+/**
+ * Show or update a progress toast in bootstrap.
+ * 
+ * Progress toasts are identified by *progress_id*: the first call for an id creates the
+ * toast, further calls update its progress bar and message. Once *fraction* reaches 1 and
+ * *done* is true, the toast is hidden and removed after a short delay.
+ * 
+ * @param {string} progress_id - An identifier for the task whose progress is shown.
+ * @param {string} title - A title for the toast (may contain HTML).
+ * @param {number} fraction - The fraction of the task completed, between 0 and 1.
+ * @param {string} message - A message describing the current progress (may contain HTML).
+ * @param {bool} done - Whether the task has finished.
+ */
+booteel.progress = function (progress_id, title, fraction, message = '', done = false) {
+    const toast_id = `${progress_id.replace(/\W/g, '')}-progress`;
+    let element = document.getElementById(toast_id);
+    if (element === null) {
+        booteel.logger.debug(`Creating progress toast '${toast_id}'.`);
+        let container = document.getElementById('booteel-progress-container');
+        if (container === null) {
+            container = document.createElement('div');
+            container.id = 'booteel-progress-container';
+            container.className = 'toast-container position-fixed bottom-0 end-0 p-3';
+            document.body.appendChild(container);
+        }
+        const div = document.createElement('div');
+        div.innerHTML = `
+          <div class="toast" id="${toast_id}" role="status" aria-live="polite" aria-atomic="true" data-bs-autohide="false">
+            <div class="toast-header">
+                <strong class="me-auto">${title}</strong>
+            </div>
+            <div class="toast-body">
+                <div class="progress mb-1">
+                    <div class="progress-bar" role="progressbar" style="width: 0%" aria-valuenow="0" aria-valuemin="0" aria-valuemax="100"></div>
+                </div>
+                <small class="booteel-progress-message"></small>
+            </div>
+        </div>`;
+        element = div.firstElementChild;
+        container.appendChild(element);
+        new bootstrap.Toast(element).show();
+    }
+    const percent = Math.round(Math.min(Math.max(fraction, 0), 1) * 100);
+    const bar = element.querySelector('.progress-bar');
+    bar.style.width = `${percent}%`;
+    bar.setAttribute('aria-valuenow', percent.toString());
+    element.querySelector('.booteel-progress-message').innerHTML = message;
+    if (done === true && element.dataset.done === undefined) {
+        element.dataset.done = 'true';
+        booteel.logger.debug(`Progress toast '${toast_id}' done.`);
+        setTimeout(function () {
+            bootstrap.Toast.getInstance(element).hide();
+            element.addEventListener('hidden.bs.toast', () => element.remove());
+        }, 1500);
+    }
+}
+eel.expose(booteel.progress, "_booteel_progress");
@@ -1299,6 +1299,11 @@ lart.forms.getFormData = function (formElementOrId) {
  * This namespace implements functionality to facilitate the on-the-fly translation
  * of user interface elements with strings loaded on-demand from the backend.
  * 
+ * Task pages requested with the `instance` of a response in progress are
+ * already localised on the server (see `research_assistant.booteel.pages`).
+ * Elements localised there carry a `data-*ns*-tr-origin` attribute instead of
+ * `data-*ns*-tr`, exactly as if translated here, and are therefore skipped.
+ * 
  * @summary On-the-fly UI translation management
  * @namespace lart.tr
  * @memberof lart
@@ -1421,12 +1426,25 @@ lart.tr.get = function(ns, trId) {
  * @param {Array.<any>} [loaderParams=[]] - The parameters that the *eelLoader*
  *      should be called with.
  * @returns {null}
+ * 
+ * If *eelLoader* is the `load_localisation` method of the namespace's task, the strings are
+ * loaded with {@link booteel.fetch}, so that strings loaded before are reused if they haven't
+ * changed.
  */
 lart.tr.loadFromEel = function(ns, eelLoader, loaderParams = null) {
     if (!loaderParams) {
         loaderParams = [];
     }
     booteel.logger.debug(`Loading translation strings for namespace '${ns}' from ${eelLoader} with arguments`, loaderParams);
+    if (eelLoader === eel[`${ns}_load_localisation`] && eel[`${ns}_fetch`] !== undefined) {
+        // Reuse the strings from a previous page if they haven't changed
+        booteel.fetch(ns, 'load_localisation', loaderParams).then(
+            function (strings) {
+                lart.tr._addStrings(ns, strings);
+            }
+        );
+        return;
+    }
     eelLoader(...loaderParams)(
         function (strings) {
             lart.tr._addStrings(ns, strings);
@@ -1434,6 +1452,24 @@ lart.tr.loadFromEel = function(ns, eelLoader, loaderParams = null) {
     );
 }
 
+/**
+ * Add translation strings loaded from the backend into a translation namespace.
+ * 
+ * Use this instead of {@link lart.tr.loadFromEel} where the strings are loaded together
+ * with other data, e.g. with {@link booteel.batch}:
+ * 
+ * @example <caption>Loads the AGT sections 'meta' and 'base' along with the AGT's traits:</caption>
+ * booteel.batch('agt', [['load_localisation', [instanceId, ['meta', 'base']]], ['get_traits']])
+ *     .then(([strings, traits]) => lart.tr.addStrings('agt', strings));
+ * 
+ * @param {string} ns - The translation namespace to add the strings to.
+ * @param {object<string,string>} strings - The translation strings returned by the backend.
+ * @returns {null}
+ */
+lart.tr.addStrings = function(ns, strings) {
+    lart.tr._addStrings(ns, strings);
+}
+
 /**
  * Add translation strings from array to {@link lart.tr.strings}.
  * 
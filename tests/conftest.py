@@ -0,0 +1,20 @@
+"""Fixtures shared by the app's tests."""
+from pathlib import Path
+
+import pytest
+
+from research_assistant.config import config
+from research_assistant.storage import index as index_module
+
+
+@pytest.fixture
+def app_paths(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Point the app's paths for data and cached files to *tmp_path*.
+
+    The response index is reset, so that it is created in the new path for
+    data files on first use.
+    """
+    monkeypatch.setattr(config.paths, "data", tmp_path / "data")
+    monkeypatch.setattr(config.paths, "cache", tmp_path / "cache")
+    monkeypatch.setattr(index_module, "_index", None)
+    return tmp_path
@@ -0,0 +1,96 @@
+"""Round trips of (incremental) data backups (see research_assistant.backup)."""
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from research_assistant.backup import (BackupError, create_backup, read_manifest,
+                                       restore_backup)
+from research_assistant.backup.engine import ARCHIVE_FORMATS, available_formats
+from research_assistant.backup.manifest import MANIFEST_NAME
+
+
+def read_files(path: Path) -> dict[str, bytes]:
+    """Return the contents of the files in *path* (except backup manifests) by relative path."""
+    return {
+        file.relative_to(path).as_posix(): file.read_bytes()
+        for file in path.rglob("*")
+        if file.is_file() and file.name != MANIFEST_NAME
+    }
+
+
+@pytest.fixture
+def data_path(tmp_path: Path) -> Path:
+    """Return a data directory with a few stored responses."""
+    path = tmp_path / "data"
+    for task, participant in (("LSBQe", "PAR01"), ("LSBQe", "PAR02"), ("AGT", "PAR01")):
+        response = path / task / "CymEng_Eng_GB" / f"{participant}.json"
+        response.parent.mkdir(parents=True, exist_ok=True)
+        response.write_text(f'{{"task": "{task}", "participant": "{participant}"}}')
+    return path
+
+
+@pytest.fixture
+def backup_chain(data_path: Path, tmp_path: Path) -> list[Path]:
+    """Back up *data_path* in full and then twice incrementally, changing it in between.
+
+    Each backup uses one of the available archive formats in turn.
+    """
+    suffixes = [ARCHIVE_FORMATS[name] for name in available_formats()]
+    archives = [tmp_path / "backups" / f"backup{i}{suffixes[i % len(suffixes)]}" for i in range(3)]
+    create_backup(archives[0], data_path=data_path)
+    (data_path / "LSBQe" / "CymEng_Eng_GB" / "PAR03.json").write_text('{"new": true}')
+    (data_path / "AGT" / "CymEng_Eng_GB" / "PAR01.json").unlink()
+    create_backup(archives[1], incremental=True, data_path=data_path)
+    (data_path / "LSBQe" / "CymEng_Eng_GB" / "PAR02.json").write_text('{"changed": true}')
+    create_backup(archives[2], incremental=True, data_path=data_path)
+    return archives
+
+
+def test_increments_record_changes(backup_chain):
+    manifests = [read_manifest(archive) for archive in backup_chain]
+    assert [manifest.kind for manifest in manifests] == ["full", "incremental", "incremental"]
+    assert len(manifests[0].added) == 3
+    assert manifests[1].added == ["LSBQe/CymEng_Eng_GB/PAR03.json"]
+    assert manifests[1].removed == ["AGT/CymEng_Eng_GB/PAR01.json"]
+    assert manifests[2].added == ["LSBQe/CymEng_Eng_GB/PAR02.json"]
+    assert manifests[2].chain == [manifests[0].id, manifests[1].id]
+
+
+def test_restore_in_any_order(backup_chain, data_path, tmp_path):
+    archives = [backup_chain[2], backup_chain[0], backup_chain[1]]
+    manifest = restore_backup(archives, tmp_path / "restored")
+    assert manifest.kind == "incremental"
+    assert read_files(tmp_path / "restored") == read_files(data_path)
+    assert (tmp_path / "restored" / MANIFEST_NAME).is_file()
+
+
+def test_restore_with_missing_increment_fails(backup_chain, tmp_path):
+    with pytest.raises(BackupError, match="missing"):
+        restore_backup([backup_chain[0], backup_chain[2]], tmp_path / "restored")
+
+
+def test_restore_without_full_backup_fails(backup_chain, tmp_path):
+    with pytest.raises(BackupError, match="missing"):
+        restore_backup(backup_chain[1:], tmp_path / "restored")
+
+
+def test_restore_verifies_hashes(data_path, tmp_path):
+    archive = tmp_path / "backup.zip"
+    create_backup(archive, data_path=data_path)
+    tampered = tmp_path / "tampered.zip"
+    with zipfile.ZipFile(archive) as src, zipfile.ZipFile(tampered, "w") as dst:
+        for info in src.infolist():
+            data = src.read(info)
+            if info.filename.endswith("PAR02.json"):
+                data = data.replace(b"PAR02", b"PAR99")
+            dst.writestr(info, data)
+    with pytest.raises(BackupError, match="do not match"):
+        restore_backup([tampered], tmp_path / "restored")
+
+
+def test_restore_into_non_empty_directory_fails(data_path, tmp_path):
+    archive = tmp_path / "backup.zip"
+    create_backup(archive, data_path=data_path)
+    with pytest.raises(BackupError, match="not empty"):
+        restore_backup([archive], data_path)
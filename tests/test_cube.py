@@ -0,0 +1,82 @@
+"""Tests of the ratings cubes of AGT responses (see research_assistant.analysis.cube)."""
+import json
+import struct
+from pathlib import Path
+from uuid import uuid4
+
+import numpy as np
+import pytest
+
+from research_assistant.analysis import load_ratings
+from research_assistant.storage import ResponseIndex
+from research_assistant.tasks.agt.eel import AgtTaskAPI
+
+
+def agt_response(participant: int) -> dict:
+    """Return an AGT response rating every trait of every trial *participant*."""
+    return {
+        "id": str(uuid4()),
+        "meta": {
+            "task_localisation": "CymEng_Eng_GB",
+            "participant_id": f"PAR{participant:02d}",
+            "researcher_id": "RES01",
+            "research_location": "Bangor",
+            "date_created": "2024-05-01T10:00:00",
+            "date_modified": "2024-05-01T10:30:00",
+        },
+        "stimulus_ratings": [
+            {
+                "trial": trial,
+                "ratings": [
+                    {"trait": trait, "rating": float(participant)}
+                    for trait in AgtTaskAPI.agt_traits
+                ],
+            }
+            for trial in AgtTaskAPI.agt_trials
+        ],
+    }
+
+
+@pytest.fixture
+def index(app_paths: Path) -> ResponseIndex:
+    """Return a response index of the AGT responses stored in *app_paths*."""
+    index = ResponseIndex(app_paths / "data")
+    index.register_task("agt", app_paths / "data" / "AGT")
+    return index
+
+
+def store(index: ResponseIndex, *participants: int) -> None:
+    """Store an AGT response for each of the *participants* and index it."""
+    for participant in participants:
+        data = agt_response(participant)
+        filename = f"PAR{participant:02d}_{data['id']}.json"
+        path = index.data_path / "AGT" / "CymEng_Eng_GB" / filename
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data), encoding="utf-8")
+    index.rebuild()
+
+
+def write_unpadded(path: Path) -> None:
+    """Rewrite the :code:`.npy` file *path* with a header too short to grow.
+
+    Like the headers written by older versions of NumPy, it is only aligned to 16 bytes.
+    """
+    array = np.load(path)
+    header = repr({"descr": "<f4", "fortran_order": False, "shape": array.shape}).encode()
+    header += b" " * (-(10 + len(header) + 1) % 16) + b"\n"
+    path.write_bytes(b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header
+                     + array.tobytes())
+
+
+@pytest.mark.parametrize("padded", [True, False])
+def test_update_appends_new_responses(index, tmp_path, padded):
+    store(index, 1, 2)
+    cube = load_ratings("agt", path=tmp_path / "cube", index=index)
+    if not padded:
+        write_unpadded(tmp_path / "cube" / cube.ratings_filename)
+    store(index, 3)
+    cube = load_ratings("agt", path=tmp_path / "cube", index=index)
+    ratings = np.load(tmp_path / "cube" / cube.ratings_filename)
+    assert ratings.shape == (3, len(AgtTaskAPI.agt_trials), len(AgtTaskAPI.agt_traits))
+    assert sorted(ratings[:, 0, 0]) == [1.0, 2.0, 3.0]
+    assert sorted(cube.participant_ids) == ["PAR01", "PAR02", "PAR03"]
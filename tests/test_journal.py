@@ -0,0 +1,82 @@
+"""Tests of the journals of responses in progress (see research_assistant.storage.journal)."""
+import os
+import time
+from uuid import uuid4
+
+import pytest
+
+from research_assistant.storage import ResponseJournal, get_syncer
+
+
+@pytest.fixture
+def journal(tmp_path) -> ResponseJournal:
+    return ResponseJournal(tmp_path / "journals")
+
+
+def test_replay_restores_every_operation(journal):
+    response_id = uuid4()
+    journal.append(response_id, "new", value={"id": str(response_id), "meta": {"a": 1}})
+    journal.append(response_id, "set", "note", "first")
+    journal.append(response_id, "set", "note", "second")
+    journal.append(response_id, "setitem", "ratings", 3, key="warm")
+    journal.append(response_id, "setitem", "ratings", 5, key="kind")
+    journal.append(response_id, "append", "scores", {"score": 1})
+    journal.append(response_id, "append", "scores", {"score": 2})
+    journal.append(response_id, "set", "draft", True)
+    journal.append(response_id, "delete", "draft")
+    assert journal.replay() == {
+        response_id: {
+            "id": str(response_id),
+            "meta": {"a": 1},
+            "note": "second",
+            "ratings": {"warm": 3, "kind": 5},
+            "scores": [{"score": 1}, {"score": 2}],
+        }
+    }
+
+
+def test_replay_skips_truncated_last_line(journal):
+    response_id = uuid4()
+    journal.append(response_id, "new", value={"id": str(response_id)})
+    journal.append(response_id, "set", "note", "kept")
+    with (journal.path / f"{response_id}.jsonl").open("a", encoding="utf-8") as fp:
+        fp.write('{"op": "set", "field": "note", "val')
+    assert journal.replay() == {response_id: {"id": str(response_id), "note": "kept"}}
+
+
+def test_replay_ignores_journal_without_new_record(journal):
+    response_id = uuid4()
+    journal.append(response_id, "set", "note", "orphaned")
+    assert journal.replay() == {}
+
+
+def test_compact_rewrites_journal_as_single_record(journal):
+    response_id = uuid4()
+    journal.append(response_id, "new", value={"id": str(response_id)})
+    for score in range(10):
+        journal.append(response_id, "append", "scores", score)
+    data = journal.replay()[response_id]
+    journal.compact(response_id, data)
+    filename = journal.path / f"{response_id}.jsonl"
+    assert len(filename.read_text(encoding="utf-8").splitlines()) == 1
+    assert journal.replay() == {response_id: data}
+    assert not list(journal.path.glob("*.tmp"))
+
+
+def test_remove_deletes_journal(journal):
+    response_id = uuid4()
+    journal.append(response_id, "new", value={"id": str(response_id)})
+    journal.remove(response_id)
+    journal.remove(response_id)  # Removing a missing journal is not an error
+    assert journal.replay() == {}
+
+
+def test_expire_removes_only_old_journals(journal):
+    old, recent = uuid4(), uuid4()
+    for response_id in (old, recent):
+        journal.append(response_id, "new", value={"id": str(response_id)})
+    get_syncer().wait(5)
+    past = time.time() - 3600
+    os.utime(journal.path / f"{old}.jsonl", (past, past))
+    assert journal.expire(60) == 1
+    assert list(journal.replay()) == [recent]
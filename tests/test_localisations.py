@@ -0,0 +1,43 @@
+"""Tests of the discovery of task localisations (see research_assistant.booteel.localisations)."""
+import json
+from pathlib import Path
+
+import pytest
+
+from research_assistant.booteel import localisations
+from research_assistant.booteel.localisations import (INDEX_FILENAME, build_index,
+                                                      discover_localisations, write_index)
+
+
+def write_localisation(directory: Path, label: str, name: str) -> None:
+    """Write the localisation *label* described as *name* to *directory*."""
+    meta = {"meta": {"versionId": label, "versionName": name}}
+    (directory / f"{label}.json").write_text(json.dumps(meta), encoding="utf-8")
+
+
+@pytest.fixture
+def directory(tmp_path: Path) -> Path:
+    """Return a localisations package with two localisations and a shipped index."""
+    path = tmp_path / "localisations"
+    path.mkdir()
+    write_localisation(path, "CymEng_Eng_GB", "Welsh-English")
+    write_localisation(path, "CymEng_Cym_GB", "Cymraeg-Saesneg")
+    write_index(build_index(path), path / INDEX_FILENAME)
+    return path
+
+
+def test_uses_shipped_index(directory, monkeypatch):
+    monkeypatch.setattr(localisations, "build_index", None)  # Must not be called
+    assert discover_localisations(directory) == {
+        "CymEng_Eng_GB": "Welsh-English",
+        "CymEng_Cym_GB": "Cymraeg-Saesneg",
+    }
+
+
+def test_ignores_shipped_index_of_edited_files(directory, tmp_path):
+    write_localisation(directory, "CymEng_Eng_GB", "Welsh-Saesneg")  # Same size
+    assert discover_localisations(directory, tmp_path / "index.json") == {
+        "CymEng_Eng_GB": "Welsh-Saesneg",
+        "CymEng_Cym_GB": "Cymraeg-Saesneg",
+    }
+    assert (tmp_path / "index.json").is_file()
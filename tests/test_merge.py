@@ -0,0 +1,159 @@
+"""Tests of merging backup archives from several devices (see research_assistant.backup.merge)."""
+import json
+import os
+import sqlite3
+import zipfile
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+
+from research_assistant.backup import BackupError, MergeStats, merge, merge_backups
+from research_assistant.storage import SQLiteBackend
+
+
+def response(response_id: str, participant: str, modified: str) -> dict:
+    """Return the raw data of a stored response last modified at *modified*."""
+    return {
+        "id": response_id,
+        "meta": {
+            "task_localisation": "CymEng_Eng_GB",
+            "participant_id": participant,
+            "researcher_id": "RES01",
+            "research_location": "Bangor",
+            "date_created": "2024-05-01T10:00:00",
+            "date_modified": modified,
+        },
+    }
+
+
+def json_member(data: dict) -> tuple[str, str]:
+    """Return the name and content of the archive member storing the response *data*."""
+    name = f"LSBQe/CymEng_Eng_GB/{data['meta']['participant_id']}_{data['id']}.json"
+    return name, json.dumps(data)
+
+
+def database_member(tmp_path: Path, *responses: dict) -> tuple[str, bytes]:
+    """Return the name and content of a SQLite backend database storing the *responses*."""
+    filename = tmp_path / f"{uuid4()}.sqlite3"
+    connection = sqlite3.connect(filename)
+    SQLiteBackend.create_schema(connection)
+    with connection:
+        for data in responses:
+            meta = data["meta"]
+            connection.execute(
+                "INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    data["id"], "lsbqe", meta["task_localisation"], meta["participant_id"],
+                    meta["researcher_id"], meta["research_location"], meta["date_created"],
+                    meta["date_modified"], json.dumps(data),
+                ),
+            )
+    connection.close()
+    return "responses.sqlite3", filename.read_bytes()
+
+
+def archive(path: Path, *members: tuple[str, str | bytes]) -> Path:
+    """Write a ZIP backup archive with the *members* to *path*."""
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, content in members:
+            zf.writestr(name, content)
+    return path
+
+
+def merged(output: Path) -> dict[str, dict]:
+    """Return the responses in the merged store *output* by id."""
+    connection = sqlite3.connect(output)
+    try:
+        rows = connection.execute("SELECT id, task, data FROM responses").fetchall()
+    finally:
+        connection.close()
+    assert all(task == "lsbqe" for _, task, _ in rows)
+    return {response_id: json.loads(data) for response_id, _, data in rows}
+
+
+@pytest.mark.parametrize("newer_first", [True, False])
+def test_newest_version_wins(tmp_path, newer_first):
+    response_id = str(uuid4())
+    old = response(response_id, "PAR01", "2024-05-01T10:30:00")
+    new = response(response_id, "PAR01", "2024-05-02T09:00:00")
+    archives = [
+        archive(tmp_path / "old.zip", json_member(old)),
+        archive(tmp_path / "new.zip", json_member(new)),
+    ]
+    if newer_first:
+        archives.reverse()
+    stats = merge_backups(archives, tmp_path / "merged.sqlite3", workers=1)
+    assert merged(tmp_path / "merged.sqlite3") == {response_id: new}
+    assert stats == MergeStats(
+        archives=2,
+        responses=2,
+        added=1,
+        replaced=0 if newer_first else 1,
+        duplicates=1 if newer_first else 0,
+    )
+
+
+def test_merges_json_files_and_database_in_same_archive(tmp_path):
+    shared_id, json_id, database_id = str(uuid4()), str(uuid4()), str(uuid4())
+    shared_old = response(shared_id, "PAR01", "2024-05-01T10:30:00")
+    shared_new = response(shared_id, "PAR01", "2024-05-03T08:00:00")
+    json_only = response(json_id, "PAR02", "2024-05-01T11:00:00")
+    database_only = response(database_id, "PAR03", "2024-05-01T12:00:00")
+    backup = archive(
+        tmp_path / "device.zip",
+        json_member(shared_old),
+        json_member(json_only),
+        database_member(tmp_path, shared_new, database_only),
+        ("response_index.sqlite3", b"not a response store"),
+    )
+    stats = merge_backups([backup], tmp_path / "merged.sqlite3", workers=1)
+    assert merged(tmp_path / "merged.sqlite3") == {
+        shared_id: shared_new,
+        json_id: json_only,
+        database_id: database_only,
+    }
+    assert stats == MergeStats(archives=1, responses=4, added=3, duplicates=1)
+
+
+def test_merges_into_existing_store_and_counts_errors(tmp_path):
+    first, second = str(uuid4()), str(uuid4())
+    output = tmp_path / "merged.sqlite3"
+    merge_backups(
+        [archive(tmp_path / "a.zip", json_member(response(first, "PAR01", "2024-05-01")))],
+        output,
+        workers=1,
+    )
+    stats = merge_backups(
+        [
+            archive(
+                tmp_path / "b.zip",
+                json_member(response(second, "PAR02", "2024-05-02")),
+                ("LSBQe/CymEng_Eng_GB/PAR03_broken.json", "{"),
+            ),
+            archive(tmp_path / "c.zip", json_member(response(first, "PAR01", "2024-05-01"))),
+            tmp_path / "missing.zip",
+        ],
+        output,
+        workers=1,
+    )
+    assert set(merged(output)) == {first, second}
+    assert stats == MergeStats(archives=3, responses=2, added=1, duplicates=1, errors=2)
+
+
+def test_unwritable_store_fails(tmp_path):
+    (tmp_path / "store").mkdir()
+    with pytest.raises(BackupError):
+        merge_backups([], tmp_path / "store", workers=1)
+
+
+def crash(*args):
+    """Stand-in for `merge._ingest_archive()` killing its worker process."""
+    os._exit(1)
+
+
+def test_dead_worker_fails(tmp_path, monkeypatch):
+    monkeypatch.setattr(merge, "_ingest_archive", crash)
+    backup = archive(tmp_path / "a.zip", json_member(response(str(uuid4()), "PAR01", "2024")))
+    with pytest.raises(BackupError, match="Could not merge"):
+        merge_backups([backup], tmp_path / "merged.sqlite3", workers=1)
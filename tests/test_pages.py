@@ -0,0 +1,78 @@
+"""Tests of the server-side rendering of task pages (see research_assistant.booteel.pages)."""
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Iterator, Mapping
+
+import eel
+import pytest
+from jinja2 import Environment, FileSystemLoader
+
+from research_assistant.booteel.pages import PageRenderer
+from research_assistant.booteel.task_info import TaskRegistryError
+
+TEMPLATES = {
+    "task/page.html": '<h1 data-task-tr="page.title">Title</h1>',
+    "task/broken.html": "{% if %}",
+}
+
+
+class TaskAPI:
+    """Stand-in for a task's API, whose responses are localised in Welsh."""
+
+    def open_localisation(self, instance: str) -> SimpleNamespace:
+        return SimpleNamespace(label="cy", source_hash="hash")
+
+
+class BrokenRegistry(Mapping):
+    """Stand-in for a `TaskRegistry` failing to load the task's API."""
+
+    def __getitem__(self, task: str) -> TaskAPI:
+        raise TaskRegistryError(f"Could not load the API of task {task!r}.")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(["task"])
+
+    def __len__(self) -> int:
+        return 1
+
+
+@pytest.fixture(autouse=True)
+def jinja_env(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Environment:
+    """Set up Eel's Jinja environment with the templates of a task's pages in *tmp_path*."""
+    for name, source in TEMPLATES.items():
+        (tmp_path / name).parent.mkdir(exist_ok=True)
+        (tmp_path / name).write_text(source, encoding="utf-8")
+    env = Environment(loader=FileSystemLoader(tmp_path))
+    monkeypatch.setitem(eel._start_args, "jinja_env", env)
+    return env
+
+
+@pytest.fixture
+def load_section(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Localise the title of the task's pages without loading a localisation."""
+    monkeypatch.setattr(
+        "research_assistant.booteel.pages.get_localisation_cache",
+        lambda: SimpleNamespace(get=lambda localisation, sections: {"page": {"title": "Teitl"}}),
+    )
+
+
+def test_render_localises_and_caches_page(load_section):
+    renderer = PageRenderer({"task": TaskAPI()})
+    html = renderer.render("task", "page.html", "instance")
+    assert html == '<h1 data-task-tr-origin="page.title">Teitl</h1>'
+    assert renderer.render("task", "page.html", "instance") is html
+    assert (renderer.hits, renderer.misses) == (1, 1)
+
+
+@pytest.mark.parametrize(
+    "tasks, page",
+    [
+        ({}, "page.html"),
+        ({"task": TaskAPI()}, "missing.html"),
+        ({"task": TaskAPI()}, "broken.html"),
+        (BrokenRegistry(), "page.html"),
+    ],
+    ids=["unknown task", "missing template", "template syntax error", "broken task"],
+)
+def test_render_falls_back_to_static_page(tasks, page):
+    assert PageRenderer(tasks).render("task", page, "instance") is None
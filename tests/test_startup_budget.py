@@ -0,0 +1,43 @@
+"""Tests of the app's startup against the startup budget (see benchmarks/bench_startup.py)."""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "benchmarks"))
+
+import bench_startup  # noqa: E402
+
+
+def _results(modules: list[str], command_modules: list[str]) -> dict:
+    """Return results like those of `bench_startup.measure()`, with every phase taking 1s."""
+    phases = bench_startup.PHASES + tuple(bench_startup.CLI_COMMANDS)
+    return {
+        "phases": {phase: {"median": 1.0, "min": 1.0, "max": 1.0} for phase in phases},
+        "modules": modules,
+        "commandModules": {command: command_modules for command in bench_startup.CLI_COMMANDS},
+    }
+
+
+def test_check_budget_reports_slow_phases_and_deferred_modules():
+    budget = {
+        "phases": {"import_app": 0.5, "eel_init": 2.0},
+        "deferredModules": ["research_assistant.tasks.*.eel"],
+        "cliDeferredModules": ["eel"],
+    }
+    assert bench_startup.check_budget(_results(["eel"], ["json"]), budget) == [
+        "import_app took 1.000s (budget: 0.500s)"
+    ]
+    failures = bench_startup.check_budget(
+        _results(["research_assistant.tasks.lsbqe.eel"], ["eel"]), budget
+    )
+    assert len(failures) == 1 + 1 + len(bench_startup.CLI_COMMANDS)
+    assert "research_assistant.app imports research_assistant.tasks.lsbqe.eel" in failures[1]
+
+
+@pytest.mark.slow
+def test_startup_within_budget():
+    budget = json.loads(bench_startup.DEFAULT_BUDGET.read_text(encoding="utf-8"))
+    failures = bench_startup.check_budget(bench_startup.measure(runs=3), budget)
+    assert not failures, "\n".join(failures)
@@ -0,0 +1,110 @@
+"""Tests of the `ResearchTaskAPI` base class, using the Memory task's API."""
+import os
+import time
+from pathlib import Path
+from uuid import UUID
+
+import gevent
+import pytest
+
+from research_assistant.config import config
+from research_assistant.storage import get_syncer
+from research_assistant.tasks.memorytask.datamodel import MemoryTaskResponse
+from research_assistant.tasks.memorytask.eel import MemoryTaskAPI
+
+# Seconds the validation of a `SlowMemoryTaskResponse` blocks its thread for.
+STORE_DELAY = 0.5
+
+SCORES = {"scores": [{"score": 3, "time": 10}, {"score": 5, "time": 12}]}
+
+
+class SlowMemoryTaskResponse(MemoryTaskResponse):
+    """Memory task response whose validation blocks its thread, like a large response's."""
+
+    def __init__(self, **data):
+        time.sleep(STORE_DELAY)
+        super().__init__(**data)
+
+
+@pytest.fixture
+def memorytask(app_paths: Path, monkeypatch: pytest.MonkeyPatch) -> MemoryTaskAPI:
+    """Return the Memory task's API, storing responses in *app_paths*."""
+    monkeypatch.setattr(MemoryTaskAPI, "task_data_path", app_paths / "data" / "MemoryTask")
+    monkeypatch.setattr(config.storage, "write_mode", "immediate")
+    monkeypatch.setattr(config.storage, "journal", True)
+    api = MemoryTaskAPI()
+    monkeypatch.setattr(api, "set_location", lambda location: None)
+    return api
+
+
+def new_response(api: MemoryTaskAPI) -> str:
+    """Start a new response with *api*, returning its id."""
+    return api.new(
+        {
+            "selectSurveyVersion": "EngZzz_Eng_GB",
+            "researcherId": "RES01",
+            "researchLocation": "Bangor",
+            "participantId": "PAR01",
+            "confirmConsent": True,
+        }
+    )
+
+
+def test_store_leaves_hub_responsive(memorytask, monkeypatch):
+    monkeypatch.setattr(MemoryTaskAPI, "response_class", SlowMemoryTaskResponse)
+    response_id = new_response(memorytask)
+    ticks: list[float] = []
+
+    def tick():
+        while True:
+            ticks.append(time.perf_counter())
+            gevent.sleep(0.01)
+
+    ticker = gevent.spawn(tick)
+    gevent.sleep(0)
+    started = time.perf_counter()
+    gevent.spawn(memorytask.add_scores, response_id, SCORES).get(timeout=10)
+    ticker.kill()
+    assert time.perf_counter() - started >= STORE_DELAY
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < STORE_DELAY / 2
+    assert memorytask.is_stored(response_id)
+
+
+def journal_file(api: MemoryTaskAPI, response_id: str) -> Path:
+    """Return the journal file of the response *response_id* of *api*."""
+    return config.paths.cache / "journals" / api.task_name / f"{response_id}.jsonl"
+
+
+def restored_ids(api: MemoryTaskAPI) -> list[str]:
+    """Return the ids of the responses *api* restored from its journal."""
+    return [response["id"] for response in api.restored_responses()]
+
+
+def test_restores_journalled_response_and_compacts_journal(memorytask):
+    response_id = new_response(memorytask)
+    memorytask._set_response_field(UUID(response_id), "note", "draft")
+    memorytask._delete_response_field(UUID(response_id), "note")
+    for score in SCORES["scores"]:
+        memorytask._append_response_item(UUID(response_id), "scores", score)
+    assert len(journal_file(memorytask, response_id).read_text().splitlines()) == 5
+
+    restarted = MemoryTaskAPI()  # Re-initialises the API, as if the app had crashed
+    assert restored_ids(restarted) == [response_id]
+    assert restarted._response_data[UUID(response_id)]["scores"] == SCORES["scores"]
+    assert "note" not in restarted._response_data[UUID(response_id)]
+    assert len(journal_file(restarted, response_id).read_text().splitlines()) == 1
+
+    assert restarted._call_exposed(restarted.store, response_id)
+    assert restarted.is_stored(response_id)
+    assert not journal_file(restarted, response_id).exists()
+    assert restored_ids(MemoryTaskAPI()) == []
+
+
+def test_expires_old_journals_on_restore(memorytask, monkeypatch):
+    monkeypatch.setattr(config.storage, "journal_max_age", 1)
+    old, recent = new_response(memorytask), new_response(memorytask)
+    get_syncer().wait(5)
+    past = time.time() - 2 * 24 * 60 * 60
+    os.utime(journal_file(memorytask, old), (past, past))
+    assert restored_ids(MemoryTaskAPI()) == [recent]
+    assert not journal_file(memorytask, old).exists()